@@ -0,0 +1,38 @@
+import functools
+import hmac
+
+from flask import request, jsonify
+
+def _load_admin_config():
+    try:
+        import config
+        return getattr(config, 'ADMIN_CONFIG', {})
+    except ImportError:
+        return {}
+
+def admin_token():
+    """
+    Token that maintenance and monitoring endpoints require, from the optional
+    ADMIN_CONFIG dictionary in config.py; None leaves those endpoints disabled
+    """
+    return _load_admin_config().get('token') or None
+
+def admin_required(view):
+    """
+    Serve a Flask view only to requests carrying the admin token as
+    'Authorization: Bearer <token>'. Without a configured token the view answers 403.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = admin_token()
+        if token is None:
+            return jsonify({"error": "Admin endpoints are disabled; set ADMIN_CONFIG['token'] in config.py."}), 403
+
+        scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+        # Compared in constant time so response timing does not reveal the token
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.strip().encode(), token.encode()):
+            response = jsonify({"error": "Admin token required"})
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response, 401
+        return view(*args, **kwargs)
+    return wrapper
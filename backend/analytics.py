@@ -0,0 +1,288 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORMULAS = ('epley', 'brzycki')
+DEFAULT_WINDOW_DAYS = 28
+RECORD_METRICS = ('weight', 'reps', 'volume', 'e1rm')
+DOWNSAMPLE_METHODS = ('lttb', 'average')
+MEASUREMENT_FIELDS = ('weight', 'bmi', 'body_fat_percentage', 'muscle_mass')
+# Measurement fields that get a moving average, and the keys they are returned under
+AVERAGED_FIELDS = {'weight': 'weight_avg', 'body_fat_percentage': 'body_fat_avg'}
+
+def available():
+    return np is not None
+
+def estimated_1rm(weight, reps, formula='epley'):
+    """
+    Estimated one-rep max for arrays of weight and reps. A single rep is its own
+    max under both formulas. Brzycki is undefined from 37 reps, which gives NaN.
+    """
+    weight = np.asarray(weight, dtype=float)
+    reps = np.asarray(reps, dtype=float)
+    if formula == 'brzycki':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimate = np.where(reps < 37, weight * 36 / (37 - reps), np.nan)
+    elif formula == 'epley':
+        estimate = weight * (1 + reps / 30)
+    else:
+        raise ValueError(f"Unknown 1RM formula: {formula}. Use one of {', '.join(FORMULAS)}.")
+    return np.where(reps == 1, weight, estimate)
+
+def set_records(reps, weight):
+    """
+    Personal record values one logged set contributes, keyed by (metric, at_weight):
+    the weight itself, the reps at that weight, single-set volume (reps x weight) and
+    the Epley estimated 1RM. Only reps records are kept per weight, the others use an
+    at_weight of 0. Plain Python, so exercise writes do not need NumPy.
+    """
+    if not reps or reps <= 0:
+        return {}
+    reps, weight = int(reps), float(weight or 0)
+    values = {('reps', weight): reps}
+    if weight > 0:
+        values[('weight', 0.0)] = weight
+        values[('volume', 0.0)] = round(reps * weight, 2)
+        values[('e1rm', 0.0)] = weight if reps == 1 else round(weight * (1 + reps / 30), 2)
+    return values
+
+def best_records(sets):
+    """
+    Best personal record values among logged sets. A record tied later stays with
+    the set that set it first.
+
+    Args:
+        sets (list): (exercise_id, reps, weight) per logged exercise, oldest first
+
+    Returns:
+        dict: (metric, at_weight) -> (value, exercise_id, reps, weight)
+    """
+    best = {}
+    for exercise_id, reps, weight in sets:
+        for key, value in set_records(reps, weight).items():
+            if key not in best or value > best[key][0]:
+                best[key] = (value, exercise_id, reps, weight)
+    return best
+
+def _columns(rows):
+    """
+    (dates, sets, reps, weight) arrays from (date, sets, reps, weight) rows
+    """
+    dates, sets, reps, weight = zip(*rows)
+    return (
+        np.array(dates, dtype='datetime64[s]').astype('datetime64[D]'),
+        np.array(sets, dtype=float),
+        np.array(reps, dtype=float),
+        np.array(weight, dtype=float)
+    )
+
+def _records(days, values, metric):
+    """
+    Sessions whose value beat every earlier session's, the first one included.
+    Zero values (body-weight work for the weight metric) are never records.
+    """
+    best_before = np.maximum.accumulate(np.concatenate(([-np.inf], values[:-1])))
+    beaten = (values > best_before) & (values > 0)
+    return [
+        {
+            'date': str(day),
+            'metric': metric,
+            'value': round(float(value), 2),
+            'previous': round(float(previous), 2) if np.isfinite(previous) else None
+        }
+        for day, value, previous in zip(days[beaten], values[beaten], best_before[beaten])
+    ]
+
+def exercise_progress(rows, formula='epley', window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Per-session and per-week progress of one exercise.
+
+    Args:
+        rows (list): (workout date, sets, reps, weight) per logged exercise, oldest first
+        formula (str): 'epley' or 'brzycki' for the estimated 1RM
+        window_days (int): Length of the trailing window for rolling volume
+
+    Returns:
+        dict: 'sessions' (one entry per training day with top weight, best estimated
+              1RM, volume and rolling volume), 'weekly' (tonnage per Monday-based week,
+              including weeks without training), 'records' (days that set a new best
+              estimated 1RM or top weight) and the current 'best' values
+    """
+    if formula not in FORMULAS:
+        raise ValueError(f"Unknown 1RM formula: {formula}. Use one of {', '.join(FORMULAS)}.")
+    progress = {'formula': formula, 'window_days': window_days, 'sessions': [], 'weekly': [], 'records': [], 'best': None}
+    if not rows:
+        return progress
+
+    dates, sets, reps, weight = _columns(rows)
+    volume = sets * reps * weight
+    e1rm = np.nan_to_num(estimated_1rm(weight, reps, formula))
+
+    # Rows arrive in date order, so each training day is one contiguous run
+    days, starts = np.unique(dates, return_index=True)
+    day_volume = np.add.reduceat(volume, starts)
+    day_sets = np.add.reduceat(sets, starts)
+    top_weight = np.maximum.reduceat(weight, starts)
+    best_e1rm = np.maximum.reduceat(e1rm, starts)
+
+    # Volume of the days in (day - window_days, day], from a running total
+    day_numbers = days.astype('int64')
+    cumulative = np.cumsum(day_volume)
+    window_start = np.searchsorted(day_numbers, day_numbers - window_days + 1)
+    rolling = cumulative - np.concatenate(([0.0], cumulative))[window_start]
+
+    # 1970-01-01 was a Thursday, so Monday-based weeks start 3 days later
+    week_numbers = (day_numbers - 4) // 7
+    tonnage = np.bincount(week_numbers - week_numbers[0], weights=day_volume)
+    week_starts = (week_numbers[0] + np.arange(len(tonnage))) * 7 + 4
+
+    progress['sessions'] = [
+        {
+            'date': str(day),
+            'sets': int(n_sets),
+            'top_weight': round(float(top), 2),
+            'best_e1rm': round(float(best), 2),
+            'volume': round(float(day_total), 2),
+            'rolling_volume': round(float(window_total), 2)
+        }
+        for day, n_sets, top, best, day_total, window_total
+        in zip(days, day_sets, top_weight, best_e1rm, day_volume, rolling)
+    ]
+    progress['weekly'] = [
+        {'week_start': str(start), 'tonnage': round(float(total), 2)}
+        for start, total in zip(week_starts.astype('datetime64[D]'), tonnage)
+    ]
+    records = _records(days, best_e1rm, 'e1rm') + _records(days, top_weight, 'weight')
+    progress['records'] = sorted(records, key=lambda record: (record['date'], record['metric']))
+    progress['best'] = {'e1rm': round(float(best_e1rm.max()), 2), 'weight': round(float(top_weight.max()), 2)}
+    return progress
+
+def _round(value):
+    return round(float(value), 2) if np.isfinite(value) else None
+
+def lttb(x, y, max_points):
+    """
+    Largest-triangle-three-buckets: indices of at most max_points points that keep the
+    visual shape of the line through (x, y). The first and last points are always kept;
+    every bucket in between contributes the point forming the largest triangle with the
+    point kept before it and the average of the next bucket.
+    """
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[stop:edges[bucket + 2]].mean()
+            next_y = y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = selected[bucket]
+        area = np.abs((x[a] - next_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (next_y - y[a]))
+        selected[bucket + 1] = start + np.argmax(area)
+    return selected
+
+def bucket_averages(x, columns, max_points):
+    """
+    Means of x and of every column over max_points equal spans of x, ignoring NaN.
+    Empty spans are dropped, so fewer points may come back.
+
+    Returns:
+        tuple: (bucket mean of x, list of bucket means per column, measurements per bucket)
+    """
+    span = x[-1] - x[0]
+    if span > 0:
+        bucket = np.minimum(((x - x[0]) / span * max_points).astype(int), max_points - 1)
+    else:
+        bucket = np.zeros(len(x), dtype=int)
+    counts = np.bincount(bucket, minlength=max_points)
+    used = counts > 0
+    means = []
+    for values in columns:
+        present = np.isfinite(values)
+        totals = np.bincount(bucket, weights=np.where(present, values, 0), minlength=max_points)
+        found = np.bincount(bucket, weights=present, minlength=max_points)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means.append((totals / found)[used])
+    return (np.bincount(bucket, weights=x, minlength=max_points) / np.maximum(counts, 1))[used], means, counts[used]
+
+def moving_average(x, values, window):
+    """
+    Mean of the values recorded in the trailing window (x - window, x] of each point,
+    ignoring NaN. NaN where the window holds no value.
+    """
+    present = np.isfinite(values)
+    totals = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0))))
+    found = np.concatenate(([0], np.cumsum(present)))
+    start = np.searchsorted(x, x - window, side='right')
+    end = np.arange(1, len(x) + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (totals[end] - totals[start]) / (found[end] - found[start])
+
+def measurement_series(rows, start=None, max_points=None, method='lttb', window_days=None):
+    """
+    A chart-ready measurement series of bounded size.
+
+    Args:
+        rows (list): (id, weight, bmi, body_fat_percentage, muscle_mass, date_recorded) per
+                     measurement, oldest first
+        start (datetime, optional): Rows before it only feed the moving averages
+        max_points (int, optional): Most points to return; all when None
+        method (str): 'lttb' keeps the measurements that best preserve the weight line,
+                      'average' returns per-span means of every field
+        window_days (int, optional): Trailing window of the weight and body fat moving averages
+
+    Returns:
+        dict: 'points' (date, the measurement fields, their moving averages when
+              window_days is given, and the id for lttb or the measurement count for
+              average), 'total' (measurements in the range) and the arguments used
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}. Use one of {', '.join(DOWNSAMPLE_METHODS)}.")
+    series = {'method': method, 'max_points': max_points, 'window_days': window_days, 'total': 0, 'points': []}
+    if not rows:
+        return series
+
+    ids = np.array([str(row[0]) for row in rows])
+    times = np.array([row[-1] for row in rows], dtype='datetime64[s]')
+    x = times.astype('int64').astype(float)
+    fields = {
+        name: np.array([np.nan if row[i] is None else float(row[i]) for row in rows])
+        for i, name in enumerate(MEASUREMENT_FIELDS, start=1)
+    }
+    if window_days:
+        for name, key in AVERAGED_FIELDS.items():
+            fields[key] = moving_average(x, fields[name], window_days * 86400)
+
+    in_range = times >= np.datetime64(start, 's') if start is not None else np.ones(len(x), dtype=bool)
+    ids, times, x = ids[in_range], times[in_range], x[in_range]
+    fields = {name: values[in_range] for name, values in fields.items()}
+    series['total'] = int(len(x))
+    if not len(x):
+        return series
+
+    if max_points and method == 'average' and len(x) > max_points:
+        bucket_x, means, counts = bucket_averages(x, list(fields.values()), max_points)
+        bucket_times = bucket_x.round().astype('int64').astype('datetime64[s]')
+        series['points'] = [
+            {'date': str(moment), **{name: _round(mean[i]) for name, mean in zip(fields, means)}, 'count': int(count)}
+            for i, (moment, count) in enumerate(zip(bucket_times, counts))
+        ]
+        return series
+
+    keep = np.arange(len(x))
+    if max_points:
+        # Gaps in weight are bridged so every measurement can still be chosen
+        weight = fields['weight']
+        present = np.isfinite(weight)
+        y = np.interp(x, x[present], weight[present]) if present.any() else np.zeros(len(x))
+        keep = lttb(x, y, max_points)
+    series['points'] = [
+        {'id': str(ids[i]), 'date': str(times[i]), **{name: _round(values[i]) for name, values in fields.items()}}
+        for i in keep
+    ]
+    return series
@@ -1,17 +1,137 @@
-from flask import Flask, request, jsonify
+import time
+import threading
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from database_manager import DatabaseManager, ProfilePictureHandler
 from s3_manager import S3Manager
-from passlib.context import CryptContext
+from password_hasher import HasherBusyError
+from uploads import spool_upload, check_upload_size, UploadTooLargeError
+from compression import compress_response
+from admin_auth import admin_required
+import query_log
+import metrics
+import analytics
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for cross-origin requests (e.g., from Flutter)
 
-db_manager = DatabaseManager()
-picture_handler = ProfilePictureHandler()
-s3_manager = S3Manager()
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Built by create_app(), not at import: the password hasher's worker processes are
+# spawned, and a spawned worker imports the script that started the server. With
+# `python api.py`, import-time setup would give every worker its own connection pool,
+# S3 client and thumbnail threads.
+db_manager = None
+s3_manager = None
+picture_handler = None
+_services_lock = threading.Lock()
+
+# Requests issuing at least this many statements are logged even outside debug mode
+REQUEST_QUERY_WARNING = 25
+
+def create_app():
+    """
+    Build the database, S3 and thumbnail services the routes use, once, and return the app.
+    Serve it with `python api.py` or a WSGI server pointed at "api:create_app()".
+    """
+    global db_manager, s3_manager, picture_handler, REQUEST_QUERY_WARNING
+    if db_manager is not None:
+        return app
+
+    with _services_lock:
+        if db_manager is None:
+            manager = DatabaseManager()
+            s3_manager = S3Manager()
+            picture_handler = ProfilePictureHandler(manager, s3_manager)
+            REQUEST_QUERY_WARNING = manager.connector.db_config.get('request_query_warning', 25)
+
+            manager.connector.query_hooks.append(metrics.record_query)
+            metrics.instrument_s3(s3_manager.s3_client)
+            metrics.register_pool(manager.connector)
+            metrics.registry.callback(
+                'password_hash_queue_depth', "Password hashing operations queued or running",
+                manager.password_hasher.pending
+            )
+            # Published last, so other threads never see a half-built set of services
+            db_manager = manager
+    return app
+
+@app.before_request
+def ensure_services():
+    # Servers given "api:app" rather than the factory still get the services
+    create_app()
+
+# JSON bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+def busy_response(e):
+    response = jsonify({"error": str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def conditional_response(response, etag=None):
+    """
+    Tag a 200 response with a weak ETag (its version when given, a hash of the body
+    otherwise) and turn it into an empty 304 if the client already holds that version.
+    The tag is weak because the body may be sent compressed in different encodings.
+    """
+    if etag is None:
+        response.add_etag(weak=True)
+    else:
+        response.set_etag(etag, weak=True)
+    return response.make_conditional(request)
+
+@app.after_request
+def compress(response):
+    return compress_response(request, response, COMPRESSION_MIN_SIZE)
+
+@app.before_request
+def start_query_log():
+    g.query_log_token = query_log.start()
+
+@app.after_request
+def report_queries(response):
+    log = query_log.current()
+    if log is None:
+        return response
+
+    db_time_ms = log.total_time * 1000
+    if app.debug:
+        response.headers['X-DB-Query-Count'] = str(log.count)
+        response.headers['X-DB-Time-Ms'] = f"{db_time_ms:.2f}"
+
+    if app.debug or log.count >= REQUEST_QUERY_WARNING:
+        print(f"{request.method} {request.url_rule} -> {response.status_code}: "
+              f"{log.count} queries, {db_time_ms:.1f} ms in the database")
+        if log.count >= REQUEST_QUERY_WARNING:
+            for entry in log.summary():
+                print(f"    {entry['count']}x {entry['time'] * 1000:.1f} ms: {entry['query']}")
+    return response
+
+@app.teardown_request
+def finish_query_log(_error=None):
+    token = g.pop('query_log_token', None)
+    if token is not None:
+        query_log.finish(token)
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    metrics.http_in_flight.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is not None:
+        # Label by route pattern, not path, so IDs do not multiply the series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_requests.inc(method=request.method, route=route, status=response.status_code)
+        metrics.http_latency.observe(time.perf_counter() - start, method=request.method, route=route)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(_error=None):
+    if g.pop('request_start', None) is not None:
+        metrics.http_in_flight.dec()
 
 # ------------------ User Management ------------------
 
@@ -24,13 +144,15 @@ def add_user():
         user_id = db_manager.add_user(
             name=data['name'],
             email=data['email'],
-            password_hash=pwd_context.hash(data['password_hash']),
+            password_hash=db_manager.password_hasher.hash(data['password_hash']),
             age=data['age'],
             gender=data['gender'],
             fitness_level=data.get('fitness_level'),
             profile_picture_url=data.get('profile_picture_url')
         )
-        return jsonify({"message": "User added successfully", "user_id": user_id}}), 201
+        return jsonify({"message": "User added successfully", "user_id": user_id}), 201
+    except HasherBusyError as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -57,6 +179,8 @@ def user_login():
         if user_id:
             return jsonify({"message": "Login successful", "user_id": user_id}), 200
         return jsonify({"error": "Invalid email or password"}), 401
+    except HasherBusyError as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -82,29 +206,86 @@ def delete_user(user_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/users/counters/reconcile', methods=['POST'])
+@admin_required
+def reconcile_user_counters():
+    try:
+        repaired = db_manager.reconcile_user_counters()
+        if repaired is not None:
+            return jsonify({"message": "User counters reconciled", "repaired": repaired}), 200
+        return jsonify({"error": "Failed to reconcile user counters"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 # ------------------ Profile Picture ------------------
 
+MAX_PROFILE_PICTURE_BYTES = 10 * 1024 * 1024
+UPLOAD_SPOOL_THRESHOLD = 1024 * 1024
+# Allowance for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Werkzeug enforces this on every request body as it is read: a larger declared
+# Content-Length is refused before reading, and a chunked body once it crosses the limit
+app.config['MAX_CONTENT_LENGTH'] = MAX_PROFILE_PICTURE_BYTES + MULTIPART_OVERHEAD
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(_e):
+    return jsonify({"error": f"Request body exceeds the {app.config['MAX_CONTENT_LENGTH']} byte limit."}), 413
+
 @app.route('/users/<user_id>/profile-picture', methods=['POST'])
 def upload_profile_picture(user_id):
     try:
-        file = request.files['file']
-        content_type = file.content_type
-        image_data = file.read()
-        url = picture_handler.upload_profile_picture(user_id, image_data, content_type)
+        if request.mimetype.startswith('image/'):
+            # Raw image body: copied once from the request stream, no form parsing
+            image_file, _ = spool_upload(request.stream, MAX_PROFILE_PICTURE_BYTES, UPLOAD_SPOOL_THRESHOLD)
+            content_type = request.mimetype
+        else:
+            # The form parser has already spooled the file part, so it is uploaded from there
+            file = request.files['file']
+            image_file, content_type = check_upload_size(file.stream, MAX_PROFILE_PICTURE_BYTES), file.content_type
+
+        try:
+            url = picture_handler.upload_profile_picture(user_id, image_file, content_type)
+        finally:
+            image_file.close()
         return jsonify({"url": url}), 201
+    except RequestEntityTooLarge as e:
+        return request_too_large(e)
+    except UploadTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @app.route('/users/<user_id>/profile-picture', methods=['GET'])
 def get_profile_picture_url(user_id):
+    size = request.args.get('size', type=int)
     try:
-        url = picture_handler.get_profile_picture_url(user_id)
+        url = picture_handler.get_profile_picture_url(user_id, size=size)
         if url:
             return jsonify({"url": url}), 200
         return jsonify({"error": "Profile picture not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+MAX_BATCH_PICTURES = 200
+
+@app.route('/users/profile-pictures', methods=['POST'])
+def get_profile_picture_urls():
+    data = request.json
+    try:
+        user_ids = data.get('user_ids')
+        if not isinstance(user_ids, list):
+            return jsonify({"error": "Expected a list of user_ids"}), 400
+        if len(user_ids) > MAX_BATCH_PICTURES:
+            return jsonify({"error": f"At most {MAX_BATCH_PICTURES} users per request"}), 400
+
+        urls = picture_handler.get_profile_picture_urls(user_ids, size=data.get('size'))
+        if urls is not None:
+            return jsonify({"urls": urls}), 200
+        return jsonify({"error": "Failed to fetch profile pictures"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 @app.route('/users/<user_id>/profile-picture', methods=['DELETE'])
 def delete_profile_picture(user_id):
     try:
@@ -133,11 +314,27 @@ def start_workout():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def paged_list_response(page):
+    """
+    Return a page's items as a JSON list; when there is another page, its cursor
+    is sent in the X-Next-Cursor header
+    """
+    response = jsonify(page['items'])
+    if page['next_cursor']:
+        response.headers['X-Next-Cursor'] = page['next_cursor']
+    return conditional_response(response)
+
 @app.route('/workouts/<user_id>', methods=['GET'])
 def get_user_workouts(user_id):
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, limit)
+    before = request.args.get('before')
     try:
-        workouts = db_manager.get_user_workouts(user_id)
-        return jsonify(workouts), 200
+        workouts = db_manager.get_user_workouts(user_id, limit, before)
+        if workouts is not None:
+            return paged_list_response(workouts)
+        return jsonify({"error": "Failed to fetch workouts"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -175,7 +372,7 @@ def delete_workout(workout_id):
 def get_workout_exercises(workout_id):
     try:
         exercises = db_manager.get_workout_exercises(workout_id)
-        return jsonify(exercises), 200
+        return conditional_response(jsonify(exercises))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
     
@@ -193,14 +390,72 @@ def get_workout_details(workout_id):
 
 @app.route('/users/<user_id>/routines', methods=['GET'])
 def get_user_routines(user_id):
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, limit)
+    before = request.args.get('before')
     try:
-        routines = db_manager.get_user_routines(user_id)
+        routines = db_manager.get_user_routines(user_id, limit, before)
         if routines is not None:
-            return jsonify(routines), 200
+            return paged_list_response(routines)
         return jsonify({"error": "Failed to fetch routines"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/users/<user_id>/progress', methods=['GET'])
+def get_exercise_progress(user_id):
+    exercise = request.args.get('exercise')
+    if not exercise:
+        return jsonify({"error": "An exercise is required"}), 400
+    formula = request.args.get('formula', 'epley')
+    if formula not in analytics.FORMULAS:
+        return jsonify({"error": f"Unknown formula, use one of {', '.join(analytics.FORMULAS)}"}), 400
+    window = max(1, request.args.get('window', analytics.DEFAULT_WINDOW_DAYS, type=int))
+    if not analytics.available():
+        return jsonify({"error": "Progress analytics are not available"}), 503
+    try:
+        progress = db_manager.get_exercise_progress(user_id, exercise, formula, window)
+        if progress is not None:
+            return conditional_response(jsonify(progress))
+        return jsonify({"error": "Failed to compute progress"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/users/<user_id>/records', methods=['GET'])
+def get_personal_records(user_id):
+    try:
+        records = db_manager.get_personal_records(user_id, request.args.get('exercise'))
+        if records is not None:
+            return conditional_response(jsonify(records))
+        return jsonify({"error": "Failed to fetch personal records"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+# ------------------ Feed ------------------
+
+FEED_AVATAR_SIZE = 64
+
+@app.route('/feed/<user_id>', methods=['GET'])
+def get_workout_feed(user_id):
+    cursor = request.args.get('cursor')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+    # Viewed workouts stay in the feed unless the client asks to hide them
+    include_viewed = request.args.get('include_viewed', 'true').lower() != 'false'
+    try:
+        feed = db_manager.get_workout_feed(user_id, limit, cursor, include_viewed)
+        if feed is not None:
+            # Embed ready-to-use avatar URLs so the app needs no request per author
+            urls = picture_handler.get_urls_for_pictures(
+                ((item['profile_picture_url'], item['profile_picture_sizes']) for item in feed['items']),
+                size=FEED_AVATAR_SIZE
+            )
+            for item in feed['items']:
+                item['avatar_url'] = urls.get(item['profile_picture_url'])
+            return jsonify(feed), 200
+        return jsonify({"error": "Failed to fetch feed"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 # ------------------ Exercises ------------------
 
 #get list of exercises from EXERCISES
@@ -208,9 +463,16 @@ def get_user_routines(user_id):
 @app.route('/exercises', methods=['GET'])
 def get_exercise_list():
     category = request.args.get('category')
+    query = request.args.get('q')
     try:
-        exercises = db_manager.get_exercise_list(category)
-        return jsonify(exercises), 200
+        catalog = db_manager.get_exercise_catalog()
+
+        # The catalog only changes when exercises.json does, so its version is a stable ETag
+        if request.if_none_match.contains_weak(catalog.version):
+            response = app.response_class(status=304)
+            response.set_etag(catalog.version, weak=True)
+            return response
+        return conditional_response(jsonify(catalog.search(query, category)), catalog.version)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -220,19 +482,56 @@ def get_exercise_list():
 def add_exercise():
     data = request.json
     try:
-        exercise_id = db_manager.add_exercise(
+        logged = db_manager.add_exercise(
             workout_id=data['workout_id'],
             exercise=data['exercise'],
             sets=data['sets'],
             reps=data['reps'],
             weight=data['weight']
         )
-        if exercise_id:
-            return jsonify({"message": "Exercise logged", "exercise_id": exercise_id}), 201
+        if logged:
+            records = logged['personal_records']
+            return jsonify({
+                "message": "Exercise logged",
+                "exercise_id": logged['exercise_id'],
+                # A first record for an exercise or a weight is not a PR yet
+                "new_pr": any(record['previous'] is not None for record in records),
+                "personal_records": records
+            }), 201
         return jsonify({"error": "Failed to log exercise"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+#add several exercises to a workout in one request
+
+MAX_BATCH_EXERCISES = 100
+
+@app.route('/workouts/<workout_id>/exercises/batch', methods=['POST'])
+def add_exercises_batch(workout_id):
+    data = request.json
+    items = data.get('exercises') if isinstance(data, dict) else data
+    try:
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Expected a non-empty list of exercises"}), 400
+        if len(items) > MAX_BATCH_EXERCISES:
+            return jsonify({"error": f"At most {MAX_BATCH_EXERCISES} exercises per batch"}), 400
+
+        exercises = [
+            {
+                'exercise': item['exercise'],
+                'sets': item['sets'],
+                'reps': item['reps'],
+                'weight': item['weight']
+            }
+            for item in items
+        ]
+        exercise_ids = db_manager.add_exercises(workout_id, exercises)
+        if exercise_ids is not None:
+            return jsonify({"message": "Exercises logged", "exercise_ids": exercise_ids}), 201
+        return jsonify({"error": "Failed to log exercises"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 #update exercise in a workout 
 @app.route('/exercises/<exercise_id>', methods=['PUT'])
 def update_exercise(exercise_id):
@@ -286,9 +585,32 @@ def add_measurement():
 
 @app.route('/measurements/<user_id>', methods=['GET'])
 def get_measurements(user_id):
+    start = request.args.get('from')
+    end = request.args.get('to')
+    max_points = request.args.get('max_points', type=int)
+    window = request.args.get('window', type=int)
+    method = request.args.get('method', 'lttb')
+    if method not in analytics.DOWNSAMPLE_METHODS:
+        return jsonify({"error": f"Unknown method, use one of {', '.join(analytics.DOWNSAMPLE_METHODS)}"}), 400
     try:
-        measurements = db_manager.get_measurements(user_id)
-        return jsonify(measurements), 200
+        # Without max_points or window the raw rows are returned as before
+        if max_points is None and window is None:
+            measurements = db_manager.get_measurements(user_id, start, end)
+            if measurements is not None:
+                return jsonify(measurements), 200
+            return jsonify({"error": "Failed to fetch measurements"}), 400
+
+        if not analytics.available():
+            return jsonify({"error": "Measurement series are not available"}), 503
+        series = db_manager.get_measurement_series(
+            user_id, start, end,
+            max(3, max_points) if max_points is not None else None,
+            method,
+            max(1, window) if window is not None else None
+        )
+        if series is not None:
+            return conditional_response(jsonify(series))
+        return jsonify({"error": "Failed to fetch measurements"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -339,14 +661,14 @@ def unfollow_user():
 @app.route('/users/<user_id>/followers', methods=['GET'])
 def get_followers(user_id):
     try:
-        return jsonify(db_manager.get_followers(user_id)), 200
+        return conditional_response(jsonify(db_manager.get_followers(user_id)))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @app.route('/users/<user_id>/following', methods=['GET'])
 def get_following(user_id):
     try:
-        return jsonify(db_manager.get_following(user_id)), 200
+        return conditional_response(jsonify(db_manager.get_following(user_id)))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -375,23 +697,70 @@ def get_leaderboard():
 
 @app.route('/leaderboard/<user_id>/rank', methods=['GET'])
 def get_user_ranking(user_id):
+    window = max(0, min(request.args.get('window', 0, type=int), 50))
     try:
-        rank = db_manager.get_user_ranking(user_id)
-        if rank is not None:
-            return jsonify({"rank": rank}), 200
+        ranking = db_manager.get_user_rank_window(user_id, window)
+        if ranking is not None:
+            return jsonify(ranking), 200
         return jsonify({"error": "User not found in leaderboard"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @app.route('/leaderboard/update', methods=['POST'])
+@admin_required
 def update_leaderboard():
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    try:
+        drift = db_manager.update_leaderboard(dry_run=dry_run)
+        if drift is None:
+            return jsonify({"error": "Failed to update leaderboard"}), 400
+        message = "Leaderboard verified" if dry_run else "Leaderboard updated"
+        return jsonify({"message": message, "drift": drift}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/leaderboard/activity/backfill', methods=['POST'])
+@admin_required
+def backfill_daily_activity():
+    data = request.get_json(silent=True) or {}
     try:
-        db_manager.update_leaderboard()
-        return jsonify({"message": "Leaderboard updated"}), 200
+        written = db_manager.backfill_daily_activity(data.get('start_date'), data.get('end_date'))
+        if written is not None:
+            return jsonify({"message": "Daily activity backfilled", "rows": written}), 200
+        return jsonify({"error": "Failed to backfill daily activity"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/records/backfill', methods=['POST'])
+@admin_required
+def backfill_personal_records():
+    data = request.get_json(silent=True) or {}
+    try:
+        written = db_manager.backfill_personal_records(data.get('user_id'))
+        if written is not None:
+            return jsonify({"message": "Personal records backfilled", "records": written}), 200
+        return jsonify({"error": "Failed to backfill personal records"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+# ------------------ Cache ------------------
+
+@app.route('/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    try:
+        return jsonify(db_manager.cache.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+# ------------------ Metrics ------------------
+
+@app.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    return app.response_class(metrics.registry.expose(), content_type=metrics.CONTENT_TYPE)
+
 # ------------------ App Run ------------------
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    create_app().run(host='0.0.0.0', port=8000, debug=True)
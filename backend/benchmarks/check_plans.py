@@ -0,0 +1,115 @@
+"""
+Runs EXPLAIN on every statement the benchmarked DatabaseManager methods issue and
+fails if any plan reads a table with a sequential scan. Use it against the
+generate_data.py dataset after migrating, since on small tables the planner
+rightly prefers sequential scans:
+
+    python -m benchmarks.check_plans
+
+Exits with status 1 when an unexpected sequential scan is found.
+"""
+import argparse
+import sys
+
+import query_log
+from cache import ResponseCache, NullCacheBackend
+from database_manager import DatabaseManager
+from benchmarks.run_benchmarks import pick_sample, read_cases, run_write_session
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+# Reads that cover most of a table by design, with the tables they may scan
+EXPECTED_SEQ_SCANS = {
+    # RankService reloads its whole snapshot of the leaderboard
+    'get_user_ranking': {'leaderboard', 'users'},
+    'get_user_rank_window': {'leaderboard', 'users'},
+    # Names for every user active in the window are joined in one go
+    'get_leaderboard[7 days]': {'users'},
+}
+
+class StatementCollector:
+    """
+    Query hook recording the first instance of every distinct statement, keyed by
+    the benchmark case that issued it. measure() matches BenchmarkRecorder so
+    run_write_session can drive it.
+    """
+    def __init__(self):
+        self.case = None
+        self.statements = {}  # (case, normalized query) -> (query, params)
+
+    def __call__(self, query, params, duration, rows):
+        if self.case is None or not query.lstrip().upper().startswith(EXPLAINABLE):
+            return
+        self.statements.setdefault((self.case, query_log.normalize(query)), (query, params))
+
+    def measure(self, name, fn):
+        self.case = name
+        try:
+            return fn()
+        finally:
+            self.case = None
+
+def seq_scans(plan):
+    """
+    Relations read by Seq Scan nodes anywhere in an EXPLAIN (FORMAT JSON) plan
+    """
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+def check(db_manager, seed):
+    """
+    Returns:
+        list: (case, relation, normalized query) for every unexpected sequential scan
+    """
+    collector = StatementCollector()
+    connector = db_manager.connector
+    connector.query_hooks.append(collector)
+    try:
+        sample = pick_sample(db_manager, seed)
+        for name, fn in read_cases(db_manager, sample):
+            collector.measure(name, fn)
+        run_write_session(collector, db_manager, sample)
+    finally:
+        connector.query_hooks.remove(collector)
+
+    failures = []
+    for (case, normalized), (query, params) in sorted(collector.statements.items()):
+        # Without ANALYZE the statement is planned but never run, so writes are safe to explain
+        plan = connector.execute_query("EXPLAIN (FORMAT JSON) " + query, params, commit=False, fetch=True)[0][0]
+        scanned = seq_scans(plan[0]['Plan'])
+        unexpected = [table for table in scanned if table not in EXPECTED_SEQ_SCANS.get(case, ())]
+        status = f"SEQ SCAN on {', '.join(unexpected)}" if unexpected else "ok"
+        print(f"  {case:<32} {status:<32} {normalized[:80]}")
+        failures.extend((case, table, normalized) for table in unexpected)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that hot queries are served by indexes.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for picking sample users")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    # Every call must reach the database for its statements to be seen
+    db_manager.cache = ResponseCache(NullCacheBackend())
+    try:
+        if db_manager.connector.engine.name != 'postgres':
+            raise SystemExit("Query plans can only be checked on PostgreSQL.")
+        print("Checking query plans:")
+        failures = check(db_manager, args.seed)
+    finally:
+        db_manager.password_hasher.shutdown()
+        db_manager.connector.close()
+
+    if failures:
+        print(f"\n{len(failures)} sequential scans on the request path:")
+        for case, table, normalized in failures:
+            print(f"  {case}: {table}: {normalized}")
+        sys.exit(1)
+    print("\nNo unexpected sequential scans.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import math
+
+# Shared by the dataset generator, the benchmark runner and the load test
+
+BENCH_EMAIL_DOMAIN = 'bench.example'
+BENCH_PASSWORD = 'benchmark'
+
+# Generated users per unit of --scale
+BASE_USERS = 1000
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
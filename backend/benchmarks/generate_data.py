@@ -0,0 +1,232 @@
+"""
+Seeded synthetic dataset for benchmarking DatabaseManager against a local PostgreSQL or SQLite database.
+
+Run from the backend directory, with config.DB_CONFIG pointing at a scratch database:
+
+    python -m benchmarks.generate_data --scale 1 --seed 42
+
+Generated users have @bench.example email addresses and the password "benchmark";
+--reset removes a previous run's users (and everything cascading from them) first.
+"""
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from database_manager import DatabaseManager
+from benchmarks.common import BASE_USERS, BENCH_EMAIL_DOMAIN, BENCH_PASSWORD
+
+# Per user
+MEAN_FOLLOWING = 25
+MEAN_WORKOUTS = 40
+MEAN_EXERCISES = 5
+HISTORY_DAYS = 365
+MEASUREMENT_EVERY_DAYS = 7
+
+# Typical working weight in kg per category; 0 marks body-weight and cardio work
+CATEGORY_WEIGHTS = {
+    'Chest': 60, 'Back': 80, 'Legs': 100, 'Shoulders': 35, 'Arms': 15, 'Core': 10, 'Cardio': 0
+}
+
+FITNESS_LEVELS = ('Beginner', 'Intermediate', 'Advanced')
+GENDERS = ('Male', 'Female', 'Other')
+WORKOUT_NAMES = ('Push Day', 'Pull Day', 'Leg Day', 'Upper Body', 'Lower Body', 'Full Body', 'Cardio')
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _heavy_tailed(rng, mean, alpha=2.0, cap=None):
+    """
+    Pareto-distributed count with the given mean: most users are light, a few are very active
+    """
+    value = int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+    return min(value, cap) if cap is not None else value
+
+def _load_exercises():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'exercises.json')
+    with open(path) as file:
+        return json.load(file)['exercises']
+
+class DatasetGenerator:
+    """
+    Builds the dataset in memory from a seed, then writes it with multi-row INSERTs
+    in batches. The same seed and scale always produce the same rows and IDs, with
+    dates counted back from the day of the run.
+    """
+    def __init__(self, db_manager, scale=1.0, seed=42, batch_size=1000, now=None):
+        self.db_manager = db_manager
+        self.connector = db_manager.connector
+        self.scale = scale
+        self.seed = seed
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        # Anchored to midnight so the date range is stable within a day
+        self.now = now or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.exercises = _load_exercises()
+
+    def reset(self):
+        deleted = self.connector.execute_query(
+            "DELETE FROM users WHERE email LIKE %s RETURNING id", (f"%@{BENCH_EMAIL_DOMAIN}",), fetch=True
+        )
+        self.connector.execute_query(
+            "DELETE FROM leaderboard WHERE user_id NOT IN (SELECT id FROM users)"
+        )
+        print(f"Removed {len(deleted)} generated users.")
+
+    def _users(self, count, password_hash):
+        rows = []
+        for i in range(count):
+            rows.append((
+                _uuid(self.rng), f"Bench User {i}", f"user{i}@{BENCH_EMAIL_DOMAIN}", password_hash,
+                self.rng.randint(16, 70), self.rng.choice(GENDERS), self.rng.choice(FITNESS_LEVELS)
+            ))
+        return rows
+
+    def _follows(self, user_ids):
+        """
+        Power-law follow graph: out-degrees are heavy-tailed, and whom to follow is
+        drawn with Zipf weights over a shuffled popularity order, so a handful of
+        users collect most of the followers
+        """
+        popularity = list(user_ids)
+        self.rng.shuffle(popularity)
+        cum_weights = list(_cumulative(1 / (rank + 1) for rank in range(len(popularity))))
+
+        rows = []
+        for follower_id in user_ids:
+            wanted = _heavy_tailed(self.rng, MEAN_FOLLOWING, cap=len(user_ids) - 1)
+            chosen = set(self.rng.choices(popularity, cum_weights=cum_weights, k=wanted))
+            chosen.discard(follower_id)
+            for following_id in chosen:
+                followed_at = self.now - timedelta(seconds=self.rng.randrange(HISTORY_DAYS * 86400))
+                rows.append((follower_id, following_id, followed_at))
+        return rows
+
+    def _workouts(self, user_ids):
+        workouts = []
+        exercises = []
+        for user_id in user_ids:
+            count = _heavy_tailed(self.rng, MEAN_WORKOUTS, cap=HISTORY_DAYS * 2)
+            for _ in range(count):
+                workout_id = _uuid(self.rng)
+                started = self.now - timedelta(
+                    days=self.rng.randrange(HISTORY_DAYS), minutes=self.rng.randrange(6 * 60, 22 * 60)
+                )
+                routine = 1 if self.rng.random() < 0.1 else 0
+                workout_volume = 0
+                for position in range(max(1, int(self.rng.expovariate(1 / MEAN_EXERCISES)))):
+                    exercise = self.rng.choice(self.exercises)
+                    base = CATEGORY_WEIGHTS.get(exercise['category'], 20)
+                    sets = self.rng.randint(2, 5)
+                    reps = self.rng.randint(5, 15)
+                    weight = round(base * self.rng.uniform(0.5, 1.5) / 2.5) * 2.5 if base else 0
+                    workout_volume += sets * reps * weight
+                    exercises.append((
+                        _uuid(self.rng), workout_id, exercise['name'], sets, reps, weight,
+                        started + timedelta(minutes=5 * position)
+                    ))
+                workouts.append((
+                    workout_id, user_id, started, self.rng.choice(WORKOUT_NAMES), None, routine,
+                    self.rng.randint(20, 120), workout_volume
+                ))
+        return workouts, exercises
+
+    def _measurements(self, user_ids):
+        rows = []
+        for user_id in user_ids:
+            weight = self.rng.uniform(55, 110)
+            body_fat = self.rng.uniform(10, 35)
+            height = self.rng.uniform(1.55, 1.95)
+            for day in range(HISTORY_DAYS, 0, -MEASUREMENT_EVERY_DAYS):
+                weight += self.rng.gauss(-0.05, 0.4)
+                body_fat = min(max(body_fat + self.rng.gauss(-0.03, 0.2), 4), 50)
+                rows.append((
+                    _uuid(self.rng), user_id, round(weight, 1), round(weight / height ** 2, 1),
+                    round(body_fat, 1), round(weight * (1 - body_fat / 100) * 0.55, 1),
+                    self.now - timedelta(days=day)
+                ))
+        return rows
+
+    def _insert(self, table, columns, rows):
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            query = f"""
+                INSERT INTO {table} ({', '.join(columns)})
+                VALUES {', '.join([placeholders] * len(batch))}
+            """
+            self.connector.execute_query(query, tuple(value for row in batch for value in row))
+        print(f"  {table}: {len(rows)} rows")
+
+    def generate(self):
+        user_count = max(2, int(BASE_USERS * self.scale))
+        started = time.perf_counter()
+
+        # One hash for every user; hashing each would dominate generation time
+        password_hash = self.db_manager.password_hasher.hash(BENCH_PASSWORD)
+        users = self._users(user_count, password_hash)
+        user_ids = [row[0] for row in users]
+        follows = self._follows(user_ids)
+        workouts, exercises = self._workouts(user_ids)
+        measurements = self._measurements(user_ids)
+
+        print(f"Writing dataset (scale {self.scale}, seed {self.seed}):")
+        self._insert('users', ('id', 'name', 'email', 'password_hash', 'age', 'gender', 'fitness_level'), users)
+        self._insert('user_follows', ('follower_id', 'following_id', 'created_at'), follows)
+        self._insert('workouts', ('id', 'user_id', 'date', 'name', 'notes', 'routine', 'duration', 'volume'), workouts)
+        self._insert('exercises', ('id', 'workout_id', 'exercise', 'sets', 'reps', 'weight', 'created_at'), exercises)
+        self._insert(
+            'measurements',
+            ('id', 'user_id', 'weight', 'bmi', 'body_fat_percentage', 'muscle_mass', 'date_recorded'),
+            measurements
+        )
+
+        # Derived tables are built the same way production repairs them
+        self.db_manager.reconcile_user_counters()
+        self.db_manager.update_leaderboard()
+        self.db_manager.backfill_daily_activity()
+        self.db_manager.backfill_personal_records()
+        self.connector.execute_query("ANALYZE")
+
+        summary = {
+            'scale': self.scale,
+            'seed': self.seed,
+            'users': len(users),
+            'follows': len(follows),
+            'workouts': len(workouts),
+            'exercises': len(exercises),
+            'measurements': len(measurements),
+            'seconds': round(time.perf_counter() - started, 1)
+        }
+        print(f"Dataset ready: {summary}")
+        return summary
+
+def _cumulative(values):
+    total = 0
+    for value in values:
+        total += value
+        yield total
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark dataset.")
+    parser.add_argument('--scale', type=float, default=1.0, help=f"Multiples of {BASE_USERS} users")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT statement")
+    parser.add_argument('--reset', action='store_true', help="Remove previously generated users first")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    try:
+        generator = DatasetGenerator(db_manager, args.scale, args.seed, args.batch_size)
+        if args.reset:
+            generator.reset()
+        generator.generate()
+    finally:
+        db_manager.password_hasher.shutdown()
+        db_manager.connector.close()
+
+if __name__ == '__main__':
+    main()
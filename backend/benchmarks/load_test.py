@@ -0,0 +1,324 @@
+"""
+Mixed-workload HTTP load generator replaying the app's traffic against a local API server.
+
+Start the API on the benchmark database (see generate_data.py), then from the backend directory:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 16 --rate 20 --duration 60
+
+Each session logs in as a generated user and then either browses (feed pages, profile,
+workout history, leaderboard) or records a workout (exercise list, start, log exercises,
+finish with PATCH, leaderboard). With --rate, sessions arrive as a Poisson process at that
+many per second and are served by --concurrency workers; with --rate 0 every worker runs
+sessions back to back. Workouts created during the run are deleted afterwards unless
+--keep-data is given.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit, urlencode
+
+from benchmarks.common import BASE_USERS, BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, percentile
+
+DEFAULT_MIX = 'browse=0.7,workout=0.3'
+
+class RequestFailed(Exception):
+    pass
+
+class LoadRecorder:
+    """
+    Latencies and outcomes per endpoint, keyed by method and route pattern
+    """
+    def __init__(self):
+        self.endpoints = {}
+        self.sessions = {'completed': 0, 'failed': 0}
+        self.arrival_delays = []
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration, status):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {'durations': [], 'statuses': {}, 'errors': 0})
+            stats['durations'].append(duration * 1000)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            if not isinstance(status, int) or status >= 400:
+                stats['errors'] += 1
+
+    def session_done(self, ok, arrival_delay=None):
+        with self._lock:
+            self.sessions['completed' if ok else 'failed'] += 1
+            if arrival_delay is not None:
+                self.arrival_delays.append(arrival_delay * 1000)
+
+    def report(self, elapsed):
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in sorted(self.endpoints.items()):
+                durations = sorted(stats['durations'])
+                endpoints[endpoint] = {
+                    'requests': len(durations),
+                    'throughput_rps': round(len(durations) / elapsed, 2),
+                    'p50_ms': round(percentile(durations, 0.50), 2),
+                    'p95_ms': round(percentile(durations, 0.95), 2),
+                    'p99_ms': round(percentile(durations, 0.99), 2),
+                    'error_rate': round(stats['errors'] / len(durations), 4),
+                    'statuses': {str(status): count for status, count in stats['statuses'].items()}
+                }
+            total = sum(result['requests'] for result in endpoints.values())
+            errors = sum(stats['errors'] for stats in self.endpoints.values())
+            delays = sorted(self.arrival_delays)
+            return {
+                'elapsed_s': round(elapsed, 1),
+                'requests': total,
+                'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+                'error_rate': round(errors / total, 4) if total else 0,
+                'sessions': dict(self.sessions),
+                # Time sessions waited for a free worker; grows when the server cannot keep up
+                'arrival_delay_p95_ms': round(percentile(delays, 0.95), 2) if delays else None,
+                'endpoints': endpoints
+            }
+
+class ApiClient:
+    """
+    One keep-alive connection per worker, sending JSON like the app does
+    """
+    def __init__(self, base_url, recorder, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.recorder = recorder
+        self.timeout = timeout
+        self.connection = None
+
+    def _connect(self):
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, endpoint, body=None, params=None):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        headers = {'Accept-Encoding': 'gzip'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        if self.connection is None:
+            self._connect()
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+            self.connection.close()
+            self.connection = None
+            raise RequestFailed(f"{method} {path}: {e}")
+        self.recorder.record(endpoint, time.perf_counter() - start, status)
+
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        if status >= 400:
+            raise RequestFailed(f"{method} {path}: {status}")
+        return json.loads(data) if data else None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+class SessionRunner:
+    def __init__(self, client, rng, think_ms, created_workouts):
+        self.client = client
+        self.rng = rng
+        self.think_ms = think_ms
+        self.created_workouts = created_workouts
+
+    def think(self):
+        if self.think_ms:
+            time.sleep(self.rng.expovariate(1 / self.think_ms) / 1000)
+
+    def login(self, user_index):
+        result = self.client.request('POST', '/login', 'POST /login', {
+            'email': f"user{user_index}@{BENCH_EMAIL_DOMAIN}",
+            'password_hash': BENCH_PASSWORD
+        })
+        return result['user_id']
+
+    def browse(self, user_id):
+        # FeedService: first page, then one more page when the user scrolls
+        feed = self.client.request('GET', f'/feed/{user_id}', 'GET /feed/<user_id>', params={'limit': 20})
+        self.think()
+        if feed.get('next_cursor') and self.rng.random() < 0.5:
+            self.client.request('GET', f'/feed/{user_id}', 'GET /feed/<user_id>',
+                                params={'limit': 20, 'cursor': feed['next_cursor']})
+            self.think()
+
+        self.client.request('GET', f'/users/{user_id}', 'GET /users/<user_id>')
+        self.client.request('GET', f'/workouts/{user_id}', 'GET /workouts/<user_id>', params={'limit': 20})
+        self.think()
+        self.client.request('GET', '/leaderboard', 'GET /leaderboard')
+
+    def workout(self, user_id):
+        catalog = self.client.request('GET', '/exercises', 'GET /exercises')
+        started = self.client.request('POST', '/workouts', 'POST /workouts', {
+            'user_id': user_id, 'date': datetime.now().isoformat()
+        })
+        workout_id = started['workout_id']
+        self.created_workouts.append(workout_id)
+
+        volume = 0
+        for _ in range(self.rng.randint(3, 6)):
+            self.think()
+            exercise = self.rng.choice(catalog)
+            sets, reps, weight = self.rng.randint(2, 5), self.rng.randint(5, 12), self.rng.choice((20, 40, 60, 80, 100))
+            self.client.request('POST', '/exercises', 'POST /exercises', {
+                'workout_id': workout_id, 'exercise': exercise['name'], 'sets': sets, 'reps': reps, 'weight': weight
+            })
+            volume += sets * reps * weight
+
+        self.think()
+        self.client.request('PATCH', f'/workouts/{workout_id}', 'PATCH /workouts/<workout_id>', {
+            'name': 'Load test workout', 'notes': '', 'volume': volume, 'duration': self.rng.randint(1200, 4800)
+        })
+        self.client.request('GET', '/leaderboard', 'GET /leaderboard')
+
+    def run(self, kind, user_index):
+        user_id = self.login(user_index)
+        self.think()
+        getattr(self, kind)(user_id)
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, weight = part.split('=')
+        if kind not in ('browse', 'workout'):
+            raise argparse.ArgumentTypeError(f"Unknown session type {kind!r}")
+        mix[kind] = float(weight)
+    return mix
+
+class LoadTest:
+    def __init__(self, base_url, concurrency, rate, duration, mix, users, think_ms, seed):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.users = users
+        self.think_ms = think_ms
+        self.seed = seed
+
+        self.recorder = LoadRecorder()
+        self.created_workouts = []
+        # Open-loop arrivals queue here until a worker is free
+        self._arrivals = queue.Queue()
+        self._deadline = None
+
+    def _next_session(self, rng):
+        return rng.choices(self.kinds, self.weights)[0], rng.randrange(self.users)
+
+    def _worker(self, number):
+        rng = random.Random(self.seed * 1000 + number)
+        client = ApiClient(self.base_url, self.recorder)
+        runner = SessionRunner(client, rng, self.think_ms, self.created_workouts)
+        try:
+            while time.monotonic() < self._deadline:
+                arrival_delay = None
+                if self.rate:
+                    try:
+                        arrived_at, kind, user_index = self._arrivals.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    arrival_delay = time.monotonic() - arrived_at
+                else:
+                    kind, user_index = self._next_session(rng)
+
+                try:
+                    runner.run(kind, user_index)
+                    self.recorder.session_done(True, arrival_delay)
+                except (RequestFailed, KeyError, TypeError, ValueError):
+                    self.recorder.session_done(False, arrival_delay)
+        finally:
+            client.close()
+
+    def _arrival_loop(self):
+        rng = random.Random(self.seed)
+        next_arrival = time.monotonic()
+        while next_arrival < self._deadline:
+            delay = next_arrival - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._arrivals.put((time.monotonic(), *self._next_session(rng)))
+            next_arrival += rng.expovariate(self.rate)
+
+    def run(self):
+        started = time.monotonic()
+        self._deadline = started + self.duration
+        threads = [threading.Thread(target=self._worker, args=(n,), daemon=True) for n in range(self.concurrency)]
+        if self.rate:
+            threads.append(threading.Thread(target=self._arrival_loop, daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.recorder.report(time.monotonic() - started)
+
+    def cleanup(self):
+        client = ApiClient(self.base_url, LoadRecorder())
+        removed = 0
+        for workout_id in self.created_workouts:
+            try:
+                client.request('DELETE', f'/workouts/{workout_id}', 'DELETE /workouts/<workout_id>')
+                removed += 1
+            except RequestFailed as e:
+                print(f"Could not delete workout {workout_id}: {e}")
+        client.close()
+        print(f"Removed {removed} workouts created by the load test.")
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['elapsed_s']} s: {report['throughput_rps']} req/s, "
+          f"error rate {report['error_rate']:.2%}, sessions {report['sessions']}")
+    if report['arrival_delay_p95_ms'] is not None:
+        print(f"p95 wait for a free worker: {report['arrival_delay_p95_ms']} ms")
+    print(f"\n{'endpoint':<32} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for endpoint, result in report['endpoints'].items():
+        print(f"{endpoint:<32} {result['throughput_rps']:>8} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+              f"{result['p99_ms']:>9} {result['error_rate']:>8.2%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a mix of app sessions against a local API server.")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=8, help="Sessions in progress at once")
+    parser.add_argument('--rate', type=float, default=0, help="Session arrivals per second (0: closed loop)")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds to generate load for")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Default {DEFAULT_MIX}")
+    parser.add_argument('--users', type=int, default=BASE_USERS, help="Generated users to log in as")
+    parser.add_argument('--think-ms', type=float, default=200, help="Mean pause between a session's requests")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the report to this JSON file")
+    parser.add_argument('--keep-data', action='store_true', help="Keep the workouts created during the run")
+    args = parser.parse_args()
+
+    load_test = LoadTest(
+        args.url, args.concurrency, args.rate, args.duration, args.mix, args.users, args.think_ms, args.seed
+    )
+    mode = f"{args.rate} sessions/s" if args.rate else "closed loop"
+    print(f"Load test against {args.url}: {args.concurrency} workers, {mode}, {args.duration} s")
+    report = load_test.run()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Report written to {args.output}")
+
+    if not args.keep_data:
+        load_test.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Times DatabaseManager methods against the dataset from generate_data.py and records
+p50/p95/p99 latency and statements per call to a JSON baseline.
+
+Run from the backend directory:
+
+    python -m benchmarks.run_benchmarks --output benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+
+With --compare, the run exits with status 1 if any method's p95 grew by more than
+--max-regression (and by more than the noise floor) or if it issues more statements.
+
+To measure what prepared statements save in parsing and planning, record a baseline
+with --no-prepare and compare a normal run against it.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import analytics
+import query_log
+from cache import ResponseCache, NullCacheBackend
+from database_manager import DatabaseManager
+from benchmarks.common import BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, percentile
+
+# Differences below this many milliseconds are treated as noise when comparing
+NOISE_FLOOR_MS = 0.5
+
+class BenchmarkRecorder:
+    """
+    Collects per-call durations and statement counts by benchmark name
+    """
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, name, fn):
+        token = query_log.start()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        finally:
+            duration = time.perf_counter() - start
+            log = query_log.finish(token)
+        self.samples.setdefault(name, []).append((duration * 1000, log.count))
+        return result
+
+    def results(self):
+        results = {}
+        for name, samples in self.samples.items():
+            durations = sorted(duration for duration, _ in samples)
+            results[name] = {
+                'iterations': len(samples),
+                'mean_ms': round(sum(durations) / len(durations), 3),
+                'p50_ms': round(percentile(durations, 0.50), 3),
+                'p95_ms': round(percentile(durations, 0.95), 3),
+                'p99_ms': round(percentile(durations, 0.99), 3),
+                'queries': max(count for _, count in samples)
+            }
+        return results
+
+def pick_sample(db_manager, seed):
+    """
+    Representative generated users and rows to run the benchmarks on
+    """
+    connector = db_manager.connector
+    users = connector.execute_query("""
+        SELECT id, email, workout_count, followers_count
+        FROM users
+        WHERE email LIKE %s
+        ORDER BY workout_count, id
+    """, (f"%@{BENCH_EMAIL_DOMAIN}",), commit=False, fetch=True)
+    if len(users) < 2:
+        raise SystemExit("No generated dataset found; run python -m benchmarks.generate_data first.")
+
+    heavy = users[-1]
+    typical = users[len(users) // 2]
+    popular = max(users, key=lambda row: row[3])
+    workout = connector.execute_query("""
+        SELECT w.id FROM workouts w
+        WHERE w.user_id = %s AND EXISTS (SELECT 1 FROM exercises e WHERE e.workout_id = w.id)
+        ORDER BY w.date DESC
+        LIMIT 1
+    """, (heavy[0],), commit=False, fetch=True)
+    exercise = connector.execute_query("""
+        SELECT e.exercise FROM workouts w
+        JOIN exercises e ON e.workout_id = w.id
+        WHERE w.user_id = %s
+        GROUP BY e.exercise
+        ORDER BY COUNT(*) DESC, e.exercise
+        LIMIT 1
+    """, (heavy[0],), commit=False, fetch=True)
+
+    rng = random.Random(seed)
+    return {
+        'typical': str(typical[0]),
+        'typical_email': typical[1],
+        'heavy': str(heavy[0]),
+        'popular': str(popular[0]),
+        'workout_id': str(workout[0][0]) if workout else None,
+        'exercise': exercise[0][0] if exercise else None,
+        'user_ids': [str(row[0]) for row in rng.sample(users, min(50, len(users)))]
+    }
+
+def read_cases(db_manager, sample):
+    typical, heavy, popular = sample['typical'], sample['heavy'], sample['popular']
+    today = date.today()
+    week_ago = today - timedelta(days=7)
+
+    cases = [
+        ('get_user_id', lambda: db_manager.get_user_id(email=sample['typical_email'])),
+        ('get_user_profile', lambda: db_manager.get_user_profile(typical)),
+        ('get_profile_pictures[50]', lambda: db_manager.get_profile_pictures(sample['user_ids'])),
+        ('get_user_workouts[limit=20]', lambda: db_manager.get_user_workouts(heavy, 20)),
+        ('get_user_workouts[all]', lambda: db_manager.get_user_workouts(heavy)),
+        ('get_user_routines[limit=20]', lambda: db_manager.get_user_routines(heavy, 20)),
+        ('get_workout_details', lambda: db_manager.get_workout_details(sample['workout_id'])),
+        ('get_workout_exercises', lambda: db_manager.get_workout_exercises(sample['workout_id'])),
+        ('get_total_weight_lifted', lambda: db_manager.get_total_weight_lifted(heavy)),
+        ('get_measurements', lambda: db_manager.get_measurements(typical)),
+        ('get_exercise_list', lambda: db_manager.get_exercise_list(query='press')),
+        ('get_personal_records', lambda: db_manager.get_personal_records(heavy, sample['exercise'])),
+        ('get_followers[popular]', lambda: db_manager.get_followers(popular)),
+        ('get_following', lambda: db_manager.get_following(heavy)),
+        ('is_following', lambda: db_manager.is_following(typical, popular)),
+        ('get_workout_feed', lambda: db_manager.get_workout_feed(typical, 20, None, True)),
+        ('get_leaderboard', lambda: db_manager.get_leaderboard(10)),
+        ('get_leaderboard[7 days]', lambda: db_manager.get_leaderboard(10, week_ago.isoformat(), today.isoformat())),
+        ('get_user_ranking', lambda: db_manager.get_user_ranking(typical)),
+        ('get_user_rank_window', lambda: db_manager.get_user_rank_window(typical)),
+    ]
+    if analytics.available():
+        cases.append(('get_exercise_progress', lambda: db_manager.get_exercise_progress(heavy, sample['exercise'])))
+        cases.append(('get_measurement_series[100]', lambda: db_manager.get_measurement_series(heavy, max_points=100, window_days=7)))
+    return cases
+
+def slow_cases(db_manager, sample):
+    # Whole-table or CPU-bound work, run for a tenth of the iterations
+    return [
+        ('update_leaderboard[dry_run]', lambda: db_manager.update_leaderboard(dry_run=True)),
+        ('update_leaderboard', lambda: db_manager.update_leaderboard()),
+        ('user_login', lambda: db_manager.user_login(sample['typical_email'], BENCH_PASSWORD)),
+    ]
+
+def run_write_session(recorder, db_manager, sample):
+    """
+    One workout logged and removed again, plus a follow and unfollow, timing each call.
+    Leaves the dataset as it found it.
+    """
+    user_id, other_id = sample['typical'], sample['heavy']
+    now = datetime.now().replace(microsecond=0)
+
+    workout_id = recorder.measure('start_workout', lambda: db_manager.start_workout(user_id, now, "Benchmark"))
+    exercise_id = recorder.measure(
+        'add_exercise', lambda: db_manager.add_exercise(workout_id, 'Bench Press', 3, 8, 60)
+    )['exercise_id']
+    recorder.measure('add_exercises[5]', lambda: db_manager.add_exercises(workout_id, [
+        {'exercise': 'Squat', 'sets': 3, 'reps': 5, 'weight': 100 + i * 2.5} for i in range(5)
+    ]))
+    recorder.measure('update_exercise', lambda: db_manager.update_exercise(exercise_id, reps=10))
+    recorder.measure('update_workout', lambda: db_manager.update_workout(workout_id, duration=45, volume=1440))
+    recorder.measure('delete_exercise', lambda: db_manager.delete_exercise(exercise_id))
+    recorder.measure('delete_workout', lambda: db_manager.delete_workout(workout_id))
+
+    if not db_manager.is_following(user_id, other_id):
+        recorder.measure('follow_user', lambda: db_manager.follow_user(user_id, other_id))
+        recorder.measure('unfollow_user', lambda: db_manager.unfollow_user(user_id, other_id))
+
+def run(db_manager, iterations, warmup, seed):
+    sample = pick_sample(db_manager, seed)
+    recorder = BenchmarkRecorder()
+    slow_iterations = max(3, iterations // 10)
+
+    for name, fn in read_cases(db_manager, sample):
+        for _ in range(warmup):
+            fn()
+        for _ in range(iterations):
+            recorder.measure(name, fn)
+        print(f"  {name}: done")
+
+    for name, fn in slow_cases(db_manager, sample):
+        fn()
+        for _ in range(slow_iterations):
+            recorder.measure(name, fn)
+        print(f"  {name}: done")
+
+    for _ in range(slow_iterations):
+        run_write_session(recorder, db_manager, sample)
+    print("  write session: done")
+
+    return recorder.results()
+
+def environment(db_manager):
+    connector = db_manager.connector
+    counts = connector.execute_query("""
+        SELECT
+            (SELECT COUNT(*) FROM users),
+            (SELECT COUNT(*) FROM user_follows),
+            (SELECT COUNT(*) FROM workouts),
+            (SELECT COUNT(*) FROM exercises)
+    """, commit=False, fetch=True)[0]
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'database': connector.server_version(),
+        'rows': dict(zip(('users', 'user_follows', 'workouts', 'exercises'), counts))
+    }
+
+def compare(results, baseline, max_regression):
+    """
+    Print current against baseline p95 and return the names that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':<32} {'base p95':>10} {'p95':>10} {'ratio':>7} {'queries':>9}")
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<32} {'-':>10} {current['p95_ms']:>10.3f} {'new':>7} {current['queries']:>9}")
+            continue
+
+        ratio = current['p95_ms'] / previous['p95_ms'] if previous['p95_ms'] else 1.0
+        slower = ratio > max_regression and current['p95_ms'] - previous['p95_ms'] > NOISE_FLOOR_MS
+        more_queries = current['queries'] > previous['queries']
+        flag = " <-- regression" if slower or more_queries else ""
+        queries = f"{previous['queries']}->{current['queries']}" if more_queries else str(current['queries'])
+        print(f"{name:<32} {previous['p95_ms']:>10.3f} {current['p95_ms']:>10.3f} {ratio:>7.2f} {queries:>9}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseManager methods.")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache', action='store_true', help="Keep the response cache on (off by default)")
+    parser.add_argument('--no-prepare', action='store_true', help="Send the full SQL text instead of prepared statements")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file to compare against")
+    parser.add_argument('--max-regression', type=float, default=1.25, help="Allowed p95 ratio over the baseline")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    if not args.cache:
+        # Measure the database path, not cache hits
+        db_manager.cache = ResponseCache(NullCacheBackend())
+    # Engines without server-side prepared statements (SQLite) always run plain SQL
+    connector = db_manager.connector
+    connector.statements.enabled = connector.engine.supports_prepare and not args.no_prepare
+
+    try:
+        print("Running benchmarks:")
+        results = run(db_manager, args.iterations, args.warmup, args.seed)
+        report = {
+            'environment': environment(db_manager),
+            'cache': args.cache,
+            'prepared_statements': connector.statements.enabled,
+            'results': results
+        }
+    finally:
+        db_manager.password_hasher.shutdown()
+        db_manager.connector.close()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline.get('prepared_statements', False) != report['prepared_statements']:
+            print(f"\nBaseline prepared statements: {baseline.get('prepared_statements', False)}, "
+                  f"this run: {report['prepared_statements']}")
+        regressions = compare(results, baseline['results'], args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, result in sorted(results.items()):
+            print(f"{name:<32} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+                  f"p99 {result['p99_ms']:>9.3f} ms  {result['queries']} queries")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+import datetime
+import decimal
+import functools
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Cached read scopes, invalidated per user by the writes that change them
+PROFILE = 'profile'
+WORKOUTS = 'workouts'
+ROUTINES = 'routines'
+FOLLOWERS = 'followers'
+FOLLOWING = 'following'
+PROGRESS = 'progress'
+
+# Routines are workouts flagged routine = 1 and progress is computed from exercises,
+# so every workout or exercise write touches all three
+WORKOUT_SCOPES = (WORKOUTS, ROUTINES, PROGRESS)
+ALL_SCOPES = (PROFILE, WORKOUTS, ROUTINES, FOLLOWERS, FOLLOWING, PROGRESS)
+
+# Marks values JSON has no type for, e.g. {"__cache_type__": "date", "value": "2024-05-01"}
+TYPE_TAG = '__cache_type__'
+
+_TAGGED_TYPES = {
+    'datetime': (datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    'date': (datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    'time': (datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    'timedelta': (datetime.timedelta, datetime.timedelta.total_seconds, lambda seconds: datetime.timedelta(seconds=seconds)),
+    'decimal': (decimal.Decimal, str, decimal.Decimal),
+    'uuid': (uuid.UUID, str, uuid.UUID)
+}
+
+def _tag(value):
+    """
+    Rewrite a cached value into plain JSON types, tagging the ones JSON would lose:
+    dates and times, decimals, UUIDs, tuples (database rows) and dicts with non-string keys
+    """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, list):
+        return [_tag(item) for item in value]
+    if isinstance(value, tuple):
+        return {TYPE_TAG: 'tuple', 'value': [_tag(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _tag(item) for key, item in value.items()}
+        return {TYPE_TAG: 'dict', 'value': [[_tag(key), _tag(item)] for key, item in value.items()]}
+    # datetime is checked before date, which it subclasses
+    for name, (kind, encode, _) in _TAGGED_TYPES.items():
+        if isinstance(value, kind):
+            return {TYPE_TAG: name, 'value': encode(value)}
+    raise TypeError(f"Cannot cache a value of type {type(value).__name__}")
+
+def _untag(obj):
+    tag = obj.get(TYPE_TAG)
+    if tag is None:
+        return obj
+    if tag == 'tuple':
+        return tuple(obj['value'])
+    if tag == 'dict':
+        # Inner values are decoded before this hook runs, so tuple keys are hashable again
+        return {key: item for key, item in obj['value']}
+    return _TAGGED_TYPES[tag][2](obj['value'])
+
+def dumps(value):
+    return json.dumps(_tag(value), separators=(',', ':'))
+
+def loads(data):
+    return json.loads(data, object_hook=_untag)
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store with a per-entry TTL, bounded to max_entries keys.
+    Values are returned as stored, so callers must not modify them.
+
+    Each process keeps its own entries and only sees its own invalidations, so
+    with several API processes a write made through one can leave the others
+    serving the old result until its TTL runs out; use the redis backend there.
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now >= entry[1]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value, ttl):
+        """
+        Store value only if key is absent; returns the value now stored
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                return entry[0]
+        self.set(key, value, ttl)
+        return value
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def size(self):
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """
+    Store on any server speaking the Redis protocol, shared by every API process.
+    Entry size and eviction are left to the server's maxmemory policy. Values are
+    stored as tagged JSON, so nothing read back from the server is unpickled.
+    """
+    def __init__(self, url='redis://localhost:6379/0', client=None):
+        if client is None and redis is None:
+            raise ImportError("The redis package is required for the redis cache backend.")
+        self.client = client or redis.Redis.from_url(url)
+
+    def get(self, key):
+        data = self.client.get(key)
+        return None if data is None else loads(data)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, dumps(value), px=int(ttl * 1000))
+
+    def add(self, key, value, ttl):
+        if self.client.set(key, dumps(value), px=int(ttl * 1000), nx=True):
+            return value
+        # Another process stored it first
+        return self.get(key) or value
+
+    def delete(self, keys):
+        keys = list(keys)
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        return self.client.dbsize()
+
+class NullCacheBackend:
+    """
+    Stores nothing, so every read goes to the database (used by the benchmarks)
+    """
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def add(self, key, value, ttl):
+        return value
+
+    def delete(self, keys):
+        pass
+
+    def size(self):
+        return 0
+
+class ResponseCache:
+    """
+    Caches DatabaseManager reads per (scope, user) in a pluggable backend.
+
+    Every (scope, user) pair has a generation token that is part of the keys of
+    its entries. Invalidating drops the token, so all pages and variants cached
+    for that user and scope are missed at once and age out of the backend on
+    their own. A read that raced with a write stores its result under the old
+    token, where no later read will look.
+    """
+    def __init__(self, backend=None, ttl=60, namespace='fitt'):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.namespace = namespace
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._errors = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _generation_key(self, scope, user_id):
+        return f"{self.namespace}:gen:{scope}:{user_id}"
+
+    def _generation(self, scope, user_id):
+        key = self._generation_key(scope, user_id)
+        return self.backend.get(key) or self.backend.add(key, uuid.uuid4().hex, self.ttl)
+
+    def get_or_load(self, scope, user_id, variant, load):
+        """
+        Return the cached result of a read, or run load() and cache what it returns.
+        None results (failed reads) are never cached.
+        """
+        try:
+            key = f"{self.namespace}:{scope}:{user_id}:{self._generation(scope, user_id)}:{variant!r}"
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"Cache error, reading from the database: {e}")
+            self._count('_errors')
+            return load()
+
+        if value is not None:
+            self._count('_hits')
+            return value
+
+        self._count('_misses')
+        value = load()
+        if value is not None:
+            try:
+                self.backend.set(key, value, self.ttl)
+            except Exception as e:
+                print(f"Cache error, result not stored: {e}")
+                self._count('_errors')
+        return value
+
+    def invalidate(self, scopes, *user_ids):
+        """
+        Drop everything cached for the given scopes of each user
+        """
+        keys = [self._generation_key(scope, user_id) for user_id in set(map(str, user_ids)) for scope in scopes]
+        if not keys:
+            return
+        try:
+            self.backend.delete(keys)
+            with self._stats_lock:
+                self._invalidations += len(keys)
+        except Exception as e:
+            # Entries still expire after ttl seconds
+            print(f"Cache error, could not invalidate {keys}: {e}")
+            self._count('_errors')
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            stats = {
+                'backend': type(self.backend).__name__,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'errors': self._errors
+            }
+        try:
+            stats['size'] = self.backend.size()
+        except Exception:
+            stats['size'] = None
+        return stats
+
+def cached(scope):
+    """
+    Serve a DatabaseManager read taking user_id as its first argument from self.cache
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, user_id, *args, **kwargs):
+            variant = (method.__name__, args, sorted(kwargs.items()))
+            return self.cache.get_or_load(scope, user_id, variant, lambda: method(self, user_id, *args, **kwargs))
+        return wrapper
+    return decorator
+
+def _load_cache_config():
+    try:
+        import config
+        return getattr(config, 'CACHE_CONFIG', {})
+    except ImportError:
+        return {}
+
+def create_cache():
+    """
+    Build the ResponseCache described by the optional CACHE_CONFIG dictionary in config.py
+    """
+    cache_config = _load_cache_config()
+    backend_name = cache_config.get('backend', 'memory')
+    if backend_name == 'redis':
+        backend = RedisCacheBackend(cache_config.get('redis_url', 'redis://localhost:6379/0'))
+    elif backend_name == 'none':
+        backend = NullCacheBackend()
+    else:
+        backend = MemoryCacheBackend(cache_config.get('max_entries', 10000))
+    return ResponseCache(backend, ttl=cache_config.get('ttl', 60))
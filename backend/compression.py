@@ -0,0 +1,45 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+def _encoders(gzip_level, brotli_quality):
+    encoders = {}
+    # Brotli first: clients accepting both get the smaller payload
+    if brotli is not None:
+        encoders['br'] = lambda data: brotli.compress(data, quality=brotli_quality)
+    encoders['gzip'] = lambda data: gzip.compress(data, compresslevel=gzip_level)
+    return encoders
+
+def compress_response(request, response, min_size=1024, gzip_level=6, brotli_quality=5):
+    """
+    Compress a response body with the best encoding the client accepts (br, then gzip).
+    Bodies below min_size bytes, streamed or already encoded responses, errors and
+    content types that do not compress well are sent as they are.
+    """
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    # The body now depends on the request's Accept-Encoding, so caches must key on it
+    response.vary.add('Accept-Encoding')
+
+    encoders = _encoders(gzip_level, brotli_quality)
+    encoding = request.accept_encodings.best_match(list(encoders))
+    if encoding is None:
+        return response
+
+    response.set_data(encoders[encoding](data))
+    response.headers['Content-Encoding'] = encoding
+    return response
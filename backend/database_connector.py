@@ -1,71 +1,353 @@
 from config import DB_CONFIG
-import psycopg2
+from contextlib import closing, contextmanager
+import threading
+import time
+from engines import create_engine
+from query_log import SlowQueryLogger
+from prepared_statements import StatementRegistry
+
+class PoolTimeoutError(Exception):
+    pass
+
+class ConnectionPool:
+    """
+    Thread-safe pool of connections opened by a database engine (see engines.py).
+
+    Connections are opened lazily up to max_size and handed out one per caller.
+    A connection that has been idle for longer than ping_after seconds is checked
+    with a cheap query before being handed out, and replaced if it has gone stale.
+    """
+    def __init__(self, engine, min_size=1, max_size=10, timeout=30, ping_after=30):
+        self.engine = engine
+        self._connect = engine.connect
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.ping_after = ping_after
+
+        self._idle = []  # (connection, last_returned) pairs, most recently used last
+        self._size = 0
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._reconnects = 0
+
+        for _ in range(min(min_size, self.max_size)):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_returned = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve a slot; the connection is opened outside the lock
+                    self._size += 1
+                    conn, last_returned = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(f"Timed out after {self.timeout}s waiting for a database connection.")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._checkouts += 1
+            if waited:
+                wait_time = time.monotonic() - start
+                self._waits += 1
+                self._wait_time += wait_time
+                self._max_wait = max(self._max_wait, wait_time)
+
+        if conn is None:
+            return self._open()
+
+        if self.engine.is_closed(conn) or (time.monotonic() - last_returned > self.ping_after and not self._ping(conn)):
+            self._close_quietly(conn)
+            with self._cond:
+                self._reconnects += 1
+            return self._open()
+
+        return conn
+
+    def putconn(self, conn, discard=False):
+        closed = self.engine.is_closed(conn)
+        if not discard and not closed:
+            try:
+                # Never hand an open transaction to the next caller
+                if self.engine.in_transaction(conn):
+                    conn.rollback()
+            except self.engine.Error:
+                discard = True
+
+        with self._cond:
+            if discard or closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': self._wait_time,
+                'wait_time_max': self._max_wait,
+                'timeouts': self._timeouts,
+                'reconnects': self._reconnects
+            }
+
+    def closeall(self):
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(self._idle)
+            self._idle = []
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _open(self):
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _ping(self, conn):
+        try:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except self.engine.Error:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except self.engine.Error:
+            pass
+
+def _run_statement(engine, cursor, query, params, fetch, hooks, statement=None):
+    start = time.perf_counter()
+    if statement is not None:
+        statement.execute(cursor, params)
+    else:
+        cursor.execute(*engine.translate(query, params))
+    result = cursor.fetchall() if fetch else None
+    duration = time.perf_counter() - start
+
+    for hook in hooks:
+        try:
+            hook(query, params, duration, cursor.rowcount)
+        except Exception as e:
+            print(f"Query hook failed: {e}")
+    return result
+
+class Transaction:
+    """
+    Statement runner handed out by DatabaseConnector.transaction(); statements share
+    one connection and are committed or rolled back together.
+    """
+    def __init__(self, conn, engine, hooks=(), statements=None):
+        self.connection = conn
+        self.engine = engine
+        self.hooks = hooks
+        self.statements = statements
+        self.commit_callbacks = []
+
+    def on_commit(self, callback):
+        """
+        Call callback() once the transaction has committed; nothing is called on rollback.
+        A callback registered several times runs once.
+        """
+        if callback not in self.commit_callbacks:
+            self.commit_callbacks.append(callback)
+
+    def execute_query(self, query, params=None, fetch=False, prepare=None):
+        statement = self.statements.get(prepare, query) if prepare and self.statements else None
+        with closing(self.connection.cursor()) as cursor:
+            return _run_statement(self.engine, cursor, query, params, fetch, self.hooks, statement)
+
+    def execute_script(self, script):
+        """
+        Run several semicolon-separated statements without parameters, such as a migration file
+        """
+        with closing(self.connection.cursor()) as cursor:
+            self.engine.execute_script(cursor, script)
 
 class DatabaseConnector:
     def __init__(self):
         self.db_config = DB_CONFIG
-        self.connection = None
-        self.cursor = None
+        self.engine = create_engine(self.db_config)
+        self.pool = None
+        # Called as hook(query, params, duration, rows) after every statement
+        self.query_hooks = [SlowQueryLogger(self.db_config.get('slow_query_ms', 200))]
+        self.statements = StatementRegistry(
+            self.db_config.get('prepared_statements', True), supported=self.engine.supports_prepare
+        )
         self.connect()
-    
+
     def connect(self):
-        self.connection = psycopg2.connect(
-            host=self.db_config['host'],
-            database=self.db_config['database'],
-            user=self.db_config['user'],
-            password=self.db_config['password']
+        self.pool = ConnectionPool(
+            self.engine,
+            min_size=self.db_config.get('pool_min_size', 1),
+            max_size=self.db_config.get('pool_max_size', 10),
+            timeout=self.db_config.get('pool_timeout', 30),
+            ping_after=self.db_config.get('pool_ping_after', 30)
         )
 
-        self.cursor = self.connection.cursor()
-
-        if self.connection:
-            print("Database connection established.")
+        if self.pool:
+            print("Database connection pool established.")
         else:
             print("Failed to connect to the database.")
 
-    def execute_query(self, query, params=None, commit=True, fetch=False):
-        if self.connection is None:
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out of the pool for the duration of the block.
+        Broken connections are dropped from the pool instead of being returned.
+        """
+        if self.pool is None:
             self.connect()
-        
+
+        conn = self.pool.getconn()
+        discard = False
         try:
-            self.cursor.execute(query, params)
-            
+            yield conn
+        except self.engine.connection_errors:
+            discard = self.engine.is_closed(conn)
+            raise
+        finally:
+            self.pool.putconn(conn, discard=discard)
+
+    def pool_stats(self):
+        return self.pool.stats() if self.pool else {}
+
+    def server_version(self):
+        with self.connection() as conn:
+            return self.engine.version(conn)
+
+    def execute_query(self, query, params=None, commit=True, fetch=False, prepare=None):
+        """
+        Run one statement on a pooled connection. With prepare, the query is
+        registered under that name and run as a server-side prepared statement.
+        """
+        statement = self.statements.get(prepare, query) if prepare else None
+        # Reads can be retried on a fresh connection; writes are not, as they may have been applied
+        attempts = 1 if commit else 2
+
+        for attempt in range(attempts):
+            try:
+                with self.connection() as conn, self.engine.writer(commit):
+                    return self._execute(conn, query, params, commit, fetch, statement)
+            except self.engine.connection_errors as e:
+                if attempt + 1 < attempts:
+                    print(f"Connection error, retrying on a fresh connection: {e}")
+                    continue
+                print(f"Database error occurred: {e}")
+                raise ValueError("A database error occurred during the query execution.")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several statements on one connection and commit them together.
+        Everything is rolled back if the block raises.
+        """
+        with self.connection() as conn, self.engine.writer(True):
+            try:
+                self.engine.begin(conn)
+                tx = Transaction(conn, self.engine, self.query_hooks, self.statements)
+                yield tx
+                conn.commit()
+            except self.engine.connection_errors as e:
+                print(f"Database error occurred: {e}")
+                raise ValueError("A database error occurred during the query execution.") from e
+            except Exception as e:
+                conn.rollback()
+                if isinstance(e, self.engine.lost_statement_errors):
+                    # Earlier statements of the transaction may have been applied, so it is not
+                    # retried; the next use of this connection prepares again
+                    self.statements.forget(conn)
+                raise self._translate_error(e)
+
+        # Run once the writes are visible to other connections
+        for callback in tx.commit_callbacks:
+            callback()
+
+    def _execute(self, conn, query, params, commit, fetch, statement=None, retry=True):
+        try:
+            with closing(conn.cursor()) as cursor:
+                result = _run_statement(self.engine, cursor, query, params, fetch, self.query_hooks, statement)
+
             if commit:
-                self.connection.commit()
-            
-            if fetch:
-                return self.cursor.fetchall()
+                conn.commit()
+
+            return result
 
-        except psycopg2.errors.UniqueViolation as e:
+        except self.engine.connection_errors:
+            # Connection-level failure; handled by the caller
+            raise
+
+        except self.engine.lost_statement_errors as e:
+            # The session lost its prepared statements (DISCARD ALL, or a proxy moved
+            # us to another server connection); the statement never ran, so prepare again
+            conn.rollback()
+            self.statements.forget(conn)
+            if retry:
+                return self._execute(conn, query, params, commit, fetch, statement, retry=False)
+            raise self._translate_error(e)
+
+        except Exception as e:
+            conn.rollback()
+            raise self._translate_error(e)
+
+    def _translate_error(self, e):
+        kind = self.engine.error_kind(e)
+        if kind == 'unique':
             print(f"Unique violation error: {e}")
-            self.connection.rollback()
-            raise ValueError("Duplicate value error: A unique constraint has been violated.")
-        
-        except psycopg2.errors.ForeignKeyViolation as e:
+            return ValueError("Duplicate value error: A unique constraint has been violated.")
+
+        if kind == 'foreign_key':
             print(f"Foreign key violation error: {e}")
-            self.connection.rollback()
-            raise ValueError("Foreign key constraint violation.")
-        
-        except psycopg2.errors.CheckViolation as e:
+            return ValueError("Foreign key constraint violation.")
+
+        if kind == 'check':
             print(f"Check constraint violation error: {e}")
-            self.connection.rollback()
-            raise ValueError("Check constraint violation.")
-        
-        except psycopg2.DatabaseError as e:
+            return ValueError("Check constraint violation.")
+
+        if kind == 'database':
             print(f"Database error occurred: {e}")
-            self.connection.rollback()
-            raise ValueError("A database error occurred during the query execution.")
-        
-        except Exception as e:
-            # Catch any other errors
-            print(f"An unexpected error occurred: {e}")
-            self.connection.rollback()
-            raise e
+            return ValueError("A database error occurred during the query execution.")
+
+        # Any other error is passed through unchanged
+        print(f"An unexpected error occurred: {e}")
+        return e
 
 
     def close(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-            print("Database connection closed.")
\ No newline at end of file
+        if self.pool:
+            self.pool.closeall()
+            print("Database connection pool closed.")
@@ -1,15 +1,114 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
 from database_connector import DatabaseConnector
 from s3_manager import S3Manager
-import os, json
-from passlib.context import CryptContext
+from thumbnails import ThumbnailPipeline, thumbnail_key, pick_size
+from exercise_catalog import ExerciseCatalog
+from rank_service import RankService
+import os, re, json, base64
+from password_hasher import PasswordHasher, HasherBusyError
+from cache import create_cache, cached, PROFILE, WORKOUTS, ROUTINES, FOLLOWERS, FOLLOWING, PROGRESS, WORKOUT_SCOPES, ALL_SCOPES
+import analytics
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Rows per INSERT when personal records are rebuilt in bulk
+RECORD_BATCH_SIZE = 500
+
+def _encode_cursor(date, workout_id):
+    """
+    Encode a (date, id) keyset position into an opaque, URL-safe cursor string
+    """
+    date_str = date.isoformat() if hasattr(date, 'isoformat') else str(date)
+    raw = json.dumps([date_str, str(workout_id)])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """
+    Decode a cursor produced by _encode_cursor back into (date, id)
+    """
+    try:
+        date_str, workout_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        # A datetime compares correctly on every engine; SQLite stores dates as text
+        return datetime.fromisoformat(date_str), workout_id
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor.")
+
+def _is_day_bound(value):
+    """
+    True for a missing bound or one that names a whole day (a date or 'YYYY-MM-DD')
+    """
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return True
+    return isinstance(value, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value) is not None
+
+def _as_datetime(value):
+    """
+    A datetime for a datetime, a date (its midnight) or an ISO 8601 string
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(value)
+
+def _record_value(metric, value):
+    """
+    A personal record value as returned to callers: whole reps, otherwise a float
+    """
+    if value is None:
+        return None
+    return int(value) if metric == 'reps' else float(value)
+
+def _picture_sizes(value):
+    """
+    Thumbnail sizes from the profile_picture_sizes column ('64,256,1024'), empty when none are stored
+    """
+    return [int(size) for size in value.split(',')] if value else []
+
+def _group_workout_rows(rows):
+    """
+    Fold flat workout/exercise join rows into workout dictionaries with nested exercises,
+    preserving the order in which workouts first appear
+    """
+    workouts = {}
+    for row in rows:
+        workout_id = row[0]
+        workout = workouts.get(workout_id)
+        if workout is None:
+            workout = {
+                'id': row[0],
+                'date': row[1],
+                'name': row[2],
+                'notes': row[3],
+                'user_id': row[4],
+                'user_name': row[5],
+                'profile_picture_url': row[6],
+                'profile_picture_sizes': _picture_sizes(row[15]),
+                'duration': row[7],
+                'volume': row[8],
+                'exercises': []
+            }
+            workouts[workout_id] = workout
+
+        # LEFT JOIN yields a NULL exercise for workouts without any logged exercises
+        if row[9] is not None:
+            workout['exercises'].append({
+                'id': row[9],
+                'exercise': row[10],
+                'sets': row[11],
+                'reps': row[12],
+                'weight': row[13],
+                'created_at': row[14]
+            })
+    return list(workouts.values())
 
 class DatabaseManager:
     def __init__(self):
         self.connector = DatabaseConnector()
+        self.exercise_catalog = ExerciseCatalog()
+        self.rank_service = RankService(self.connector)
+        self.password_hasher = PasswordHasher()
+        self.cache = create_cache()
 
     # User Management
 
@@ -18,14 +117,16 @@ class DatabaseManager:
             if email:
                 query = "SELECT id FROM users WHERE email = %s"
                 params = (email,)
+                statement = 'user_id_by_email'
             elif name:
                 query = "SELECT id FROM users WHERE name = %s"
                 params = (name,)
+                statement = 'user_id_by_name'
             else:
                 print("Either email or name must be provided.")
                 return None
             
-            result = self.connector.execute_query(query, params, commit=False, fetch=True)
+            result = self.connector.execute_query(query, params, commit=False, fetch=True, prepare=statement)
             if result and result[0][0]:
                 return result[0][0]
             return None
@@ -53,31 +154,44 @@ class DatabaseManager:
     def user_login(self, email, password_hash):
         try:
             query = "SELECT id, password_hash FROM users WHERE email = %s"
-            user_data = self.connector.execute_query(query, (email,), commit=False, fetch=True)
+            user_data = self.connector.execute_query(query, (email,), commit=False, fetch=True, prepare='user_login')
             
             if not user_data:
                 return None  # User not found
                 
             user_id, stored_hash = user_data[0]
             
-            if pwd_context.verify(password_hash, stored_hash):
-                return user_id
-            else:
+            valid, new_hash = self.password_hasher.verify(password_hash, stored_hash)
+            if not valid:
                 return None
+
+            if new_hash:
+                # Stored with an outdated bcrypt cost; upgrade while we have the plain password
+                try:
+                    self.connector.execute_query("UPDATE users SET password_hash = %s WHERE id = %s", (new_hash, user_id))
+                except Exception as e:
+                    print(f"Could not rehash password for user {user_id}: {e}")
+            return user_id
                 
+        except HasherBusyError:
+            raise
         except Exception as e:
             print(f"Login error: {e}")
             return None
 
 
+    @cached(PROFILE)
     def get_user_profile(self, user_id):
         try:
-            query = "SELECT name, fitness_level, profile_picture_url FROM users WHERE id = %s"
+            # Counters are maintained by the follow/workout writes, see reconcile_user_counters
+            query = """
+                SELECT name, fitness_level, profile_picture_url, following_count, followers_count, workout_count
+                FROM users
+                WHERE id = %s
+            """
             params = (user_id,)
-            result = self.connector.execute_query(query, params, commit=False, fetch=True)
-            social_info = (len(self.get_following(user_id)), len(self.get_followers(user_id)), len(self.get_user_workouts(user_id)))
-            result[0] = result[0] + social_info
-            return result
+            result = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='user_profile')
+            return result if result else None
         except Exception as e:
             print(f"An error occurred while fetching user profile for {user_id}: {e}")
             return None
@@ -108,6 +222,12 @@ class DatabaseManager:
             query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
             
             self.connector.execute_query(query, tuple(params))
+            if name is not None:
+                self._invalidate_displayed_user(user_id)
+                # Rank windows show names from the snapshot
+                self.rank_service.invalidate()
+            else:
+                self.cache.invalidate((PROFILE,), user_id)
             print(f"User {user_id} profile updated with the provided fields.")
         except Exception as e:
             print(f"An error occurred while updating user {user_id}: {e}")
@@ -115,9 +235,11 @@ class DatabaseManager:
 
     def update_profile_picture(self, user_id, profile_picture_key):
         try:
-            query = "UPDATE users SET profile_picture_url = %s WHERE id = %s"
+            # Thumbnails of the new picture are recorded once they are stored
+            query = "UPDATE users SET profile_picture_url = %s, profile_picture_sizes = NULL WHERE id = %s"
             params = (profile_picture_key, user_id)
             self.connector.execute_query(query, params)
+            self._invalidate_displayed_user(user_id)
             print(f"Profile picture updated for user {user_id}.")
             return True
         except Exception as e:
@@ -128,7 +250,7 @@ class DatabaseManager:
         try:
             query = "SELECT profile_picture_url FROM users WHERE id = %s"
             params = (user_id,)
-            result = self.connector.execute_query(query, params, commit=False, fetch=True)
+            result = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='profile_picture_key')
             
             if result and result[0][0]:
                 return result[0][0]
@@ -137,44 +259,151 @@ class DatabaseManager:
             print(f"An error occurred while fetching profile picture key for user {user_id}: {e}")
             return None
 
+    def get_profile_pictures(self, user_ids):
+        """
+        Several users' profile pictures in one query, as a dict of user ID to
+        (S3 key, list of stored thumbnail sizes); the key is None without a picture
+        """
+        try:
+            if not user_ids:
+                return {}
+            placeholders = ", ".join(["%s"] * len(user_ids))
+            query = f"SELECT id, profile_picture_url, profile_picture_sizes FROM users WHERE id IN ({placeholders})"
+            result = self.connector.execute_query(query, tuple(user_ids), commit=False, fetch=True)
+            return {str(row[0]): (row[1], _picture_sizes(row[2])) for row in result}
+        except Exception as e:
+            print(f"An error occurred while fetching profile pictures: {e}")
+            return None
+
+    def set_profile_picture_sizes(self, user_id, profile_picture_key, sizes):
+        """
+        Record the thumbnail sizes stored for a picture, unless the user has replaced
+        or removed it in the meantime
+
+        Returns:
+            bool: True if the sizes were recorded
+        """
+        try:
+            query = """
+                UPDATE users SET profile_picture_sizes = %s
+                WHERE id = %s AND profile_picture_url = %s
+                RETURNING id
+            """
+            params = (','.join(str(size) for size in sorted(sizes)), user_id, profile_picture_key)
+            updated = self.connector.execute_query(query, params, fetch=True)
+            if updated:
+                self._invalidate_displayed_user(user_id)
+            return bool(updated)
+        except Exception as e:
+            print(f"An error occurred while recording thumbnails for user {user_id}: {e}")
+            return False
+
     def clear_profile_picture(self, user_id):
         try:
-            query = "UPDATE users SET profile_picture_url = NULL WHERE id = %s"
+            query = "UPDATE users SET profile_picture_url = NULL, profile_picture_sizes = NULL WHERE id = %s"
             params = (user_id,)
             self.connector.execute_query(query, params)
+            self._invalidate_displayed_user(user_id)
             print(f"Profile picture removed for user {user_id}.")
             return True
         except Exception as e:
             print(f"An error occurred while clearing profile picture for user {user_id}: {e}")
             return False
 
+    def _invalidate_displayed_user(self, user_id):
+        """
+        Drop cached reads showing this user's name or picture: their own profile and workouts,
+        and the follower/following lists of everyone connected to them
+        """
+        self.cache.invalidate((PROFILE,) + WORKOUT_SCOPES, user_id)
+        try:
+            query = """
+                SELECT follower_id FROM user_follows WHERE following_id = %s
+                UNION
+                SELECT following_id FROM user_follows WHERE follower_id = %s
+            """
+            connected = self.connector.execute_query(query, (user_id, user_id), commit=False, fetch=True)
+            self.cache.invalidate((FOLLOWERS, FOLLOWING), *(row[0] for row in connected))
+        except Exception as e:
+            # Their lists still expire after the cache TTL
+            print(f"An error occurred while invalidating cached lists for user {user_id}: {e}")
+
     def delete_user(self, user_id):
         try:
-            query = "DELETE FROM users WHERE id = %s"
             params = (user_id,)
-            self.connector.execute_query(query, params)
+            with self.connector.transaction() as tx:
+                # The user's follow rows cascade away, so release them from the other side's counters first
+                followers = tx.execute_query("""
+                    UPDATE users SET following_count = following_count - 1
+                    WHERE id IN (SELECT follower_id FROM user_follows WHERE following_id = %s)
+                    RETURNING id
+                """, params, fetch=True)
+                following = tx.execute_query("""
+                    UPDATE users SET followers_count = followers_count - 1
+                    WHERE id IN (SELECT following_id FROM user_follows WHERE follower_id = %s)
+                    RETURNING id
+                """, params, fetch=True)
+                tx.execute_query("DELETE FROM users WHERE id = %s", params)
+                # The leaderboard row cascades with the user, shifting everyone ranked below them
+                tx.on_commit(self.rank_service.invalidate)
+            self.cache.invalidate(ALL_SCOPES, user_id)
+            self.cache.invalidate((PROFILE, FOLLOWING), *(row[0] for row in followers))
+            self.cache.invalidate((PROFILE, FOLLOWERS), *(row[0] for row in following))
             print(f"User {user_id} deleted.")
         except Exception as e:
             print(f"An error occurred while deleting user {user_id}: {e}")
             return
 
+    def reconcile_user_counters(self):
+        """
+        Recompute followers_count, following_count and workout_count from the source tables
+        and repair any users whose cached counters have drifted.
+
+        Returns:
+            list: UUIDs of the users that were repaired, or None if an error occurs
+        """
+        try:
+            query = """
+                WITH actual AS (
+                    SELECT
+                        u.id,
+                        (SELECT COUNT(*) FROM user_follows f WHERE f.following_id = u.id) AS followers_count,
+                        (SELECT COUNT(*) FROM user_follows f WHERE f.follower_id = u.id) AS following_count,
+                        (SELECT COUNT(*) FROM workouts w WHERE w.user_id = u.id) AS workout_count
+                    FROM users u
+                )
+                UPDATE users
+                SET
+                    followers_count = actual.followers_count,
+                    following_count = actual.following_count,
+                    workout_count = actual.workout_count
+                FROM actual
+                WHERE users.id = actual.id
+                  AND (users.followers_count <> actual.followers_count
+                       OR users.following_count <> actual.following_count
+                       OR users.workout_count <> actual.workout_count)
+                RETURNING users.id
+            """
+            repaired = self.connector.execute_query(query, fetch=True)
+            repaired = [row[0] for row in repaired]
+            self.cache.invalidate((PROFILE,), *repaired)
+            print(f"User counters reconciled, {len(repaired)} users repaired.")
+            return repaired
+        except Exception as e:
+            print(f"An error occurred while reconciling user counters: {e}")
+            return None
+
     # Workout Management
     
-    def get_exercise_list(self, category=None):
+    def get_exercise_catalog(self):
+        """
+        Current snapshot of the exercise catalog; its version changes whenever exercises.json does
+        """
+        return self.exercise_catalog.snapshot()
+
+    def get_exercise_list(self, category=None, query=None):
         try:
-            file_path = os.path.join(os.path.dirname(__file__), 'exercises.json')
-            
-            with open(file_path, 'r') as file:
-                data = json.load(file)
-            
-            exercises = data.get('exercises', [])
-            
-            if category:
-                exercises = [ex for ex in exercises if ex['category'] == category]
-            
-            exercises.sort(key=lambda x: (x['category'], x['name']))
-            
-            return exercises
+            return self.get_exercise_catalog().search(query, category)
 
         except Exception as e:
             print(f"Error loading exercise list: {e}")
@@ -188,7 +417,10 @@ class DatabaseManager:
                 VALUES (%s, %s, %s, %s, %s, %s)
             """
             params = (str(workout_id), user_id, date, name, notes, routine)
-            self.connector.execute_query(query, params)
+            with self.connector.transaction() as tx:
+                tx.execute_query(query, params)
+                tx.execute_query("UPDATE users SET workout_count = workout_count + 1 WHERE id = %s", (user_id,))
+            self.cache.invalidate((PROFILE,) + WORKOUT_SCOPES, user_id)
             print(f"Workout session started for user {user_id}.")
             return str(workout_id)
         except Exception as e:
@@ -196,20 +428,88 @@ class DatabaseManager:
             return None
 
     def add_exercise(self, workout_id, exercise, sets, reps, weight):
+        """
+        Returns:
+            dict: exercise_id of the created exercise and the personal_records it set
+                  (see _apply_personal_records), or None if an error occurs
+        """
         try:
             exercise_id = uuid.uuid4()
             query = """
                 INSERT INTO exercises (id, workout_id, exercise, sets, reps, weight)
                 VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING COALESCE(sets * reps * weight, 0)
             """
             params = (str(exercise_id), workout_id, exercise, sets, reps, weight)
-            self.connector.execute_query(query, params)
+            records = []
+            with self.connector.transaction() as tx:
+                workout = self._lock_workout(tx, workout_id)
+                volume = tx.execute_query(query, params, fetch=True)[0][0]
+                if workout:
+                    user_id, workout_date, had_exercises = workout
+                    self._apply_activity_delta(tx, user_id, workout_date, volume, 0 if had_exercises else 1)
+                    records = self._apply_personal_records(tx, user_id, exercise, [(str(exercise_id), reps, weight)])
+            if workout:
+                self.cache.invalidate(WORKOUT_SCOPES, workout[0])
             print(f"Exercise logged for workout {workout_id}.")
-            return str(exercise_id)
+            return {'exercise_id': str(exercise_id), 'personal_records': records}
         except Exception as e:
             print(f"An error occurred while logging exercise for workout {workout_id}: {e}")
             return None
 
+    def add_exercises(self, workout_id, exercises):
+        """
+        Log several exercises in a workout with a single multi-row INSERT in one transaction;
+        either all of them are stored or none are.
+
+        Args:
+            workout_id (str): UUID of the workout
+            exercises (list): Dicts with exercise, sets, reps and weight, in logging order
+
+        Returns:
+            list: UUIDs of the created exercises in the order given, or None if an error occurs
+        """
+        try:
+            if not exercises:
+                return []
+
+            exercise_ids = [str(uuid.uuid4()) for _ in exercises]
+            # Rows of one statement would otherwise share a created_at and lose their order
+            logged_at = datetime.now(timezone.utc)
+
+            params = []
+            for position, (exercise_id, item) in enumerate(zip(exercise_ids, exercises)):
+                params.extend([
+                    exercise_id, workout_id, item['exercise'], item['sets'], item['reps'], item['weight'],
+                    logged_at + timedelta(microseconds=position)
+                ])
+
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(exercises))
+            query = f"""
+                INSERT INTO exercises (id, workout_id, exercise, sets, reps, weight, created_at)
+                VALUES {values}
+                RETURNING COALESCE(sets * reps * weight, 0)
+            """
+            with self.connector.transaction() as tx:
+                workout = self._lock_workout(tx, workout_id)
+                volumes = tx.execute_query(query, tuple(params), fetch=True)
+                if workout:
+                    user_id, workout_date, had_exercises = workout
+                    volume = sum(row[0] for row in volumes)
+                    self._apply_activity_delta(tx, user_id, workout_date, volume, 0 if had_exercises else 1)
+                    logged = {}
+                    for exercise_id, item in zip(exercise_ids, exercises):
+                        logged.setdefault(item['exercise'], []).append((exercise_id, item['reps'], item['weight']))
+                    for exercise, sets in logged.items():
+                        self._apply_personal_records(tx, user_id, exercise, sets)
+            if workout:
+                self.cache.invalidate(WORKOUT_SCOPES, workout[0])
+            print(f"{len(exercise_ids)} exercises logged for workout {workout_id}.")
+            return exercise_ids
+        except Exception as e:
+            print(f"An error occurred while logging exercises for workout {workout_id}: {e}")
+            return None
+
     def get_workout_exercises(self, workout_id):
         try:
             query = """
@@ -219,7 +519,7 @@ class DatabaseManager:
                 ORDER BY created_at
             """
             params = (workout_id,)
-            exercises = self.connector.execute_query(query, params, commit=False, fetch=True)
+            exercises = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='workout_exercises')
             return exercises
         except Exception as e:
             print(f"An error occurred while fetching exercises for workout {workout_id}: {e}")
@@ -254,9 +554,24 @@ class DatabaseManager:
 
             query = f"""
                 UPDATE exercises SET {', '.join(columns_to_update)} WHERE id = %s
+                RETURNING COALESCE(sets * reps * weight, 0), exercise, reps, weight
             """
             
-            self.connector.execute_query(query, tuple(params))
+            with self.connector.transaction() as tx:
+                existing = self._lock_exercise_workout(tx, exercise_id)
+                held = self._records_held(tx, "e.id = %s", exercise_id)
+                updated = tx.execute_query(query, tuple(params), fetch=True)
+                if existing and updated:
+                    (user_id, workout_date, _), old_volume = existing
+                    new_volume, name, new_reps, new_weight = updated[0]
+                    self._apply_activity_delta(tx, user_id, workout_date, new_volume - old_volume, 0)
+                    # Records this exercise held may now belong to another one
+                    for holder_id, held_name in held:
+                        self._rebuild_personal_records(tx, holder_id, held_name)
+                    if (user_id, name) not in held:
+                        self._apply_personal_records(tx, user_id, name, [(exercise_id, new_reps, new_weight)])
+            if existing:
+                self.cache.invalidate(WORKOUT_SCOPES, existing[0][0])
             print(f"Exercise {exercise_id} updated.")
             return True
         except Exception as e:
@@ -265,46 +580,45 @@ class DatabaseManager:
 
     def delete_exercise(self, exercise_id):
         try:
-            query = "DELETE FROM exercises WHERE id = %s"
+            query = "DELETE FROM exercises WHERE id = %s RETURNING workout_id"
             params = (exercise_id,)
-            self.connector.execute_query(query, params)
+            with self.connector.transaction() as tx:
+                existing = self._lock_exercise_workout(tx, exercise_id)
+                # Read before the delete, which cascades to the records themselves
+                held = self._records_held(tx, "e.id = %s", exercise_id)
+                deleted = tx.execute_query(query, params, fetch=True)
+                if existing and deleted:
+                    (user_id, workout_date, _), old_volume = existing
+                    emptied = not self._workout_has_exercises(tx, deleted[0][0])
+                    self._apply_activity_delta(tx, user_id, workout_date, -old_volume, -1 if emptied else 0)
+                    if emptied:
+                        self._refresh_last_workout(tx, user_id, workout_date)
+                for holder_id, held_name in held:
+                    self._rebuild_personal_records(tx, holder_id, held_name)
+            if existing:
+                self.cache.invalidate(WORKOUT_SCOPES, existing[0][0])
             print(f"Exercise {exercise_id} deleted.")
             return True
         except Exception as e:
             print(f"An error occurred while deleting exercise {exercise_id}: {e}")
             return False
 
-    def get_user_workouts(self, user_id):
+    @cached(WORKOUTS)
+    def get_user_workouts(self, user_id, limit=None, before=None):
         try:
-            query = """
-                SELECT w.id
-                FROM workouts w
-                WHERE w.user_id = %s
-                GROUP BY w.id
-                ORDER BY w.date DESC
-            """
-            params = (user_id,)
-            workouts = self.connector.execute_query(query, params, commit=False, fetch=True)
-            workout_details = [self.get_workout_details(workout_ids[0]) for workout_ids in workouts]
-
-            return workout_details
+            items, next_cursor = self._fetch_workouts("w.user_id = %s", (user_id,), limit, before, prepare='user_workouts')
+            return {'items': items, 'next_cursor': next_cursor}
         except Exception as e:
             print(f"An error occurred while fetching workouts for user {user_id}: {e}")
             return None
 
-    def get_user_routines(self, user_id):
+    @cached(ROUTINES)
+    def get_user_routines(self, user_id, limit=None, before=None):
         try:
-            query = """
-                SELECT w.id
-                FROM workouts w
-                WHERE w.user_id = %s AND w.routine = 1
-                GROUP BY w.id
-                ORDER BY w.date DESC
-            """
-            params = (user_id,)
-            routines_list = self.connector.execute_query(query, params, commit=False, fetch=True)
-            routines = [self.get_workout_details(routine_id) for routine_id in routines_list]
-            return routines
+            items, next_cursor = self._fetch_workouts(
+                "w.user_id = %s AND w.routine = 1", (user_id,), limit, before, prepare='user_routines'
+            )
+            return {'items': items, 'next_cursor': next_cursor}
         
         except Exception as e:
             print(f"An error occurred while fetching routines for user {user_id}: {e}")
@@ -345,7 +659,19 @@ class DatabaseManager:
                 UPDATE workouts SET {', '.join(columns_to_update)} WHERE id = %s
             """
             
-            self.connector.execute_query(query, tuple(params))
+            with self.connector.transaction() as tx:
+                workout = self._lock_workout(tx, workout_id)
+                tx.execute_query(query, tuple(params))
+                # Moving a workout with exercises moves its activity to another day
+                if workout and date is not None and workout[2]:
+                    user_id, old_date, _ = workout
+                    volume = self._workout_volume(tx, workout_id)
+                    self._apply_activity_delta(tx, user_id, old_date, -volume, -1)
+                    self._refresh_last_workout(tx, user_id, old_date)
+                    self._apply_activity_delta(tx, user_id, date, volume, 1)
+                    self._refresh_last_workout(tx, user_id)
+            if workout:
+                self.cache.invalidate(WORKOUT_SCOPES, workout[0])
             print(f"Workout {workout_id} updated.")
             return True
             
@@ -355,9 +681,23 @@ class DatabaseManager:
 
     def delete_workout(self, workout_id):
         try:
-            query = "DELETE FROM workouts WHERE id = %s"
+            query = "DELETE FROM workouts WHERE id = %s RETURNING user_id"
             params = (workout_id,)
-            self.connector.execute_query(query, params)
+            with self.connector.transaction() as tx:
+                workout = self._lock_workout(tx, workout_id)
+                volume = self._workout_volume(tx, workout_id)
+                held = self._records_held(tx, "e.workout_id = %s", workout_id)
+                deleted = tx.execute_query(query, params, fetch=True)
+                if deleted:
+                    user_id = deleted[0][0]
+                    tx.execute_query("UPDATE users SET workout_count = workout_count - 1 WHERE id = %s", (user_id,))
+                    if workout and workout[2]:
+                        self._apply_activity_delta(tx, user_id, workout[1], -volume, -1)
+                        self._refresh_last_workout(tx, user_id, workout[1])
+                    for holder_id, held_name in held:
+                        self._rebuild_personal_records(tx, holder_id, held_name)
+            if deleted:
+                self.cache.invalidate((PROFILE,) + WORKOUT_SCOPES, deleted[0][0])
             print(f"Workout {workout_id} and all its exercises deleted.")
             return True
         except Exception as e:
@@ -394,16 +734,74 @@ class DatabaseManager:
             print(f"An error occurred while adding measurement for user {user_id}: {e}")
             return
 
-    def get_measurements(self, user_id):
+    def get_measurements(self, user_id, start=None, end=None):
+        """
+        A user's measurements, oldest first, optionally only those recorded from start
+        and up to end. A whole-day end ('YYYY-MM-DD') includes that day.
+
+        Returns:
+            list: (id, user_id, weight, bmi, body_fat_percentage, muscle_mass, date_recorded)
+                  tuples, or None if an error occurs
+        """
         try:
-            query = "SELECT * FROM measurements WHERE user_id = %s"
-            params = (user_id,)
-            measurements = self.connector.execute_query(query, params, commit=False, fetch=True)
+            conditions = ["user_id = %s"]
+            params = [user_id]
+            statement = 'measurements'
+            if start is not None:
+                conditions.append("date_recorded >= %s")
+                params.append(_as_datetime(start))
+                statement += '_from'
+            if end is not None and _is_day_bound(end):
+                conditions.append("date_recorded < %s")
+                params.append(_as_datetime(end) + timedelta(days=1))
+                statement += '_until'
+            elif end is not None:
+                conditions.append("date_recorded <= %s")
+                params.append(_as_datetime(end))
+                statement += '_to'
+            query = f"""
+                SELECT id, user_id, weight, bmi, body_fat_percentage, muscle_mass, date_recorded
+                FROM measurements
+                WHERE {' AND '.join(conditions)}
+                ORDER BY date_recorded
+            """
+            measurements = self.connector.execute_query(
+                query, tuple(params), commit=False, fetch=True, prepare=statement
+            )
             return measurements
         except Exception as e:
             print(f"An error occurred while fetching measurements for user {user_id}: {e}")
             return None
 
+    def get_measurement_series(self, user_id, start=None, end=None, max_points=None, method='lttb', window_days=None):
+        """
+        A user's measurements between start and end as a chart series of at most
+        max_points points, downsampled and averaged with NumPy (see analytics.measurement_series)
+
+        Args:
+            user_id (str): UUID of the user
+            start, end (datetime/date/str, optional): Range as for get_measurements
+            max_points (int, optional): Most points to return; all when None
+            method (str): 'lttb' or 'average'
+            window_days (int, optional): Trailing window of the weight and body fat moving averages
+
+        Returns:
+            dict: Points, the number of measurements in the range and the arguments used,
+                  or None if an error occurs
+        """
+        try:
+            start = _as_datetime(start) if start is not None else None
+            # Averages at the start of the range include the measurements just before it
+            fetch_start = start - timedelta(days=window_days) if start is not None and window_days else start
+            rows = self.get_measurements(user_id, fetch_start, end)
+            if rows is None:
+                return None
+            rows = [(row[0], row[2], row[3], row[4], row[5], row[6]) for row in rows]
+            return analytics.measurement_series(rows, start, max_points, method, window_days)
+        except Exception as e:
+            print(f"An error occurred while building the measurement series for user {user_id}: {e}")
+            return None
+
     def update_measurement(self, measurement_id, weight=None, bmi=None, body_fat_percentage=None, muscle_mass=None):
         try:
             columns_to_update = []
@@ -456,7 +854,7 @@ class DatabaseManager:
                 WHERE w.user_id = %s
             """
             params = (user_id,)
-            result = self.connector.execute_query(query, params, commit=False, fetch=True)
+            result = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='total_weight_lifted')
             if result and result[0][0] is not None:
                 return result[0][0]
             else:
@@ -465,12 +863,426 @@ class DatabaseManager:
             print(f"An error occurred while fetching total weight lifted for user {user_id}: {e}")
             return None
 
-    # Leaderboard Data Management
+    @cached(PROGRESS)
+    def get_exercise_progress(self, user_id, exercise, formula='epley', window_days=analytics.DEFAULT_WINDOW_DAYS):
+        """
+        Progress of one exercise for a user, computed with NumPy from the user's whole
+        history of it in one fetch (see analytics.exercise_progress)
 
-    def update_leaderboard(self):
+        Args:
+            user_id (str): UUID of the user
+            exercise (str): Exercise name as logged
+            formula (str): 'epley' or 'brzycki' for the estimated 1RM
+            window_days (int): Length of the trailing window for rolling volume
+
+        Returns:
+            dict: Sessions, weekly tonnage, records and best values, or None if an error occurs
+        """
         try:
             query = """
-            WITH leaderboard_data AS (
+                SELECT w.date, COALESCE(e.sets, 0), COALESCE(e.reps, 0), COALESCE(e.weight, 0)
+                FROM workouts w
+                JOIN exercises e ON e.workout_id = w.id
+                WHERE w.user_id = %s AND e.exercise = %s
+                ORDER BY w.date, e.created_at
+            """
+            rows = self.connector.execute_query(
+                query, (user_id, exercise), commit=False, fetch=True, prepare='exercise_history'
+            )
+            progress = analytics.exercise_progress(rows, formula, window_days)
+            progress['exercise'] = exercise
+            return progress
+        except Exception as e:
+            print(f"An error occurred while computing {exercise} progress for user {user_id}: {e}")
+            return None
+
+    # Personal Records
+
+    @cached(PROGRESS)
+    def get_personal_records(self, user_id, exercise=None):
+        """
+        A user's personal records, read from the personal_records table that the
+        exercise writes keep current
+
+        Args:
+            user_id (str): UUID of the user
+            exercise (str, optional): Only the records of this exercise
+
+        Returns:
+            list: Dicts with exercise, metric, at_weight (reps records only), value and the
+                  record set's reps, weight, exercise_id and date, or None if an error occurs
+        """
+        try:
+            conditions = ["pr.user_id = %s"]
+            params = [user_id]
+            if exercise is not None:
+                conditions.append("pr.exercise = %s")
+                params.append(exercise)
+            query = f"""
+                SELECT pr.exercise, pr.metric, pr.at_weight, pr.value, pr.reps, pr.weight, pr.exercise_id, w.date
+                FROM personal_records pr
+                JOIN exercises e ON e.id = pr.exercise_id
+                JOIN workouts w ON w.id = e.workout_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY pr.exercise, pr.metric, pr.at_weight
+            """
+            rows = self.connector.execute_query(
+                query, tuple(params), commit=False, fetch=True,
+                prepare='exercise_records' if exercise is not None else 'personal_records'
+            )
+            return [
+                {
+                    'exercise': row[0],
+                    'metric': row[1],
+                    'at_weight': float(row[2]) if row[1] == 'reps' else None,
+                    'value': _record_value(row[1], row[3]),
+                    'reps': row[4],
+                    'weight': float(row[5]) if row[5] is not None else None,
+                    'exercise_id': str(row[6]),
+                    'date': row[7]
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            print(f"An error occurred while fetching personal records for user {user_id}: {e}")
+            return None
+
+    def backfill_personal_records(self, user_id=None):
+        """
+        Rebuild personal records from every logged exercise, for all users or one.
+        The table is otherwise maintained by the exercise and workout writes; use this
+        to populate it for the first time or to repair it.
+
+        Returns:
+            int: Number of records written, or None if an error occurs
+        """
+        try:
+            user_filter = "WHERE w.user_id = %s" if user_id else ""
+            params = (user_id,) if user_id else ()
+            history_query = f"""
+                SELECT w.user_id, e.exercise, e.id, e.reps, e.weight
+                FROM workouts w
+                JOIN exercises e ON e.workout_id = w.id
+                {user_filter}
+                ORDER BY w.user_id, e.exercise, w.date, e.created_at
+            """
+            delete_query = "DELETE FROM personal_records" + (" WHERE user_id = %s" if user_id else "")
+
+            with self.connector.transaction() as tx:
+                history = tx.execute_query(history_query, params, fetch=True)
+                tx.execute_query(delete_query, params)
+                records = []
+                for (owner_id, exercise), rows in groupby(history, key=lambda row: (row[0], row[1])):
+                    best = analytics.best_records(row[2:] for row in rows)
+                    records.extend((owner_id, exercise, key, record) for key, record in best.items())
+                for start in range(0, len(records), RECORD_BATCH_SIZE):
+                    self._write_personal_records(tx, records[start:start + RECORD_BATCH_SIZE])
+
+            print(f"Personal records backfilled, {len(records)} records written.")
+            return len(records)
+        except Exception as e:
+            print(f"An error occurred while backfilling personal records: {e}")
+            return None
+
+    def _write_personal_records(self, tx, records):
+        """
+        Upsert (user_id, exercise, (metric, at_weight), (value, exercise_id, reps, weight))
+        records, replacing only records they beat.
+
+        Returns:
+            list: (exercise, metric, at_weight, value) of every record written
+        """
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(records))
+        params = []
+        for user_id, exercise, (metric, at_weight), (value, exercise_id, reps, weight) in records:
+            params.extend([user_id, exercise, metric, at_weight, value, reps, weight, exercise_id])
+        query = f"""
+            INSERT INTO personal_records (user_id, exercise, metric, at_weight, value, reps, weight, exercise_id)
+            VALUES {values}
+            ON CONFLICT (user_id, exercise, metric, at_weight) DO UPDATE
+            SET value = excluded.value, reps = excluded.reps, weight = excluded.weight, exercise_id = excluded.exercise_id
+            WHERE excluded.value > personal_records.value
+            RETURNING exercise, metric, at_weight, value
+        """
+        return tx.execute_query(query, tuple(params), fetch=True)
+
+    def _apply_personal_records(self, tx, user_id, exercise, sets):
+        """
+        Raise a user's records for one exercise to those the newly logged sets beat.
+        Only the user's current records for the exercise are read, never their history.
+
+        Args:
+            sets (list): (exercise_id, reps, weight) per logged exercise, in logging order
+
+        Returns:
+            list: Dicts with metric, at_weight (reps records only), value and previous
+                  (None for a first record) for each record the sets set
+        """
+        best = analytics.best_records(sets)
+        if not best:
+            return []
+        query = "SELECT metric, at_weight, value FROM personal_records WHERE user_id = %s AND exercise = %s"
+        current = {
+            (metric, float(at_weight)): float(value)
+            for metric, at_weight, value in tx.execute_query(
+                query, (user_id, exercise), fetch=True, prepare='current_records'
+            )
+        }
+        beaten = [
+            (user_id, exercise, key, record) for key, record in best.items()
+            if key not in current or record[0] > current[key]
+        ]
+        if not beaten:
+            return []
+
+        written = self._write_personal_records(tx, beaten)
+        return [
+            {
+                'metric': metric,
+                'at_weight': float(at_weight) if metric == 'reps' else None,
+                'value': _record_value(metric, value),
+                'previous': _record_value(metric, current.get((metric, float(at_weight))))
+            }
+            for _, metric, at_weight, value in written
+        ]
+
+    def _rebuild_personal_records(self, tx, user_id, exercise):
+        """
+        Recompute a user's records for one exercise from its history, after a set that
+        held one of them was edited or deleted
+        """
+        query = """
+            SELECT e.id, e.reps, e.weight
+            FROM workouts w
+            JOIN exercises e ON e.workout_id = w.id
+            WHERE w.user_id = %s AND e.exercise = %s
+            ORDER BY w.date, e.created_at
+        """
+        history = tx.execute_query(query, (user_id, exercise), fetch=True, prepare='exercise_record_history')
+        tx.execute_query("DELETE FROM personal_records WHERE user_id = %s AND exercise = %s", (user_id, exercise))
+        best = analytics.best_records(history)
+        if best:
+            self._write_personal_records(tx, [(user_id, exercise, key, record) for key, record in best.items()])
+
+    def _records_held(self, tx, condition, param):
+        """
+        (user_id, exercise) of every exercise whose personal records are held by the
+        exercises matching condition, a filter on exercises e
+        """
+        query = f"""
+            SELECT DISTINCT pr.user_id, pr.exercise
+            FROM personal_records pr
+            JOIN exercises e ON e.id = pr.exercise_id
+            WHERE {condition}
+        """
+        return [tuple(row) for row in tx.execute_query(query, (param,), fetch=True)]
+
+    # Leaderboard Data Management
+
+    def _lock_workout(self, tx, workout_id):
+        """
+        Lock a workout row for the rest of the transaction so concurrent exercise writes
+        see a consistent exercise count.
+
+        Returns:
+            tuple: (user_id, date, has_exercises), or None if the workout does not exist
+        """
+        query = """
+            SELECT w.user_id, w.date
+            FROM workouts w
+            WHERE w.id = %s
+            FOR UPDATE OF w
+        """
+        rows = tx.execute_query(query, (workout_id,), fetch=True, prepare='lock_workout')
+        if not rows:
+            return None
+        # Checked in a statement of its own once the lock is held. Under Postgres READ
+        # COMMITTED, a subquery in the locking statement reads the snapshot taken before
+        # it waited for the lock, so two writers adding the first exercise to an empty
+        # workout would both see none and count the workout twice. A new statement sees
+        # the exercises the previous lock holder committed.
+        user_id, workout_date = rows[0]
+        return user_id, workout_date, self._workout_has_exercises(tx, workout_id)
+
+    def _lock_exercise_workout(self, tx, exercise_id):
+        """
+        Lock the workout an exercise belongs to.
+
+        Returns:
+            tuple: ((user_id, date, has_exercises), current volume of the exercise), or None if not found
+        """
+        query = "SELECT workout_id FROM exercises WHERE id = %s"
+        rows = tx.execute_query(query, (exercise_id,), fetch=True, prepare='lock_exercise_workout')
+        if not rows:
+            return None
+        workout = self._lock_workout(tx, rows[0][0])
+        if not workout:
+            return None
+        # Read under the lock, so a concurrent edit of the same exercise is not counted twice
+        query = "SELECT COALESCE(sets * reps * weight, 0) FROM exercises WHERE id = %s"
+        volume = tx.execute_query(query, (exercise_id,), fetch=True, prepare='exercise_volume')
+        return (workout, volume[0][0]) if volume else None
+
+    def _workout_has_exercises(self, tx, workout_id):
+        query = "SELECT EXISTS (SELECT 1 FROM exercises WHERE workout_id = %s)"
+        return tx.execute_query(query, (workout_id,), fetch=True, prepare='workout_has_exercises')[0][0]
+
+    def _workout_volume(self, tx, workout_id):
+        query = "SELECT COALESCE(SUM(sets * reps * weight), 0) FROM exercises WHERE workout_id = %s"
+        return tx.execute_query(query, (workout_id,), fetch=True, prepare='workout_volume')[0][0]
+
+    def _apply_activity_delta(self, tx, user_id, workout_date, volume_delta, workout_delta):
+        """
+        Add an exercise write's change in volume and in counted workouts to the user's
+        leaderboard row and to their daily activity rollup for the workout's day.
+        Dates only move forward here; removals use _refresh_last_workout instead.
+        The rank snapshot is reloaded on its next read once the transaction commits.
+        """
+        if workout_date is not None:
+            # A client's raw string ('2024-01-03') would be stored as given on SQLite,
+            # unlike the canonical text workouts.date holds
+            workout_date = _as_datetime(workout_date)
+        leaderboard_query = """
+            INSERT INTO leaderboard (user_id, total_weight_lifted, workout_days_count, last_workout, updated_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id) DO UPDATE
+            SET
+                total_weight_lifted = leaderboard.total_weight_lifted + excluded.total_weight_lifted,
+                workout_days_count = leaderboard.workout_days_count + excluded.workout_days_count,
+                last_workout = CASE
+                    WHEN leaderboard.last_workout IS NULL OR excluded.last_workout > leaderboard.last_workout
+                    THEN COALESCE(excluded.last_workout, leaderboard.last_workout)
+                    ELSE leaderboard.last_workout
+                END,
+                updated_at = CURRENT_TIMESTAMP
+        """
+        tx.execute_query(
+            leaderboard_query, (user_id, volume_delta, workout_delta, workout_date), prepare='leaderboard_delta'
+        )
+        # After the commit, so a reload cannot read the totals from before this write
+        tx.on_commit(self.rank_service.invalidate)
+
+        if workout_date is None:
+            return
+
+        rollup_query = """
+            INSERT INTO user_daily_activity (user_id, day, volume, workout_count, last_workout_at)
+            VALUES (%s, DATE(%s), %s, %s, %s)
+            ON CONFLICT (user_id, day) DO UPDATE
+            SET
+                volume = user_daily_activity.volume + excluded.volume,
+                workout_count = user_daily_activity.workout_count + excluded.workout_count,
+                last_workout_at = CASE
+                    WHEN excluded.last_workout_at > user_daily_activity.last_workout_at
+                    THEN excluded.last_workout_at
+                    ELSE user_daily_activity.last_workout_at
+                END
+        """
+        tx.execute_query(rollup_query, (user_id, workout_date, volume_delta, workout_delta, workout_date))
+
+    def _refresh_last_workout(self, tx, user_id, workout_date=None):
+        """
+        Recompute the user's last workout date after a workout stopped counting, and,
+        when workout_date is given, the rollup row for that day
+        """
+        query = """
+            UPDATE leaderboard
+            SET
+                last_workout = (
+                    SELECT MAX(w.date)
+                    FROM workouts w
+                    WHERE w.user_id = %s
+                      AND EXISTS (SELECT 1 FROM exercises e WHERE e.workout_id = w.id)
+                ),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = %s
+        """
+        tx.execute_query(query, (user_id, user_id))
+
+        if workout_date is None:
+            return
+
+        tx.execute_query("""
+            DELETE FROM user_daily_activity
+            WHERE user_id = %s AND day = DATE(%s) AND workout_count <= 0
+        """, (user_id, workout_date))
+        tx.execute_query("""
+            UPDATE user_daily_activity
+            SET last_workout_at = (
+                SELECT MAX(w.date)
+                FROM workouts w
+                WHERE w.user_id = user_daily_activity.user_id
+                  AND DATE(w.date) = user_daily_activity.day
+                  AND EXISTS (SELECT 1 FROM exercises e WHERE e.workout_id = w.id)
+            )
+            WHERE user_id = %s AND day = DATE(%s)
+        """, (user_id, workout_date))
+
+    def backfill_daily_activity(self, start_date=None, end_date=None):
+        """
+        Rebuild the per-(user, day) activity rollup from workouts and exercises,
+        for every day or only for days between start_date and end_date (inclusive).
+
+        Returns:
+            int: Number of rollup rows written, or None if an error occurs
+        """
+        try:
+            day_filters = []
+            workout_filters = []
+            params = []
+            if start_date:
+                day_filters.append("day >= DATE(%s)")
+                workout_filters.append("DATE(w.date) >= DATE(%s)")
+                params.append(start_date)
+            if end_date:
+                day_filters.append("day <= DATE(%s)")
+                workout_filters.append("DATE(w.date) <= DATE(%s)")
+                params.append(end_date)
+
+            delete_query = "DELETE FROM user_daily_activity"
+            workout_filter = ""
+            if day_filters:
+                delete_query += " WHERE " + " AND ".join(day_filters)
+                workout_filter = "WHERE " + " AND ".join(workout_filters)
+
+            insert_query = f"""
+                INSERT INTO user_daily_activity (user_id, day, volume, workout_count, last_workout_at)
+                SELECT
+                    w.user_id,
+                    DATE(w.date),
+                    COALESCE(SUM(e.sets * e.reps * e.weight), 0),
+                    COUNT(DISTINCT w.id),
+                    MAX(w.date)
+                FROM workouts w
+                JOIN exercises e ON w.id = e.workout_id
+                {workout_filter}
+                GROUP BY w.user_id, DATE(w.date)
+                RETURNING user_id
+            """
+
+            with self.connector.transaction() as tx:
+                tx.execute_query(delete_query, tuple(params))
+                written = tx.execute_query(insert_query, tuple(params), fetch=True)
+
+            print(f"Daily activity rollup backfilled, {len(written)} rows written.")
+            return len(written)
+        except Exception as e:
+            print(f"An error occurred while backfilling daily activity: {e}")
+            return None
+
+    def update_leaderboard(self, dry_run=False):
+        """
+        Full rebuild of the leaderboard from workouts and exercises. The leaderboard is kept
+        current incrementally by the exercise and workout writes, so this is a verification
+        and repair path: it reports every row that differs from a recomputation and, unless
+        dry_run is set, rewrites the table.
+
+        Returns:
+            list: One dict per drifted user with 'user_id', 'expected' and 'actual' values,
+                  or None if an error occurs
+        """
+        try:
+            expected_query = """
                 SELECT 
                     w.user_id,
                     SUM(e.sets * e.reps * e.weight) AS total_weight_lifted,
@@ -479,7 +1291,24 @@ class DatabaseManager:
                 FROM workouts w
                 JOIN exercises e ON w.id = e.workout_id
                 GROUP BY w.user_id
-            )
+            """
+
+            drift_query = f"""
+            WITH leaderboard_data AS ({expected_query})
+            SELECT
+                COALESCE(d.user_id, l.user_id),
+                d.total_weight_lifted, d.workout_days_count, d.last_workout,
+                l.total_weight_lifted, l.workout_days_count, l.last_workout
+            FROM leaderboard_data d
+            FULL OUTER JOIN leaderboard l ON l.user_id = d.user_id
+            WHERE ABS(COALESCE(d.total_weight_lifted, 0) - COALESCE(l.total_weight_lifted, 0)) > 0.001
+               OR COALESCE(d.workout_days_count, 0) <> COALESCE(l.workout_days_count, 0)
+               OR d.last_workout IS DISTINCT FROM l.last_workout
+            """
+
+            # WHERE true lets SQLite tell the upsert's ON CONFLICT apart from a join constraint
+            rebuild_query = f"""
+            WITH leaderboard_data AS ({expected_query})
             
             INSERT INTO leaderboard (user_id, total_weight_lifted, workout_days_count, last_workout, updated_at)
             SELECT 
@@ -487,37 +1316,110 @@ class DatabaseManager:
                 total_weight_lifted, 
                 workout_days_count, 
                 last_workout, 
-                NOW()
+                CURRENT_TIMESTAMP
             FROM leaderboard_data
+            WHERE true
             ON CONFLICT (user_id) DO UPDATE
             SET 
                 total_weight_lifted = excluded.total_weight_lifted,
                 workout_days_count = excluded.workout_days_count,
                 last_workout = excluded.last_workout,
-                updated_at = NOW();
+                updated_at = CURRENT_TIMESTAMP;
             """
-            
-            self.connector.execute_query(query)
-            print("Leaderboard updated successfully.")
+
+            # Users whose exercises have all been removed keep an emptied row
+            clear_query = """
+            UPDATE leaderboard
+            SET total_weight_lifted = 0, workout_days_count = 0, last_workout = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id NOT IN (
+                SELECT w.user_id FROM workouts w JOIN exercises e ON w.id = e.workout_id
+            )
+            AND (total_weight_lifted <> 0 OR workout_days_count <> 0 OR last_workout IS NOT NULL)
+            """
+
+            with self.connector.transaction() as tx:
+                rows = tx.execute_query(drift_query, fetch=True)
+                if rows and not dry_run:
+                    tx.execute_query(rebuild_query)
+                    tx.execute_query(clear_query)
+
+            if rows and not dry_run:
+                self.rank_service.invalidate()
+
+            drift = [
+                {
+                    'user_id': row[0],
+                    'expected': {
+                        'total_weight_lifted': row[1] or 0,
+                        'workout_days_count': row[2] or 0,
+                        'last_workout': row[3]
+                    },
+                    'actual': {
+                        'total_weight_lifted': row[4],
+                        'workout_days_count': row[5],
+                        'last_workout': row[6]
+                    }
+                }
+                for row in rows
+            ]
+
+            if not drift:
+                print("Leaderboard verified, no drift found.")
+            elif dry_run:
+                print(f"Leaderboard verified, {len(drift)} rows differ.")
+            else:
+                print(f"Leaderboard updated successfully, {len(drift)} rows repaired.")
+            return drift
         except Exception as e:
             print(f"An error occurred while updating the leaderboard: {e}")
+            return None
 
     def get_leaderboard(self, limit=10, start_date=None, end_date=None):
         try:
-            if start_date or end_date:
+            if (start_date or end_date) and _is_day_bound(start_date) and _is_day_bound(end_date):
+                # Whole-day windows are answered from the daily activity rollup
+                params = []
+                day_filters = []
+                if start_date:
+                    day_filters.append("a.day >= DATE(%s)")
+                    params.append(start_date)
+                if end_date:
+                    day_filters.append("a.day <= DATE(%s)")
+                    params.append(end_date)
+                params.append(limit)
+
+                query = f"""
+                SELECT 
+                    u.name,
+                    SUM(a.volume) AS total_weight_lifted,
+                    SUM(a.workout_count) AS workout_days_count,
+                    MAX(a.last_workout_at) AS last_workout
+                FROM user_daily_activity a
+                JOIN users u ON a.user_id = u.id
+                WHERE {' AND '.join(day_filters)}
+                GROUP BY u.id, u.name
+                ORDER BY total_weight_lifted DESC
+                LIMIT %s
+                """
+
+                leaderboard = self.connector.execute_query(query, tuple(params), commit=False, fetch=True)
+                return leaderboard
+            elif start_date or end_date:
                 params = []
-                date_filter = ""
+                date_filters = []
                 
-                if start_date and end_date:
-                    date_filter = "WHERE w.date BETWEEN %s AND %s"
-                    params = [start_date, end_date]
-                elif start_date:
-                    date_filter = "WHERE w.date >= %s"
-                    params = [start_date]
+                if start_date:
+                    date_filters.append("w.date >= %s")
+                    params.append(_as_datetime(start_date))
+                if end_date and _is_day_bound(end_date):
+                    # A whole-day end bound includes that day, as in the rollup path
+                    date_filters.append("w.date < %s")
+                    params.append(_as_datetime(end_date) + timedelta(days=1))
                 elif end_date:
-                    date_filter = "WHERE w.date <= %s"
-                    params = [end_date]
+                    date_filters.append("w.date <= %s")
+                    params.append(_as_datetime(end_date))
                     
+                date_filter = f"WHERE {' AND '.join(date_filters)}"
                 params.append(limit)
                 
                 query = f"""
@@ -557,10 +1459,18 @@ class DatabaseManager:
             return None
     
     def get_user_ranking(self, user_id):
-        query = "SELECT rank() OVER (ORDER BY total_weight_lifted DESC) FROM leaderboard WHERE user_id = %s"
-        params = (user_id,)
-        result = self.connector.execute_query(query, params, commit=False, fetch=True)
-        return result[0][0] if result else None
+        try:
+            return self.rank_service.snapshot().rank(user_id)
+        except Exception as e:
+            print(f"An error occurred while fetching ranking for user {user_id}: {e}")
+            return None
+
+    def get_user_rank_window(self, user_id, window=5):
+        try:
+            return self.rank_service.snapshot().window(user_id, window)
+        except Exception as e:
+            print(f"An error occurred while fetching ranking window for user {user_id}: {e}")
+            return None
 
     # Social Management
 
@@ -575,7 +1485,12 @@ class DatabaseManager:
                 VALUES (%s, %s)
             """
             params = (follower_id, following_id)
-            self.connector.execute_query(query, params)
+            with self.connector.transaction() as tx:
+                tx.execute_query(query, params)
+                tx.execute_query("UPDATE users SET following_count = following_count + 1 WHERE id = %s", (follower_id,))
+                tx.execute_query("UPDATE users SET followers_count = followers_count + 1 WHERE id = %s", (following_id,))
+            self.cache.invalidate((PROFILE, FOLLOWING), follower_id)
+            self.cache.invalidate((PROFILE, FOLLOWERS), following_id)
             print(f"User {follower_id} is now following user {following_id}.")
             return True
         except Exception as e:
@@ -587,15 +1502,24 @@ class DatabaseManager:
             query = """
                 DELETE FROM user_follows
                 WHERE follower_id = %s AND following_id = %s
+                RETURNING follower_id
             """
             params = (follower_id, following_id)
-            self.connector.execute_query(query, params)
+            with self.connector.transaction() as tx:
+                deleted = tx.execute_query(query, params, fetch=True)
+                if deleted:
+                    tx.execute_query("UPDATE users SET following_count = following_count - 1 WHERE id = %s", (follower_id,))
+                    tx.execute_query("UPDATE users SET followers_count = followers_count - 1 WHERE id = %s", (following_id,))
+            if deleted:
+                self.cache.invalidate((PROFILE, FOLLOWING), follower_id)
+                self.cache.invalidate((PROFILE, FOLLOWERS), following_id)
             print(f"User {follower_id} has unfollowed user {following_id}.")
             return True
         except Exception as e:
             print(f"An error occurred while unfollowing user: {e}")
             return False
 
+    @cached(FOLLOWERS)
     def get_followers(self, user_id):
         try:
             query = """
@@ -606,12 +1530,13 @@ class DatabaseManager:
                 ORDER BY f.created_at DESC
             """
             params = (user_id,)
-            followers = self.connector.execute_query(query, params, commit=False, fetch=True)
+            followers = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='followers')
             return followers
         except Exception as e:
             print(f"An error occurred while fetching followers: {e}")
             return None
 
+    @cached(FOLLOWING)
     def get_following(self, user_id):
         try:
             query = """
@@ -622,7 +1547,7 @@ class DatabaseManager:
                 ORDER BY f.created_at DESC
             """
             params = (user_id,)
-            following = self.connector.execute_query(query, params, commit=False, fetch=True)
+            following = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='following')
             return following
         except Exception as e:
             print(f"An error occurred while fetching following: {e}")
@@ -637,64 +1562,96 @@ class DatabaseManager:
                 )
             """
             params = (follower_id, following_id)
-            result = self.connector.execute_query(query, params, commit=False, fetch=True)
-            return result[0][0] if result else False
+            result = self.connector.execute_query(query, params, commit=False, fetch=True, prepare='is_following')
+            return bool(result[0][0]) if result else False
         except Exception as e:
             print(f"An error occurred while checking follow status: {e}")
             return False
 
     # Feed Management
 
-    def get_workout_details(self, workout_id):
-        try:
-            # Get workout information
-            workout_query = """
-                SELECT w.id, w.date, w.name, w.notes, u.id AS user_id, u.name AS user_name, u.profile_picture_url, w.duration, w.volume
+    def _fetch_workouts(self, filter_sql, params, limit=None, cursor=None, prepare=None):
+        """
+        Fetch workouts matching filter_sql (on alias w) with their exercises nested, in one query.
+        Workouts are ordered newest first by (date, id); when limit is given, one extra row is
+        read to decide whether a next_cursor should be returned. With prepare, each shape of
+        the query (paged or not, with or without a cursor) is a prepared statement of its own.
+
+        Returns:
+            tuple: (list of workout dicts, next_cursor or None)
+        """
+        filters = [filter_sql]
+        page_params = list(params)
+
+        if cursor:
+            cursor_date, cursor_id = _decode_cursor(cursor)
+            filters.append("(w.date, w.id) < (%s, %s)")
+            page_params.extend([cursor_date, cursor_id])
+            if prepare:
+                prepare += '_after'
+
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            page_params.append(limit + 1)
+            if prepare:
+                prepare += '_page'
+
+        query = f"""
+            WITH page AS (
+                SELECT w.id, w.date, w.name, w.notes, w.user_id, w.duration, w.volume
                 FROM workouts w
-                JOIN users u ON w.user_id = u.id
-                WHERE w.id = %s
-            """
-            workout_params = (workout_id,)
-            workout_result = self.connector.execute_query(workout_query, workout_params, commit=False, fetch=True)
-            
-            if not workout_result:
-                return None
-            
-            # Get exercises for the workout
-            exercises_query = """
-                SELECT id, exercise, sets, reps, weight, created_at
-                FROM exercises
-                WHERE workout_id = %s
-                ORDER BY created_at
+                WHERE {' AND '.join(filters)}
+                ORDER BY w.date DESC, w.id DESC
+                {limit_clause}
+            )
+            SELECT p.id, p.date, p.name, p.notes, u.id, u.name, u.profile_picture_url, p.duration, p.volume,
+                   e.id, e.exercise, e.sets, e.reps, e.weight, e.created_at, u.profile_picture_sizes
+            FROM page p
+            JOIN users u ON p.user_id = u.id
+            LEFT JOIN exercises e ON e.workout_id = p.id
+            ORDER BY p.date DESC, p.id DESC, e.created_at
+        """
+        rows = self.connector.execute_query(query, tuple(page_params), commit=False, fetch=True, prepare=prepare)
+        workouts = _group_workout_rows(rows)
+
+        next_cursor = None
+        if limit is not None and len(workouts) > limit:
+            workouts = workouts[:limit]
+            last = workouts[-1]
+            next_cursor = _encode_cursor(last['date'], last['id'])
+
+        return workouts, next_cursor
+
+    def get_workout_feed(self, user_id, limit=20, cursor=None, include_viewed=True):
+        try:
+            filter_sql = """
+                (w.user_id = %s OR w.user_id IN (
+                    SELECT f.following_id FROM user_follows f WHERE f.follower_id = %s
+                ))
             """
-            exercises_params = (workout_id,)
-            exercises_result = self.connector.execute_query(exercises_query, exercises_params, commit=False, fetch=True)
-            
-            # Format the results
-            workout_info = {
-                'id': workout_result[0][0],
-                'date': workout_result[0][1],
-                'name': workout_result[0][2],
-                'notes': workout_result[0][3],
-                'user_id': workout_result[0][4],
-                'user_name': workout_result[0][5],
-                'profile_picture_url': workout_result[0][6],
-                'duration' : workout_result[0][7],
-                'volume' : workout_result[0][8],
-                'exercises': []
-            }
-            
-            for exercise in exercises_result:
-                workout_info['exercises'].append({
-                    'id': exercise[0],
-                    'exercise': exercise[1],
-                    'sets': exercise[2],
-                    'reps': exercise[3],
-                    'weight': exercise[4],
-                    'created_at': exercise[5]
-                })
-            
-            return workout_info
+            params = [user_id, user_id]
+
+            if not include_viewed:
+                filter_sql += """
+                AND NOT EXISTS (
+                    SELECT 1 FROM workout_views v
+                    WHERE v.workout_id = w.id AND v.viewer_id = %s
+                )
+                """
+                params.append(user_id)
+
+            statement = 'workout_feed' if include_viewed else 'workout_feed_unviewed'
+            items, next_cursor = self._fetch_workouts(filter_sql, params, limit, cursor, prepare=statement)
+            return {'items': items, 'next_cursor': next_cursor}
+        except Exception as e:
+            print(f"An error occurred while fetching the workout feed for user {user_id}: {e}")
+            return None
+
+    def get_workout_details(self, workout_id):
+        try:
+            workouts, _ = self._fetch_workouts("w.id = %s", (workout_id,), prepare='workout_details')
+            return workouts[0] if workouts else None
         except Exception as e:
             print(f"An error occurred while fetching workout details for {workout_id}: {e}")
             return None
@@ -715,22 +1672,47 @@ class DatabaseManager:
             return False
 
 class ProfilePictureHandler:
-    def __init__(self):
-        self.s3_manager = S3Manager()
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_manager=None, s3_manager=None):
+        # Share the caller's managers (and so its connection pool) when given
+        self.s3_manager = s3_manager or S3Manager()
+        self.db_manager = db_manager or DatabaseManager()
+        self.thumbnails = ThumbnailPipeline(self.s3_manager)
     
+    def _delete_stored_picture(self, s3_key):
+        # Thumbnails are removed alongside the original; missing ones are ignored
+        self.s3_manager.delete_objects(thumbnail_key(s3_key, size) for size in self.thumbnails.sizes)
+        return self.s3_manager.delete_profile_picture(s3_key)
+
+    def _sized_key(self, s3_key, sizes, size):
+        """
+        Key of the stored thumbnail best matching size, or the original while none are recorded
+        """
+        if not size or not sizes:
+            return s3_key
+        best = pick_size(size, sizes)
+        # Larger variants are skipped for small originals, which then match better than any thumbnail
+        if best < size and max(sizes) < max(self.thumbnails.sizes):
+            return s3_key
+        return thumbnail_key(s3_key, best)
+
     def upload_profile_picture(self, user_id, image_data, content_type):
         existing_key = self.db_manager.get_profile_picture_key(user_id)
         
         if existing_key:
-            self.s3_manager.delete_profile_picture(existing_key)
+            self._delete_stored_picture(existing_key)
         
         s3_key = self.s3_manager.upload_profile_picture(user_id, image_data, content_type)
         
-        if not s3_key:
+        if not s3_key or not self.db_manager.update_profile_picture(user_id, s3_key):
             return False
         
-        return self.db_manager.update_profile_picture(user_id, s3_key)
+        # Queued once the key is saved, so the stored sizes can be recorded against it.
+        # A streamed upload is no longer in memory, so the pipeline reads it back from S3.
+        self.thumbnails.submit(
+            s3_key, image_data if isinstance(image_data, bytes) else None,
+            on_stored=lambda sizes: self.db_manager.set_profile_picture_sizes(user_id, s3_key, sizes)
+        )
+        return True
     
     def get_profile_picture(self, user_id):
         s3_key = self.db_manager.get_profile_picture_key(user_id)
@@ -740,13 +1722,35 @@ class ProfilePictureHandler:
         
         return self.s3_manager.get_profile_picture_data(s3_key)
     
-    def get_profile_picture_url(self, user_id, expiration=3600):
-        s3_key = self.db_manager.get_profile_picture_key(user_id)
+    def get_profile_picture_url(self, user_id, expiration=3600, size=None):
+        pictures = self.db_manager.get_profile_pictures([user_id])
+        s3_key, sizes = (pictures or {}).get(str(user_id), (None, []))
         
         if not s3_key:
             return None
         
-        return self.s3_manager.get_profile_picture_url(s3_key, expiration)
+        return self.s3_manager.get_profile_picture_url(self._sized_key(s3_key, sizes, size), expiration)
+
+    def get_urls_for_pictures(self, pictures, expiration=3600, size=None):
+        """
+        Presigned URLs for stored pictures given as (S3 key, thumbnail sizes) pairs,
+        as a dict of original key to URL
+        """
+        sized_keys = {s3_key: self._sized_key(s3_key, sizes, size) for s3_key, sizes in pictures if s3_key}
+        urls = self.s3_manager.get_profile_picture_urls(sized_keys.values(), expiration)
+        return {s3_key: urls.get(sized_key) for s3_key, sized_key in sized_keys.items()}
+
+    def get_profile_picture_urls(self, user_ids, expiration=3600, size=None):
+        """
+        Presigned profile picture URLs for many users with one database query,
+        as a dict of user ID to URL (None for users without a picture)
+        """
+        pictures = self.db_manager.get_profile_pictures(list(set(user_ids)))
+        if pictures is None:
+            return None
+
+        urls = self.get_urls_for_pictures(pictures.values(), expiration, size)
+        return {user_id: urls.get(s3_key) for user_id, (s3_key, _) in pictures.items()}
     
     def delete_profile_picture(self, user_id):
         s3_key = self.db_manager.get_profile_picture_key(user_id)
@@ -754,7 +1758,7 @@ class ProfilePictureHandler:
         if not s3_key:
             return True 
         
-        if not self.s3_manager.delete_profile_picture(s3_key):
+        if not self._delete_stored_picture(s3_key):
             return False
         
         return self.db_manager.clear_profile_picture(user_id)
@@ -0,0 +1,229 @@
+import functools
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import nullcontext
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+try:
+    import psycopg2
+    import psycopg2.errors
+    import psycopg2.extensions
+except ImportError:
+    psycopg2 = None
+
+class PostgresEngine:
+    """
+    A PostgreSQL server reached through psycopg2, configured by the host, database,
+    user and password keys of DB_CONFIG
+    """
+    name = 'postgres'
+    supports_prepare = True
+
+    def __init__(self, db_config):
+        if psycopg2 is None:
+            raise ImportError("The psycopg2 package is required for the postgres engine.")
+        self.db_config = db_config
+        self.Error = psycopg2.Error
+        # Failures of the connection itself, after which it is replaced
+        self.connection_errors = (psycopg2.OperationalError, psycopg2.InterfaceError)
+        # The server session no longer knows a prepared statement
+        self.lost_statement_errors = (psycopg2.errors.InvalidSqlStatementName,)
+
+    def connect(self):
+        return psycopg2.connect(
+            host=self.db_config['host'],
+            database=self.db_config['database'],
+            user=self.db_config['user'],
+            password=self.db_config['password']
+        )
+
+    def is_closed(self, conn):
+        return bool(conn.closed)
+
+    def in_transaction(self, conn):
+        return conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def translate(self, query, params):
+        return query, params
+
+    def writer(self, write):
+        # The server handles concurrent writers itself
+        return nullcontext()
+
+    def begin(self, conn):
+        # psycopg2 opens a transaction with the first statement
+        pass
+
+    def execute_script(self, cursor, script):
+        cursor.execute(script)
+
+    def error_kind(self, e):
+        if isinstance(e, psycopg2.errors.UniqueViolation):
+            return 'unique'
+        if isinstance(e, psycopg2.errors.ForeignKeyViolation):
+            return 'foreign_key'
+        if isinstance(e, psycopg2.errors.CheckViolation):
+            return 'check'
+        if isinstance(e, psycopg2.DatabaseError):
+            return 'database'
+        return None
+
+    def version(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            return f"PostgreSQL {cursor.fetchone()[0]}"
+
+def _adapt_datetime(value):
+    """
+    The canonical text form of a timestamp, 'YYYY-MM-DD HH:MM:SS[.ffffff]' in UTC
+    for aware values, which sorts and compares in time order. Timestamps written as
+    other text are rewritten to it by migrations/0007_canonical_timestamps.sqlite.sql.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=' ')
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(uuid.UUID, str)
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+
+DEFAULT_SQLITE_PRAGMAS = {
+    # Readers keep reading while a write is in progress
+    'journal_mode': 'WAL',
+    # With WAL, only a power loss can drop the last commits; the file is never corrupted
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    # 64 MB page cache per connection (negative values are KiB)
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY'
+}
+
+PLACEHOLDER = re.compile(r'%s|%%')
+ROW_LOCK = re.compile(r'\bFOR\s+UPDATE(\s+OF\s+\w+(\s*,\s*\w+)*)?', re.IGNORECASE)
+
+# Queries with IN-lists built per call vary with the list length, so the cache is bounded
+@functools.lru_cache(maxsize=1024)
+def _translate_sql(query, has_params):
+    translated = ROW_LOCK.sub('', query)
+    if has_params:
+        translated = PLACEHOLDER.sub(lambda match: '?' if match.group() == '%s' else '%', translated)
+    return translated
+
+class SQLiteEngine:
+    """
+    An embedded SQLite database file, for single-node deployments and dependency-free
+    benchmarks. DB_CONFIG keys: path, busy_timeout (seconds) and pragmas.
+
+    Connections run in autocommit mode with WAL journaling, so reads never wait on a
+    write. Writes go through one process-wide writer lock and transactions start with
+    BEGIN IMMEDIATE, so a transaction holds SQLite's write lock from its first statement
+    and cannot fail halfway when another writer got there first. Row locks are therefore
+    unnecessary and FOR UPDATE clauses are dropped.
+    """
+    name = 'sqlite'
+    # sqlite3 already reuses compiled statements per connection
+    supports_prepare = False
+    Error = sqlite3.Error
+    connection_errors = ()
+    lost_statement_errors = ()
+
+    def __init__(self, db_config):
+        self.path = db_config.get('path', 'fitness.db')
+        self.busy_timeout = db_config.get('busy_timeout', 5)
+        self.pragmas = {**DEFAULT_SQLITE_PRAGMAS, **db_config.get('pragmas', {})}
+        self._write_lock = threading.Lock()
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def is_closed(self, conn):
+        try:
+            conn.total_changes
+            return False
+        except sqlite3.ProgrammingError:
+            return True
+
+    def in_transaction(self, conn):
+        return conn.in_transaction
+
+    def translate(self, query, params):
+        """
+        Rewrite psycopg2 SQL and parameters for sqlite3: %s placeholders become ?, and
+        %% becomes % when parameters are given (psycopg2 leaves it alone otherwise)
+        """
+        return _translate_sql(query, params is not None), () if params is None else params
+
+    def writer(self, write):
+        if not write:
+            return nullcontext()
+        return _WriterLock(self._write_lock, self.busy_timeout)
+
+    def begin(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+
+    def execute_script(self, cursor, script):
+        # cursor.executescript() would commit the surrounding transaction first
+        statement = ''
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                cursor.execute(statement)
+                statement = ''
+        if statement.strip():
+            cursor.execute(statement)
+
+    def error_kind(self, e):
+        if isinstance(e, sqlite3.IntegrityError):
+            message = str(e)
+            if message.startswith('UNIQUE'):
+                return 'unique'
+            if message.startswith('FOREIGN KEY'):
+                return 'foreign_key'
+            if message.startswith('CHECK'):
+                return 'check'
+        if isinstance(e, sqlite3.DatabaseError):
+            return 'database'
+        return None
+
+    def version(self, conn):
+        return f"SQLite {sqlite3.sqlite_version}"
+
+class _WriterLock:
+    def __init__(self, lock, timeout):
+        self.lock = lock
+        self.timeout = timeout
+
+    def __enter__(self):
+        if not self.lock.acquire(timeout=self.timeout):
+            raise ValueError("Timed out waiting for the database writer lock.")
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+def create_engine(db_config):
+    """
+    The engine named by DB_CONFIG['engine']: 'postgres' (the default) or 'sqlite'
+    """
+    engine_name = db_config.get('engine', 'postgres')
+    if engine_name == 'sqlite':
+        return SQLiteEngine(db_config)
+    if engine_name == 'postgres':
+        return PostgresEngine(db_config)
+    raise ValueError(f"Unknown database engine: {engine_name}")
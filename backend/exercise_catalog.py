@@ -0,0 +1,106 @@
+import os
+import re
+import json
+import bisect
+import hashlib
+import threading
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def _tokenize(text):
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+class CatalogSnapshot:
+    """
+    Immutable, pre-indexed view of exercises.json.
+
+    Exercises are held pre-sorted by (category, name). Each category maps to the
+    positions of its exercises, and every lower-cased word of a name or description
+    maps to the positions it appears in, so category filters and prefix searches
+    never scan or re-sort the whole catalog.
+    """
+    def __init__(self, exercises, version):
+        self.version = version
+        self.exercises = tuple(
+            sorted((dict(ex) for ex in exercises), key=lambda x: (x['category'], x['name']))
+        )
+
+        by_category = {}
+        postings = {}
+        for position, ex in enumerate(self.exercises):
+            by_category.setdefault(ex['category'], []).append(position)
+            for token in set(_tokenize(ex['name']) + _tokenize(ex.get('description'))):
+                postings.setdefault(token, []).append(position)
+
+        self._by_category = {category: tuple(positions) for category, positions in by_category.items()}
+        self._postings = {token: frozenset(positions) for token, positions in postings.items()}
+        self._tokens = tuple(sorted(self._postings))
+
+    def _prefix_matches(self, prefix):
+        matches = set()
+        start = bisect.bisect_left(self._tokens, prefix)
+        for token in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches |= self._postings[token]
+        return matches
+
+    def search(self, query=None, category=None):
+        """
+        Return exercises in (category, name) order, optionally restricted to a category
+        and to those whose name or description has a word starting with every word of query
+        """
+        if category:
+            positions = self._by_category.get(category, ())
+        else:
+            positions = range(len(self.exercises))
+
+        query_tokens = _tokenize(query)
+        if query_tokens:
+            matches = None
+            for token in query_tokens:
+                token_matches = self._prefix_matches(token)
+                matches = token_matches if matches is None else matches & token_matches
+                if not matches:
+                    return []
+            if category:
+                positions = [position for position in positions if position in matches]
+            else:
+                positions = sorted(matches)
+
+        # Hand out copies so callers cannot modify the shared snapshot
+        return [dict(self.exercises[position]) for position in positions]
+
+class ExerciseCatalog:
+    """
+    Loads exercises.json once and serves searches from an in-memory snapshot,
+    reloading only when the file's modification time changes
+    """
+    def __init__(self, file_path=None):
+        self.file_path = file_path or os.path.join(os.path.dirname(__file__), 'exercises.json')
+        self._snapshot = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        mtime = os.stat(self.file_path).st_mtime_ns
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load(mtime)
+        return self._snapshot
+
+    def _load(self, mtime):
+        try:
+            with open(self.file_path, 'rb') as file:
+                raw = file.read()
+            data = json.loads(raw)
+            version = hashlib.sha1(raw).hexdigest()[:16]
+            self._snapshot = CatalogSnapshot(data.get('exercises', []), version)
+            print(f"Exercise catalog loaded ({len(self._snapshot.exercises)} exercises).")
+        except (OSError, ValueError, KeyError) as e:
+            if self._snapshot is None:
+                raise
+            # Keep serving the last good catalog until the file is fixed
+            print(f"Error reloading exercise catalog, keeping previous version: {e}")
+        self._mtime = mtime
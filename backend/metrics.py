@@ -0,0 +1,258 @@
+import bisect
+import threading
+import time
+import weakref
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+class _Shard:
+    # Holder for one thread's values; when the thread ends it is collected and its
+    # values are folded into the metric's retired totals
+    __slots__ = ('values', '__weakref__')
+
+    def __init__(self):
+        self.values = {}
+
+class _ShardedMetric:
+    """
+    Base for metrics written from many threads without a lock on the hot path.
+
+    Every thread updates its own shard, so an increment is a plain dict update.
+    The metric's lock is only taken when a thread writes for the first time, when
+    a thread exits, and when the metric is collected.
+    """
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = {}   # id -> values dict of live threads
+        self._retired = {}  # values of threads that have exited
+        self._lock = threading.Lock()
+
+    def _values(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard()
+            self._local.shard = shard
+            key = id(shard.values)
+            with self._lock:
+                self._shards[key] = shard.values
+            weakref.finalize(shard, self._retire, key)
+        return shard.values
+
+    def _retire(self, key):
+        with self._lock:
+            values = self._shards.pop(key, None)
+            if values:
+                for labels, value in values.items():
+                    self._retired[labels] = self._merge(self._retired.get(labels), value)
+
+    def _label_values(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _snapshot(self):
+        with self._lock:
+            merged = dict(self._retired)
+            for values in self._shards.values():
+                # copy() runs without releasing the GIL, so the owning thread cannot resize it midway
+                for labels, value in values.copy().items():
+                    merged[labels] = self._merge(merged.get(labels), value)
+        return merged
+
+    def _format_labels(self, label_values, extra=()):
+        return _format_labels(list(zip(self.labelnames, label_values)) + list(extra))
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(self._snapshot()))
+        return lines
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        values = self._values()
+        key = self._label_values(labels)
+        values[key] = values.get(key, 0) + amount
+
+    @staticmethod
+    def _merge(total, value):
+        return (total or 0) + value
+
+    def _samples(self, merged):
+        return [f"{self.name}{self._format_labels(labels)} {value}" for labels, value in sorted(merged.items())]
+
+class Gauge(Counter):
+    """
+    Value that goes up and down, such as requests in flight; summed over threads
+    """
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        values = self._values()
+        key = self._label_values(labels)
+        entry = values.get(key)
+        if entry is None:
+            # Per-bucket counts (the last one is +Inf), sum, count
+            entry = values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    @staticmethod
+    def _merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1], value[2]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def _samples(self, merged):
+        lines = []
+        for labels, (counts, total, count) in sorted(merged.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {count}")
+        return lines
+
+class CallbackGauge:
+    """
+    Gauge read at collection time from a function returning a number, or a list of
+    (labels dict, number) pairs for labelled samples
+    """
+    def __init__(self, name, help_text, callback, kind='gauge'):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.kind = kind
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = self.callback()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {e}")
+            return lines
+
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, value in samples:
+            lines.append(f"{self.name}{_format_labels(list(labels.items()))} {value}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name, help_text, callback, kind='gauge'):
+        return self.register(CallbackGauge(name, help_text, callback, kind))
+
+    def expose(self):
+        """
+        All metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'http_requests_total', "HTTP requests handled, by route and status", ('method', 'route', 'status')
+)
+http_latency = registry.histogram(
+    'http_request_duration_seconds', "Time spent handling HTTP requests", ('method', 'route')
+)
+http_in_flight = registry.gauge('http_requests_in_flight', "HTTP requests currently being handled")
+db_query_latency = registry.histogram(
+    'db_query_duration_seconds', "Time spent running single database statements",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+s3_latency = registry.histogram(
+    's3_request_duration_seconds', "Time spent on S3 API calls, by operation", ('operation',)
+)
+
+def record_query(query, params, duration, rows):
+    """
+    DatabaseConnector query hook feeding db_query_duration_seconds
+    """
+    db_query_latency.observe(duration)
+
+def instrument_s3(s3_client):
+    """
+    Time every API call made through a boto3 S3 client. Presigning a URL is local
+    and makes no call, so it is not counted.
+    """
+    def before_call(context, **kwargs):
+        context['metrics_start'] = time.perf_counter()
+
+    def after_call(context, model, **kwargs):
+        start = context.pop('metrics_start', None)
+        if start is not None:
+            s3_latency.observe(time.perf_counter() - start, operation=model.name)
+
+    s3_client.meta.events.register('before-call.s3', before_call)
+    s3_client.meta.events.register('after-call.s3', after_call)
+
+def register_pool(connector):
+    """
+    Expose DatabaseConnector pool statistics
+    """
+    def connections():
+        stats = connector.pool_stats()
+        return [({'state': 'idle'}, stats.get('idle', 0)), ({'state': 'in_use'}, stats.get('in_use', 0))]
+
+    def stat(key):
+        return lambda: connector.pool_stats().get(key, 0)
+
+    registry.callback('db_pool_connections', "Open pooled database connections by state", connections)
+    registry.callback('db_pool_max_connections', "Upper bound on pooled connections", stat('max_size'))
+    registry.callback('db_pool_checkouts_total', "Connections handed out by the pool", stat('checkouts'), 'counter')
+    registry.callback('db_pool_waits_total', "Checkouts that had to wait for a connection", stat('waits'), 'counter')
+    registry.callback('db_pool_wait_seconds_total', "Time spent waiting for connections", stat('wait_time_total'), 'counter')
+    registry.callback('db_pool_timeouts_total', "Checkouts that timed out", stat('timeouts'), 'counter')
+    registry.callback('db_pool_reconnects_total', "Stale connections replaced", stat('reconnects'), 'counter')
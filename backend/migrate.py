@@ -0,0 +1,155 @@
+"""
+Applies the versioned SQL files in migrations/ in order, recording each one in
+the schema_migrations table.
+
+Run from the backend directory:
+
+    python migrate.py            # apply everything pending
+    python migrate.py --status   # list migrations and whether they are applied
+"""
+import argparse
+import hashlib
+import os
+import re
+
+from database_connector import DatabaseConnector
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# NNNN_description.sql, or NNNN_description.<engine>.sql for a version written for one engine
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+?)(?:\.(postgres|sqlite))?\.sql$')
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path) as file:
+            self.sql = file.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+
+class MigrationRunner:
+    """
+    Each migration runs in its own transaction together with the insert of its
+    schema_migrations row, so a failed migration leaves nothing behind and is
+    retried on the next run. The row is inserted first: a second runner applying
+    the same version waits on it and then fails on the primary key instead of
+    running the migration twice.
+    """
+    def __init__(self, connector, directory=MIGRATIONS_DIR):
+        self.connector = connector
+        self.directory = directory
+        self.engine_name = connector.engine.name
+
+    def ensure_table(self):
+        self.connector.execute_query("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def discover(self):
+        """
+        Migrations in version order. A file for the connector's engine takes the place of
+        the generic file of the same version; files for other engines are skipped.
+        """
+        generic = {}
+        specific = {}
+        for filename in sorted(os.listdir(self.directory)):
+            match = MIGRATION_FILE.match(filename)
+            if not match:
+                continue
+            version, name, engine = int(match.group(1)), match.group(2), match.group(3)
+            if engine is None:
+                found = generic
+            elif engine == self.engine_name:
+                found = specific
+            else:
+                continue
+            if version in found:
+                raise ValueError(f"Duplicate migration version {version} in {self.directory}.")
+            found[version] = Migration(version, name, os.path.join(self.directory, filename))
+
+        migrations = {**generic, **specific}
+        return [migrations[version] for version in sorted(migrations)]
+
+    def applied(self):
+        """
+        Returns:
+            dict: version -> (checksum, applied_at) of every applied migration
+        """
+        rows = self.connector.execute_query(
+            "SELECT version, checksum, applied_at FROM schema_migrations", commit=False, fetch=True
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def status(self):
+        self.ensure_table()
+        applied = self.applied()
+        status = []
+        for migration in self.discover():
+            checksum, applied_at = applied.get(migration.version, (None, None))
+            status.append({
+                'version': migration.version,
+                'name': migration.name,
+                'applied_at': applied_at,
+                # An applied file that was edited afterwards does not run again
+                'modified': checksum is not None and checksum != migration.checksum
+            })
+        return status
+
+    def migrate(self, target=None):
+        """
+        Apply pending migrations up to and including version target (all when None).
+
+        Returns:
+            list: the migrations that were applied
+        """
+        self.ensure_table()
+        applied = self.applied()
+        done = []
+
+        for migration in self.discover():
+            if target is not None and migration.version > target:
+                break
+            if migration.version in applied:
+                if applied[migration.version][0] != migration.checksum:
+                    print(f"Warning: migration {migration.version} ({migration.name}) changed after it was applied.")
+                continue
+
+            print(f"Applying migration {migration.version} ({migration.name})...")
+            with self.connector.transaction() as tx:
+                tx.execute_query(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum)
+                )
+                tx.execute_script(migration.sql)
+            done.append(migration)
+
+        return done
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument('--status', action='store_true', help="List migrations without applying any")
+    parser.add_argument('--target', type=int, help="Stop after this migration version")
+    args = parser.parse_args()
+
+    connector = DatabaseConnector()
+    try:
+        runner = MigrationRunner(connector)
+        if args.status:
+            for entry in runner.status():
+                state = entry['applied_at'] or 'pending'
+                flag = "  (modified since applied)" if entry['modified'] else ""
+                print(f"{entry['version']:04d} {entry['name']:<32} {state}{flag}")
+        else:
+            done = runner.migrate(args.target)
+            print(f"Applied {len(done)} migrations." if done else "Schema is up to date.")
+    finally:
+        connector.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+-- Tables as DatabaseManager first used them. IF NOT EXISTS lets the migration
+-- be recorded against a database created by hand before migrations existed.
+
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    age INTEGER,
+    gender TEXT,
+    fitness_level TEXT,
+    profile_picture_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS workouts (
+    id UUID PRIMARY KEY,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    date TIMESTAMP NOT NULL,
+    name TEXT,
+    notes TEXT,
+    routine INTEGER NOT NULL DEFAULT 0,
+    duration INTEGER,
+    volume NUMERIC
+);
+
+CREATE TABLE IF NOT EXISTS exercises (
+    id UUID PRIMARY KEY,
+    workout_id UUID NOT NULL REFERENCES workouts(id) ON DELETE CASCADE,
+    exercise TEXT NOT NULL,
+    sets INTEGER,
+    reps INTEGER,
+    weight NUMERIC,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS measurements (
+    id UUID PRIMARY KEY,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    weight NUMERIC,
+    bmi NUMERIC,
+    body_fat_percentage NUMERIC,
+    muscle_mass NUMERIC,
+    date_recorded TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_follows (
+    follower_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    following_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_id, following_id),
+    CHECK (follower_id <> following_id)
+);
+
+CREATE TABLE IF NOT EXISTS leaderboard (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_weight_lifted NUMERIC NOT NULL DEFAULT 0,
+    workout_days_count INTEGER NOT NULL DEFAULT 0,
+    last_workout TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS workout_views (
+    id UUID PRIMARY KEY,
+    workout_id UUID NOT NULL REFERENCES workouts(id) ON DELETE CASCADE,
+    viewer_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    viewed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (workout_id, viewer_id)
+);
@@ -0,0 +1,16 @@
+-- Denormalised per-user counters read by DatabaseManager.get_user_profile.
+-- They are kept current by follow_user, unfollow_user, start_workout,
+-- delete_workout and delete_user; DatabaseManager.reconcile_user_counters
+-- repairs any drift.
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS followers_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS following_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS workout_count INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill from the source tables
+UPDATE users u
+SET
+    followers_count = (SELECT COUNT(*) FROM user_follows f WHERE f.following_id = u.id),
+    following_count = (SELECT COUNT(*) FROM user_follows f WHERE f.follower_id = u.id),
+    workout_count = (SELECT COUNT(*) FROM workouts w WHERE w.user_id = u.id);
@@ -0,0 +1,14 @@
+-- SQLite version of 0002_counter_cache.sql: ALTER TABLE adds one column at a
+-- time and has no IF NOT EXISTS, which SQLite databases, always created by
+-- these migrations, do not need.
+
+ALTER TABLE users ADD COLUMN followers_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN following_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN workout_count INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill from the source tables
+UPDATE users
+SET
+    followers_count = (SELECT COUNT(*) FROM user_follows f WHERE f.following_id = users.id),
+    following_count = (SELECT COUNT(*) FROM user_follows f WHERE f.follower_id = users.id),
+    workout_count = (SELECT COUNT(*) FROM workouts w WHERE w.user_id = users.id);
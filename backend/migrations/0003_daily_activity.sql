@@ -0,0 +1,17 @@
+-- Per-(user, day) rollup of exercise volume, workouts with exercises and the
+-- latest workout time. Maintained by the exercise and workout writes in
+-- DatabaseManager and read by get_leaderboard for whole-day windows.
+-- Populate or repair with DatabaseManager.backfill_daily_activity().
+
+CREATE TABLE IF NOT EXISTS user_daily_activity (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    volume NUMERIC NOT NULL DEFAULT 0,
+    workout_count INTEGER NOT NULL DEFAULT 0,
+    last_workout_at TIMESTAMP,
+    PRIMARY KEY (user_id, day)
+);
+
+-- Windowed leaderboards scan a range of days across all users
+CREATE INDEX IF NOT EXISTS user_daily_activity_day_idx
+    ON user_daily_activity (day, user_id);
@@ -0,0 +1,4 @@
+-- Lets RankService read the leaderboard in rank order without sorting the table.
+
+CREATE INDEX IF NOT EXISTS leaderboard_total_weight_lifted_idx
+    ON leaderboard (total_weight_lifted DESC, user_id);
@@ -0,0 +1,47 @@
+-- SQLite version of 0005_hot_path_indexes.sql. SQLite names the indexes behind
+-- the UNIQUE constraints of 0001 itself, so the users(email) and workout_views
+-- unique indexes are left out rather than built a second time.
+--
+-- Indexes for every lookup DatabaseManager makes, so no request-path query
+-- has to scan a whole table.
+--
+-- Primary keys already cover lookups by id, leaderboard.user_id, the
+-- (follower_id, following_id) pair and user_daily_activity (user_id, day).
+
+-- get_user_id by name
+CREATE INDEX IF NOT EXISTS users_name_idx
+    ON users (name);
+
+-- A user's workouts newest first, matching the (date, id) keyset order of
+-- _fetch_workouts; also serves counter repair, totals and user deletes
+CREATE INDEX IF NOT EXISTS workouts_user_id_date_idx
+    ON workouts (user_id, date DESC, id DESC);
+
+-- get_user_routines only reads the few workouts flagged as routines
+CREATE INDEX IF NOT EXISTS workouts_routines_idx
+    ON workouts (user_id, date DESC, id DESC)
+    WHERE routine = 1;
+
+-- The feed pages through several users' workouts in date order, and live
+-- leaderboard windows filter on date across all users
+CREATE INDEX IF NOT EXISTS workouts_date_idx
+    ON workouts (date DESC, id DESC);
+
+-- A workout's exercises in logging order; also the EXISTS checks and cascades
+CREATE INDEX IF NOT EXISTS exercises_workout_id_created_at_idx
+    ON exercises (workout_id, created_at);
+
+-- Followers and following lists, newest first. The primary key already leads
+-- with follower_id but cannot return rows in created_at order.
+CREATE INDEX IF NOT EXISTS user_follows_following_id_created_at_idx
+    ON user_follows (following_id, created_at);
+CREATE INDEX IF NOT EXISTS user_follows_follower_id_created_at_idx
+    ON user_follows (follower_id, created_at);
+
+-- get_measurements and the cascade from users
+CREATE INDEX IF NOT EXISTS measurements_user_id_date_recorded_idx
+    ON measurements (user_id, date_recorded);
+
+-- The cascade when a viewer is deleted
+CREATE INDEX IF NOT EXISTS workout_views_viewer_id_idx
+    ON workout_views (viewer_id);
@@ -0,0 +1,22 @@
+-- Each user's best set per exercise and metric: heaviest weight, most reps at
+-- a given weight, single-set volume and Epley estimated 1RM. Reps records are
+-- kept per weight (at_weight); the other metrics use an at_weight of 0.
+-- Maintained by the exercise and workout writes in DatabaseManager; a record
+-- whose set is edited or deleted is recomputed from the user's history.
+-- Populate or repair with DatabaseManager.backfill_personal_records().
+
+CREATE TABLE IF NOT EXISTS personal_records (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    exercise TEXT NOT NULL,
+    metric TEXT NOT NULL CHECK (metric IN ('weight', 'reps', 'volume', 'e1rm')),
+    at_weight NUMERIC NOT NULL DEFAULT 0,
+    value NUMERIC NOT NULL,
+    reps INTEGER NOT NULL,
+    weight NUMERIC,
+    exercise_id UUID NOT NULL REFERENCES exercises(id) ON DELETE CASCADE,
+    PRIMARY KEY (user_id, exercise, metric, at_weight)
+);
+
+-- Edits and deletes look up the records their exercises hold
+CREATE INDEX IF NOT EXISTS personal_records_exercise_id_idx
+    ON personal_records (exercise_id);
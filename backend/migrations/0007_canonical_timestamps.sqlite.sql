@@ -0,0 +1,50 @@
+-- SQLite keeps timestamps as text and compares them as text, so every stored
+-- timestamp must have the same shape as the ones the engine binds:
+-- 'YYYY-MM-DD HH:MM:SS', with '.ffffff' when there are microseconds. Clients
+-- send dates such as '2024-01-03' or '2024-01-03T11:00:00', which these
+-- triggers rewrite on insert and update. PostgreSQL parses them itself.
+
+CREATE TRIGGER IF NOT EXISTS workouts_date_insert AFTER INSERT ON workouts
+WHEN NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE workouts SET date = datetime(NEW.date) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS workouts_date_update AFTER UPDATE OF date ON workouts
+WHEN NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE workouts SET date = datetime(NEW.date) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS measurements_date_recorded_insert AFTER INSERT ON measurements
+WHEN NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE measurements SET date_recorded = datetime(NEW.date_recorded) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS measurements_date_recorded_update AFTER UPDATE OF date_recorded ON measurements
+WHEN NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE measurements SET date_recorded = datetime(NEW.date_recorded) WHERE id = NEW.id;
+END;
+
+-- Rows written before this migration, and the values derived from them
+UPDATE workouts SET date = datetime(date)
+WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+  AND date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]';
+
+UPDATE measurements SET date_recorded = datetime(date_recorded)
+WHERE date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+  AND date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]';
+
+UPDATE leaderboard SET last_workout = datetime(last_workout)
+WHERE last_workout NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+  AND last_workout NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]';
+
+UPDATE user_daily_activity SET last_workout_at = datetime(last_workout_at)
+WHERE last_workout_at NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+  AND last_workout_at NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]';
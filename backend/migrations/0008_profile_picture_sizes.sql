@@ -0,0 +1,6 @@
+-- Thumbnail sizes stored for the current profile picture, as comma-separated
+-- pixel sizes ('64,256,1024'). Set by the thumbnail pipeline once the variants
+-- are in S3 and cleared when the picture changes, so picture URLs are built
+-- without asking S3 which variants exist. NULL serves the original.
+
+ALTER TABLE users ADD COLUMN profile_picture_sizes TEXT;
@@ -0,0 +1,92 @@
+-- Replaces the triggers of 0007_canonical_timestamps, which rewrote values with
+-- datetime() and so dropped fractional seconds: '2024-01-03T11:00:00.250000'
+-- became '2024-01-03 11:00:00' while the same moment bound as a Python datetime
+-- is stored as '2024-01-03 11:00:00.250000' by the engine, and the two compared and
+-- sorted differently. The fraction is now split off before datetime() (which
+-- would round it to milliseconds), and appended again as six digits, or left out
+-- when it is zero, as the engine's datetime adapter writes it. Values rewritten
+-- by 0007 keep the whole seconds they were stored with.
+
+DROP TRIGGER IF EXISTS workouts_date_insert;
+
+CREATE TRIGGER workouts_date_insert AFTER INSERT ON workouts
+WHEN NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE workouts SET date = (
+        SELECT datetime(substr(v, 1, 19) || substr(v, 20 + dot + length(digits)))
+               || CASE WHEN digits GLOB '*[1-9]*' THEN '.' || substr(digits || '000000', 1, 6) ELSE '' END
+        FROM (
+            SELECT v, dot, substr(tail, 1, length(tail) - length(ltrim(tail, '0123456789'))) AS digits
+            FROM (
+                SELECT v, substr(v, 20, 1) = '.' AS dot,
+                       CASE WHEN substr(v, 20, 1) = '.' THEN substr(v, 21) ELSE '' END AS tail
+                FROM (SELECT NEW.date AS v)
+            )
+        )
+    )
+    WHERE id = NEW.id;
+END;
+
+DROP TRIGGER IF EXISTS workouts_date_update;
+
+CREATE TRIGGER workouts_date_update AFTER UPDATE OF date ON workouts
+WHEN NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE workouts SET date = (
+        SELECT datetime(substr(v, 1, 19) || substr(v, 20 + dot + length(digits)))
+               || CASE WHEN digits GLOB '*[1-9]*' THEN '.' || substr(digits || '000000', 1, 6) ELSE '' END
+        FROM (
+            SELECT v, dot, substr(tail, 1, length(tail) - length(ltrim(tail, '0123456789'))) AS digits
+            FROM (
+                SELECT v, substr(v, 20, 1) = '.' AS dot,
+                       CASE WHEN substr(v, 20, 1) = '.' THEN substr(v, 21) ELSE '' END AS tail
+                FROM (SELECT NEW.date AS v)
+            )
+        )
+    )
+    WHERE id = NEW.id;
+END;
+
+DROP TRIGGER IF EXISTS measurements_date_recorded_insert;
+
+CREATE TRIGGER measurements_date_recorded_insert AFTER INSERT ON measurements
+WHEN NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE measurements SET date_recorded = (
+        SELECT datetime(substr(v, 1, 19) || substr(v, 20 + dot + length(digits)))
+               || CASE WHEN digits GLOB '*[1-9]*' THEN '.' || substr(digits || '000000', 1, 6) ELSE '' END
+        FROM (
+            SELECT v, dot, substr(tail, 1, length(tail) - length(ltrim(tail, '0123456789'))) AS digits
+            FROM (
+                SELECT v, substr(v, 20, 1) = '.' AS dot,
+                       CASE WHEN substr(v, 20, 1) = '.' THEN substr(v, 21) ELSE '' END AS tail
+                FROM (SELECT NEW.date_recorded AS v)
+            )
+        )
+    )
+    WHERE id = NEW.id;
+END;
+
+DROP TRIGGER IF EXISTS measurements_date_recorded_update;
+
+CREATE TRIGGER measurements_date_recorded_update AFTER UPDATE OF date_recorded ON measurements
+WHEN NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+ AND NEW.date_recorded NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+BEGIN
+    UPDATE measurements SET date_recorded = (
+        SELECT datetime(substr(v, 1, 19) || substr(v, 20 + dot + length(digits)))
+               || CASE WHEN digits GLOB '*[1-9]*' THEN '.' || substr(digits || '000000', 1, 6) ELSE '' END
+        FROM (
+            SELECT v, dot, substr(tail, 1, length(tail) - length(ltrim(tail, '0123456789'))) AS digits
+            FROM (
+                SELECT v, substr(v, 20, 1) = '.' AS dot,
+                       CASE WHEN substr(v, 20, 1) = '.' THEN substr(v, 21) ELSE '' END AS tail
+                FROM (SELECT NEW.date_recorded AS v)
+            )
+        )
+    )
+    WHERE id = NEW.id;
+END;
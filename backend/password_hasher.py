@@ -0,0 +1,152 @@
+import os
+import time
+import argparse
+import threading
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from passlib.context import CryptContext
+
+class HasherBusyError(Exception):
+    pass
+
+@lru_cache(maxsize=None)
+def _context(rounds):
+    # Hashes below the configured cost are reported as needing an update on verify
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds
+    )
+
+# The functions below run inside the worker processes, so they live at module level
+
+def _hash_password(password, rounds):
+    return _context(rounds).hash(password)
+
+def _verify_password(password, stored_hash, rounds):
+    # Returns (valid, new_hash); new_hash is set when the stored cost is outdated
+    return _context(rounds).verify_and_update(password, stored_hash)
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated process pool, so a burst of
+    logins cannot stall the request threads. At most max_pending operations may be
+    queued or running; beyond that callers get HasherBusyError immediately instead
+    of waiting. Callers also get HasherBusyError when a result takes longer than
+    timeout seconds.
+
+    Workers are started with spawn rather than fork: the API process runs request
+    threads and holds database connections, and a forked child would inherit
+    copies of both, including locks held by other threads at the time of the fork.
+    """
+    def __init__(self, rounds=None, workers=None, max_pending=None, timeout=None):
+        hash_config = _load_hash_config()
+        self.rounds = rounds or hash_config.get('bcrypt_rounds', 12)
+        self.workers = workers or hash_config.get('workers', os.cpu_count() or 2)
+        self.max_pending = max_pending or hash_config.get('max_pending', self.workers * 4)
+        self.timeout = timeout or hash_config.get('timeout', 10)
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so the worker processes are not started at import time
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._pending_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusyError("Password hashing queue is full, please retry shortly.")
+
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        # The slot is freed when the work finishes, even if the caller stops waiting
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The pool is saturated; a wrong-password answer here would be a lie
+            raise HasherBusyError("Password hashing timed out, please retry shortly.")
+
+    def pending(self):
+        """
+        Number of hashing operations queued or running
+        """
+        return self._pending
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.rounds)
+
+    def verify(self, password, stored_hash):
+        """
+        Returns:
+            tuple: (valid, new_hash), where new_hash is a rehash at the current cost if the
+                   stored hash used an outdated one, otherwise None
+        """
+        return self._run(_verify_password, password, stored_hash, self.rounds)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+def _load_hash_config():
+    try:
+        import config
+        return getattr(config, 'HASH_CONFIG', {})
+    except ImportError:
+        return {}
+
+def calibrate(target_ms=250, min_rounds=10, max_rounds=16, samples=3):
+    """
+    Time bcrypt at increasing costs on this machine and return the highest cost whose
+    median hash time stays within target_ms (never below min_rounds), with the timings
+    """
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            _hash_password("calibration-password", rounds)
+            durations.append((time.perf_counter() - start) * 1000)
+        timings[rounds] = sorted(durations)[len(durations) // 2]
+
+        if timings[rounds] <= target_ms:
+            chosen = rounds
+        else:
+            # Each extra round doubles the cost, so later ones can only be slower
+            break
+    return chosen, timings
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Choose bcrypt rounds for this hardware.")
+    parser.add_argument('--target-ms', type=float, default=250, help="Target time for one hash in milliseconds")
+    parser.add_argument('--min-rounds', type=int, default=10)
+    parser.add_argument('--max-rounds', type=int, default=16)
+    args = parser.parse_args()
+
+    rounds, timings = calibrate(args.target_ms, args.min_rounds, args.max_rounds)
+    for cost, duration in timings.items():
+        print(f"rounds={cost}: {duration:.1f} ms")
+    print(f"Recommended: HASH_CONFIG = {{'bcrypt_rounds': {rounds}}} in config.py")
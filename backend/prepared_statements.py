@@ -0,0 +1,109 @@
+import re
+import threading
+import weakref
+
+# Statement names become SQL identifiers
+STATEMENT_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+PLACEHOLDER = re.compile(r'%s|%%')
+
+class PreparedStatement:
+    """
+    A query PREPAREd on each pooled connection the first time it runs there and
+    EXECUTEd by name afterwards, so the server parses and plans it once per session
+    instead of on every call.
+    """
+    def __init__(self, registry, name, query):
+        self.registry = registry
+        self.name = name
+        self.query = query
+
+        count = 0
+        def number(match):
+            nonlocal count
+            if match.group() == '%%':
+                return '%'
+            count += 1
+            return f"${count}"
+
+        self.prepare_sql = f"PREPARE {name} AS {PLACEHOLDER.sub(number, query)}"
+        self.execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * count)})" if count else f"EXECUTE {name}"
+
+    def execute(self, cursor, params):
+        prepared = self.registry.prepared_on(cursor.connection)
+        if self.name not in prepared:
+            cursor.execute(self.prepare_sql)
+            prepared.add(self.name)
+            self.registry.count_prepare()
+        cursor.execute(self.execute_sql, params)
+
+class StatementRegistry:
+    """
+    Named statements shared by every connection of a DatabaseConnector.
+
+    Which statements a connection has prepared is tracked per connection object, so
+    a connection opened to replace a stale one starts empty and prepares again as
+    it is used. forget() does the same for a connection whose server session lost
+    its statements.
+
+    supported is False for engines without server-side prepared statements; the
+    registry then stays disabled and refuses to be enabled.
+    """
+    def __init__(self, enabled=True, supported=True):
+        self.supported = supported
+        self._enabled = enabled and supported
+        self._statements = {}
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> set of names
+        self._prepares = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        if enabled and not self.supported:
+            raise ValueError("Prepared statements are not supported by this database engine.")
+        self._enabled = enabled
+
+    def get(self, name, query):
+        """
+        The statement registered under name, registering query the first time.
+        Returns None when prepared statements are disabled.
+        """
+        if not self.enabled:
+            return None
+
+        statement = self._statements.get(name)
+        if statement is None:
+            if not STATEMENT_NAME.match(name):
+                raise ValueError(f"Invalid prepared statement name: {name!r}")
+            with self._lock:
+                statement = self._statements.setdefault(name, PreparedStatement(self, name, query))
+        if statement.query != query:
+            raise ValueError(f"Prepared statement {name!r} is already registered with a different query.")
+        return statement
+
+    def prepared_on(self, conn):
+        with self._lock:
+            prepared = self._prepared.get(conn)
+            if prepared is None:
+                prepared = self._prepared[conn] = set()
+            return prepared
+
+    def forget(self, conn):
+        with self._lock:
+            self._prepared.pop(conn, None)
+
+    def count_prepare(self):
+        with self._lock:
+            self._prepares += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'supported': self.supported,
+                'enabled': self.enabled,
+                'statements': len(self._statements),
+                'prepares': self._prepares
+            }
@@ -0,0 +1,87 @@
+import re
+import contextvars
+
+_WHITESPACE = re.compile(r"\s+")
+# "IN (%s, %s, %s)" and multi-row VALUES differ only in length; fold them into one shape
+_PLACEHOLDER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+
+_current = contextvars.ContextVar('query_log', default=None)
+
+def normalize(query):
+    """
+    Single-line form of a statement, so repeats of the same query compare equal
+    """
+    query = _WHITESPACE.sub(" ", query).strip()
+    query = _PLACEHOLDER_LIST.sub("%s, ...", query)
+    return _VALUES_ROWS.sub(r"\1, ...", query)
+
+def redact(params):
+    """
+    Parameter types without their values, safe to write to logs
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+class QueryLog:
+    """
+    Statements run while handling one request, as (normalized query, seconds, rows) tuples
+    """
+    def __init__(self):
+        self.queries = []
+
+    def add(self, query, duration, rows):
+        self.queries.append((normalize(query), duration, rows))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration, _ in self.queries)
+
+    def summary(self, top=5):
+        """
+        Distinct statements with how often they ran and their total time, slowest first
+        """
+        grouped = {}
+        for query, duration, rows in self.queries:
+            entry = grouped.setdefault(query, {'query': query, 'count': 0, 'time': 0.0, 'rows': 0})
+            entry['count'] += 1
+            entry['time'] += duration
+            entry['rows'] += max(rows, 0)
+        return sorted(grouped.values(), key=lambda entry: entry['time'], reverse=True)[:top]
+
+def start():
+    """
+    Begin collecting statements for the current request; returns a token for finish()
+    """
+    return _current.set(QueryLog())
+
+def current():
+    return _current.get()
+
+def finish(token):
+    log = _current.get()
+    _current.reset(token)
+    return log
+
+class SlowQueryLogger:
+    """
+    Query hook for DatabaseConnector: adds each statement to the current request's
+    QueryLog, and logs any statement slower than threshold_ms with redacted parameters
+    """
+    def __init__(self, threshold_ms=200):
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, query, params, duration, rows):
+        log = _current.get()
+        if log is not None:
+            log.add(query, duration, rows)
+
+        if self.threshold_ms is not None and duration * 1000 >= self.threshold_ms:
+            print(f"Slow query ({duration * 1000:.1f} ms, {rows} rows): {normalize(query)} params={redact(params)}")
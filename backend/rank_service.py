@@ -0,0 +1,102 @@
+import bisect
+import threading
+import time
+
+class RankSnapshot:
+    """
+    Immutable ordering of the leaderboard by total weight lifted.
+
+    Ranks follow SQL rank(): users with equal totals share a rank and the next
+    rank skips accordingly. A user's position is a dict lookup and their rank a
+    binary search over the sorted totals, so both stay logarithmic in the number
+    of ranked users.
+    """
+    def __init__(self, rows):
+        # rows are (user_id, name, total_weight_lifted), highest total first
+        self.user_ids = tuple(row[0] for row in rows)
+        self.names = tuple(row[1] for row in rows)
+        self.totals = tuple(row[2] for row in rows)
+        self._positions = {user_id: position for position, user_id in enumerate(self.user_ids)}
+        # Negated so the sequence is ascending for bisect
+        self._negated_totals = [-total for total in self.totals]
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def _rank_at(self, position):
+        return bisect.bisect_left(self._negated_totals, -self.totals[position]) + 1
+
+    def _entry(self, position):
+        return {
+            'user_id': self.user_ids[position],
+            'name': self.names[position],
+            'total_weight_lifted': self.totals[position],
+            'rank': self._rank_at(position)
+        }
+
+    def rank(self, user_id):
+        position = self._positions.get(user_id)
+        return None if position is None else self._rank_at(position)
+
+    def window(self, user_id, size):
+        """
+        The user's entry with up to size entries directly above and below them,
+        or None if the user is not on the leaderboard
+        """
+        position = self._positions.get(user_id)
+        if position is None:
+            return None
+
+        return {
+            'rank': self._rank_at(position),
+            'total_users': len(self),
+            'user': self._entry(position),
+            'above': [self._entry(p) for p in range(max(0, position - size), position)],
+            'below': [self._entry(p) for p in range(position + 1, min(len(self), position + 1 + size))]
+        }
+
+class RankService:
+    """
+    Serves rank lookups from an in-process RankSnapshot of the leaderboard table,
+    reloaded at most every ttl seconds or after invalidate().
+
+    Readers never wait on a reload once a snapshot exists: the thread that takes
+    the reload lock rebuilds the snapshot while others keep answering from the
+    previous one.
+    """
+    def __init__(self, connector, ttl=30):
+        self.connector = connector
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def snapshot(self):
+        if self._snapshot is not None and not self._is_stale():
+            return self._snapshot
+
+        # Only block when there is nothing to serve yet
+        if self._lock.acquire(blocking=self._snapshot is None):
+            try:
+                if self._snapshot is None or self._is_stale():
+                    self._snapshot = self._load()
+                    self._loaded_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _load(self):
+        query = """
+            SELECT l.user_id, u.name, COALESCE(l.total_weight_lifted, 0) AS total_weight_lifted
+            FROM leaderboard l
+            JOIN users u ON l.user_id = u.id
+            ORDER BY total_weight_lifted DESC, l.user_id
+        """
+        rows = self.connector.execute_query(query, commit=False, fetch=True)
+        return RankSnapshot(rows)
@@ -1,22 +1,74 @@
 import boto3
 import uuid
 import io
+import time
+import threading
+from collections import OrderedDict
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from config import AWS_CONFIG
 
+class PresignedUrlCache:
+    """
+    Thread-safe cache of presigned URLs keyed by S3 key and expiration, bounded
+    to max_entries keys with the least recently used evicted first
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # s3_key -> {expiration: (url, valid_until)}
+        self._lock = threading.Lock()
+
+    def get(self, s3_key, expiration):
+        now = time.monotonic()
+        with self._lock:
+            urls = self._entries.get(s3_key)
+            if not urls or expiration not in urls:
+                return None
+            url, valid_until = urls[expiration]
+            if now >= valid_until:
+                del urls[expiration]
+                return None
+            self._entries.move_to_end(s3_key)
+            return url
+
+    def put(self, s3_key, expiration, url, ttl):
+        with self._lock:
+            self._entries.setdefault(s3_key, {})[expiration] = (url, time.monotonic() + ttl)
+            self._entries.move_to_end(s3_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, s3_key):
+        with self._lock:
+            self._entries.pop(s3_key, None)
+
 class S3Manager:
-    def __init__(self):
-        self.s3_client = boto3.client(
+    def __init__(self, s3_client=None, bucket_name=None):
+        # endpoint_url points the client at a local S3 stand-in (e.g. MinIO) when set
+        self.s3_client = s3_client or boto3.client(
             's3',
             aws_access_key_id=AWS_CONFIG['aws_access_key_id'],
             aws_secret_access_key=AWS_CONFIG['aws_secret_access_key'],
-            region_name=AWS_CONFIG['region_name']
+            region_name=AWS_CONFIG['region_name'],
+            endpoint_url=AWS_CONFIG.get('endpoint_url')
+        )
+        self.bucket_name = bucket_name or AWS_CONFIG['bucket_name']
+        self.url_cache = PresignedUrlCache(AWS_CONFIG.get('presigned_url_cache_size', 10000))
+        # Cached URLs are handed out only while they have at least this many seconds left
+        self.url_safety_margin = AWS_CONFIG.get('presigned_url_safety_margin', 300)
+        # File uploads go through the managed transfer: files above the threshold are sent
+        # as multipart uploads, holding at most max_concurrency parts in memory at a time
+        self.transfer_config = TransferConfig(
+            multipart_threshold=AWS_CONFIG.get('multipart_threshold', 8 * 1024 * 1024),
+            multipart_chunksize=AWS_CONFIG.get('multipart_chunksize', 8 * 1024 * 1024),
+            max_concurrency=AWS_CONFIG.get('multipart_concurrency', 2)
         )
-        self.bucket_name = AWS_CONFIG['bucket_name']
     
     def upload_profile_picture(self, user_id, file_data, content_type):
         """
         Upload a user's profile picture to S3 as a private object
+        file_data may be bytes or a readable file object; file objects are streamed
         Returns the S3 key of the uploaded image
         """
         try:
@@ -24,25 +76,58 @@ class S3Manager:
             filename = f"profile_pictures/{user_id}/{uuid.uuid4()}"
             
             # Upload the file to S3 as private (default)
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=filename,
-                Body=file_data,
-                ContentType=content_type
-            )
+            if hasattr(file_data, 'read'):
+                self.s3_client.upload_fileobj(
+                    file_data,
+                    self.bucket_name,
+                    filename,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=self.transfer_config
+                )
+            else:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=filename,
+                    Body=file_data,
+                    ContentType=content_type
+                )
+            self.url_cache.invalidate(filename)
             
             # Return the S3 key (instead of a URL)
             return filename
         
-        except ClientError as e:
+        except (ClientError, S3UploadFailedError) as e:
             print(f"Error uploading to S3: {e}")
             return None
     
+    def put_object(self, s3_key, data, content_type):
+        """
+        Store an object under an exact key (used for derived images such as thumbnails)
+        """
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Body=data,
+                ContentType=content_type
+            )
+            self.url_cache.invalidate(s3_key)
+            return True
+        
+        except ClientError as e:
+            print(f"Error uploading to S3: {e}")
+            return False
+
     def get_profile_picture_url(self, s3_key, expiration=3600):
         """
         Generate a presigned URL for a user's profile picture
         This URL will expire after the specified time (default: 1 hour)
+        Signed URLs are cached and reused until the safety margin before their expiry
         """
+        cached_url = self.url_cache.get(s3_key, expiration)
+        if cached_url:
+            return cached_url
+
         try:
             presigned_url = self.s3_client.generate_presigned_url(
                 'get_object',
@@ -52,11 +137,26 @@ class S3Manager:
                 },
                 ExpiresIn=expiration
             )
+
+            ttl = expiration - self.url_safety_margin
+            if ttl > 0:
+                self.url_cache.put(s3_key, expiration, presigned_url, ttl)
             return presigned_url
         
         except ClientError as e:
             print(f"Error generating presigned URL: {e}")
             return None
+
+    def get_profile_picture_urls(self, s3_keys, expiration=3600):
+        """
+        Presigned URLs for many profile pictures at once
+        Returns a dict of S3 key to URL, skipping empty keys
+        """
+        return {
+            s3_key: self.get_profile_picture_url(s3_key, expiration)
+            for s3_key in set(s3_keys)
+            if s3_key
+        }
     
     def get_profile_picture_data(self, s3_key):
         """
@@ -88,6 +188,28 @@ class S3Manager:
                 Bucket=self.bucket_name,
                 Key=s3_key
             )
+            self.url_cache.invalidate(s3_key)
+            return True
+        
+        except ClientError as e:
+            print(f"Error deleting from S3: {e}")
+            return False
+
+    def delete_objects(self, s3_keys):
+        """
+        Delete several objects with one request; keys that do not exist are ignored
+        """
+        s3_keys = list(s3_keys)
+        if not s3_keys:
+            return True
+
+        try:
+            self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in s3_keys], 'Quiet': True}
+            )
+            for key in s3_keys:
+                self.url_cache.invalidate(key)
             return True
         
         except ClientError as e:
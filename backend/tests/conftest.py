@@ -0,0 +1,70 @@
+"""
+Tests run against a scratch SQLite database per test, built by the migrations, so
+they need no database server. Run from the backend directory:
+
+    python -m pytest -q
+"""
+import os
+import sys
+import types
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# config.py holds deployment settings and is never committed; tests always use their
+# own, so they cannot touch a configured database or bucket
+config = types.ModuleType('config')
+config.DB_CONFIG = {'engine': 'sqlite', 'path': None, 'slow_query_ms': None}
+config.AWS_CONFIG = {
+    'bucket_name': 'test-bucket',
+    'region_name': 'us-east-1',
+    'aws_access_key_id': 'test',
+    'aws_secret_access_key': 'test'
+}
+config.CACHE_CONFIG = {'backend': 'memory', 'ttl': 60}
+config.HASH_CONFIG = {'bcrypt_rounds': 4, 'workers': 1}
+sys.modules['config'] = config
+
+@pytest.fixture
+def db_manager(tmp_path):
+    from database_manager import DatabaseManager
+    from migrate import MigrationRunner
+
+    config.DB_CONFIG['path'] = str(tmp_path / 'fitness.db')
+    manager = DatabaseManager()
+    MigrationRunner(manager.connector).migrate()
+    yield manager
+    manager.password_hasher.shutdown()
+    manager.connector.close()
+
+@pytest.fixture
+def make_user(db_manager):
+    def make(name='Test User'):
+        email = f"{name.lower().replace(' ', '.')}.{uuid.uuid4().hex[:8]}@example.com"
+        return str(db_manager.add_user(name, email, 'not-a-hash', 30, 'other'))
+    return make
+
+@pytest.fixture(scope='session')
+def api_client(tmp_path_factory):
+    """
+    Test client for the Flask app, on its own database shared by the whole session
+    """
+    from migrate import MigrationRunner
+
+    config.DB_CONFIG['path'] = str(tmp_path_factory.mktemp('api') / 'fitness.db')
+    import api
+    app = api.create_app()
+    MigrationRunner(api.db_manager.connector).migrate()
+    yield app.test_client()
+    api.picture_handler.thumbnails._executor.shutdown(wait=True)
+    api.db_manager.password_hasher.shutdown()
+    api.db_manager.connector.close()
+
+@pytest.fixture
+def api_user(api_client):
+    import api
+    email = f"api.{uuid.uuid4().hex[:8]}@example.com"
+    return str(api.db_manager.add_user('Api User', email, 'not-a-hash', 30, 'other'))
@@ -0,0 +1,32 @@
+import pytest
+
+import config
+
+ADMIN_ENDPOINTS = [
+    ('post', '/users/counters/reconcile'),
+    ('post', '/leaderboard/update?dry_run=true'),
+    ('post', '/leaderboard/activity/backfill'),
+    ('post', '/records/backfill'),
+    ('get', '/cache/stats'),
+    ('get', '/metrics')
+]
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_CONFIG', {'token': 'test-admin-token'}, raising=False)
+    return 'test-admin-token'
+
+@pytest.mark.parametrize('method, path', ADMIN_ENDPOINTS)
+def test_admin_endpoints_are_disabled_without_a_token(api_client, method, path, monkeypatch):
+    monkeypatch.delattr(config, 'ADMIN_CONFIG', raising=False)
+    assert getattr(api_client, method)(path).status_code == 403
+
+@pytest.mark.parametrize('method, path', ADMIN_ENDPOINTS)
+def test_admin_endpoints_require_the_token(api_client, admin_token, method, path):
+    request = getattr(api_client, method)
+
+    response = request(path)
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+    assert request(path, headers={'Authorization': 'Bearer wrong-token'}).status_code == 401
+    assert request(path, headers={'Authorization': f'Bearer {admin_token}'}).status_code == 200
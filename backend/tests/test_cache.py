@@ -0,0 +1,106 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+
+from cache import RedisCacheBackend, ResponseCache, dumps, loads
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        assert isinstance(value, str)
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def dbsize(self):
+        return len(self.data)
+
+def test_json_round_trip_keeps_types():
+    value = {
+        'rows': [('a', datetime.datetime(2024, 5, 1, 7, 30, 15, 120000), datetime.date(2024, 5, 1), decimal.Decimal('82.5'), None)],
+        'user_id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'rest': datetime.timedelta(seconds=90),
+        'by_day': {datetime.date(2024, 5, 1): 3},
+        'nested': {'__cache_type': 'not a tag', 'values': [1, 2.5, True, 'x']}
+    }
+    assert loads(dumps(value)) == value
+
+def test_uncacheable_values_are_not_stored():
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
+
+    cache = ResponseCache(RedisCacheBackend(client=FakeRedis()))
+    assert cache.get_or_load('profile', 'user', 'v', lambda: [object()]) is not None
+    assert cache.stats()['errors'] == 1
+
+def test_redis_backend_serves_cached_rows():
+    cache = ResponseCache(RedisCacheBackend(client=FakeRedis()))
+    rows = [('Bench press', datetime.datetime(2024, 5, 1, 7, 30))]
+    assert cache.get_or_load('workouts', 'user', 'v', lambda: rows) == rows
+    assert cache.get_or_load('workouts', 'user', 'v', lambda: pytest.fail("not served from the cache")) == rows
+
+    cache.invalidate(['workouts'], 'user')
+    assert cache.get_or_load('workouts', 'user', 'v', lambda: []) == []
+    assert cache.stats()['hits'] == 1
+
+def _hits(db_manager):
+    return db_manager.cache.stats()['hits']
+
+def test_reads_are_served_from_the_cache_until_a_write(db_manager, make_user):
+    user_id = make_user()
+    workout_id = db_manager.start_workout(user_id, '2024-03-01')
+    assert len(db_manager.get_user_workouts(user_id)['items']) == 1
+
+    hits = _hits(db_manager)
+    db_manager.get_user_workouts(user_id)
+    assert _hits(db_manager) == hits + 1
+
+    # Exercise writes invalidate the workouts, routines and progress of the owner
+    db_manager.add_exercise(workout_id, 'Squat', 3, 5, 100)
+    assert db_manager.get_user_workouts(user_id)['items'][0]['exercises'][0]['exercise'] == 'Squat'
+    assert [r['value'] for r in db_manager.get_personal_records(user_id) if r['metric'] == 'weight'] == [100]
+
+    db_manager.add_exercises(workout_id, [{'exercise': 'Squat', 'sets': 1, 'reps': 1, 'weight': 140}])
+    assert [r['value'] for r in db_manager.get_personal_records(user_id) if r['metric'] == 'weight'] == [140]
+    assert len(db_manager.get_user_workouts(user_id)['items'][0]['exercises']) == 2
+
+    db_manager.delete_workout(workout_id)
+    assert db_manager.get_user_workouts(user_id)['items'] == []
+    assert db_manager.get_personal_records(user_id) == []
+
+def test_follows_invalidate_both_users(db_manager, make_user):
+    follower, followed = make_user('Follower'), make_user('Followed')
+    assert db_manager.get_followers(followed) == []
+    following_before = db_manager.get_user_profile(follower)[0][3]
+
+    db_manager.follow_user(follower, followed)
+    assert [str(row[0]) for row in db_manager.get_followers(followed)] == [follower]
+    assert [str(row[0]) for row in db_manager.get_following(follower)] == [followed]
+    assert db_manager.get_user_profile(follower)[0][3] == following_before + 1
+
+    db_manager.unfollow_user(follower, followed)
+    assert db_manager.get_followers(followed) == []
+    assert db_manager.get_user_profile(follower)[0][3] == following_before
+
+def test_renaming_a_user_refreshes_cached_lists_showing_them(db_manager, make_user):
+    follower, followed = make_user('Follower'), make_user('Followed')
+    db_manager.follow_user(follower, followed)
+    db_manager.start_workout(followed, '2024-03-01')
+    assert db_manager.get_following(follower)[0][1] == 'Followed'
+    assert db_manager.get_user_workouts(followed)['items'][0]['user_name'] == 'Followed'
+
+    db_manager.update_user_profile(followed, name='Renamed')
+    assert db_manager.get_following(follower)[0][1] == 'Renamed'
+    assert db_manager.get_user_workouts(followed)['items'][0]['user_name'] == 'Renamed'
@@ -0,0 +1,102 @@
+"""
+Timestamps reach the database both as datetimes and as the client's raw strings
+('2024-01-03', '2024-01-03T11:00:00'); every form must sort and compare the same.
+"""
+from datetime import datetime
+
+def _page_through(fetch):
+    seen = []
+    cursor = None
+    for _ in range(20):
+        page = fetch(cursor)
+        seen.extend(workout['id'] for workout in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    return seen
+
+def test_feed_pages_through_date_only_workouts(db_manager, make_user):
+    user_id = make_user()
+    created = {db_manager.start_workout(user_id, '2024-01-03') for _ in range(5)}
+
+    seen = _page_through(lambda cursor: db_manager.get_workout_feed(user_id, 2, cursor, True))
+
+    assert len(seen) == 5
+    assert set(seen) == created
+
+def test_feed_keeps_same_day_workouts_with_t_timestamps(db_manager, make_user):
+    user_id = make_user()
+    created = [
+        db_manager.start_workout(user_id, date)
+        for date in ('2024-01-03T08:00:00', '2024-01-03T11:00:00', '2024-01-03T18:30:00', '2024-01-02')
+    ]
+
+    seen = _page_through(lambda cursor: db_manager.get_workout_feed(user_id, 1, cursor, True))
+
+    assert seen == [created[2], created[1], created[0], created[3]]
+
+def test_measurement_range_includes_whole_days(db_manager, make_user):
+    user_id = make_user()
+    for date in ('2024-01-01', '2024-01-02', '2024-01-03T09:15:00', '2024-01-04'):
+        db_manager.add_measurement(user_id, 80, 25, 20, 30, date)
+
+    dates = [row[6] for row in db_manager.get_measurements(user_id, start='2024-01-02', end='2024-01-03')]
+
+    assert dates == [datetime(2024, 1, 2), datetime(2024, 1, 3, 9, 15)]
+
+def test_leaderboard_rebuild_finds_no_drift(db_manager, make_user):
+    user_id = make_user()
+    for date in (datetime(2024, 1, 2, 6, 0), '2024-01-03', '2024-01-04T07:45:00'):
+        workout_id = db_manager.start_workout(user_id, date)
+        db_manager.add_exercise(workout_id, 'Squat', 3, 5, 100)
+
+    assert db_manager.update_leaderboard(dry_run=True) == []
+
+def test_moved_workout_keeps_rollup_dates_canonical(db_manager, make_user):
+    user_id = make_user()
+    workout_id = db_manager.start_workout(user_id, '2024-01-03T08:00:00')
+    db_manager.add_exercise(workout_id, 'Squat', 3, 5, 100)
+    db_manager.update_workout(workout_id, date='2024-01-05')
+
+    rollup = db_manager.get_leaderboard(10, '2024-01-01', '2024-01-31')
+    live = db_manager.get_leaderboard(10, '2024-01-01T00:00:00', '2024-01-31')
+    assert rollup == live
+    assert str(rollup[0][3]) == '2024-01-05 00:00:00'
+
+def test_sub_second_timestamps_match_bound_datetimes(db_manager, make_user):
+    user_id = make_user()
+    raw = {
+        '2024-01-03T11:00:00.250000': '2024-01-03 11:00:00.250000',
+        '2024-01-03T11:00:00.5': '2024-01-03 11:00:00.500000',
+        '2024-01-03T11:00:00.999999+02:00': '2024-01-03 09:00:00.999999',
+        '2024-01-03T11:00:00.000Z': '2024-01-03 11:00:00',
+        '2024-01-03T11:00:00': '2024-01-03 11:00:00',
+        '2024-01-03': '2024-01-03 00:00:00'
+    }
+    stored = {}
+    for value in raw:
+        workout_id = db_manager.start_workout(user_id, value)
+        stored[value] = db_manager.connector.execute_query(
+            "SELECT date FROM workouts WHERE id = %s", (workout_id,), fetch=True
+        )[0][0]
+    assert {value: str(date) for value, date in stored.items()} == raw
+
+    # The same moment bound as a datetime is stored identically
+    bound = db_manager.start_workout(user_id, datetime(2024, 1, 3, 11, 0, 0, 250000))
+    assert db_manager.connector.execute_query(
+        "SELECT COUNT(*) FROM workouts WHERE date = %s AND id <> %s", (datetime(2024, 1, 3, 11, 0, 0, 250000), bound),
+        fetch=True
+    )[0][0] == 1
+
+    # Same-second workouts page in time order
+    second = [db_manager.start_workout(user_id, date) for date in ('2024-02-01T08:00:00.75', '2024-02-01T08:00:00.125')]
+    seen = _page_through(lambda cursor: db_manager.get_workout_feed(user_id, 1, cursor))
+    assert seen[:2] == second
+
+def test_sub_second_measurements_keep_their_fraction(db_manager, make_user):
+    user_id = make_user()
+    db_manager.add_measurement(user_id, 80.0, None, None, None, '2024-01-03T09:15:00.5')
+    rows = db_manager.connector.execute_query(
+        "SELECT date_recorded FROM measurements WHERE user_id = %s", (user_id,), fetch=True
+    )
+    assert str(rows[0][0]) == '2024-01-03 09:15:00.500000'
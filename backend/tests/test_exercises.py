@@ -0,0 +1,136 @@
+"""
+Exercise writes keep the leaderboard, the daily activity rollup and personal records
+current incrementally; each test checks them against a full recomputation.
+"""
+import pytest
+
+def _totals(db_manager, user_id):
+    rows = db_manager.connector.execute_query(
+        "SELECT total_weight_lifted, workout_days_count FROM leaderboard WHERE user_id = %s", (user_id,), fetch=True
+    )
+    return (float(rows[0][0]), rows[0][1]) if rows else None
+
+def _exercise_count(db_manager, workout_id):
+    return db_manager.connector.execute_query(
+        "SELECT COUNT(*) FROM exercises WHERE workout_id = %s", (workout_id,), fetch=True
+    )[0][0]
+
+def _records(db_manager, user_id):
+    return {(r['exercise'], r['metric'], r['at_weight']): (r['value'], r['exercise_id'])
+            for r in db_manager.get_personal_records(user_id)}
+
+def _assert_no_drift(db_manager, user_id):
+    assert db_manager.update_leaderboard(dry_run=True) == []
+    # The rollup path must agree with the live join over the same days
+    rollup = db_manager.get_leaderboard(10, '2000-01-01', '2100-01-01')
+    live = db_manager.get_leaderboard(10, '2000-01-01T00:00:00', '2100-01-01')
+    assert rollup == live
+    # Incremental records match a rebuild from the user's history
+    records = _records(db_manager, user_id)
+    db_manager.backfill_personal_records(user_id)
+    assert _records(db_manager, user_id) == records
+
+def test_add_exercises_stores_all_rows_in_order(db_manager, make_user):
+    user_id = make_user()
+    workout_id = db_manager.start_workout(user_id, '2024-03-01')
+    ids = db_manager.add_exercises(workout_id, [
+        {'exercise': 'Squat', 'sets': 3, 'reps': 5, 'weight': 100},
+        {'exercise': 'Bench Press', 'sets': 3, 'reps': 8, 'weight': 60},
+        {'exercise': 'Squat', 'sets': 1, 'reps': 3, 'weight': 110}
+    ])
+
+    assert [str(row[0]) for row in db_manager.get_workout_exercises(workout_id)] == ids
+    assert _totals(db_manager, user_id) == (3 * 5 * 100 + 3 * 8 * 60 + 3 * 110, 1)
+    _assert_no_drift(db_manager, user_id)
+
+def test_add_exercises_is_all_or_nothing(db_manager, make_user, monkeypatch):
+    user_id = make_user()
+    workout_id = db_manager.start_workout(user_id, '2024-03-01')
+    db_manager.add_exercise(workout_id, 'Squat', 3, 5, 100)
+    before = _totals(db_manager, user_id), _records(db_manager, user_id)
+
+    # A row the database rejects fails the whole statement
+    assert db_manager.add_exercises(workout_id, [
+        {'exercise': 'Squat', 'sets': 3, 'reps': 5, 'weight': 120},
+        {'exercise': None, 'sets': 3, 'reps': 5, 'weight': 120}
+    ]) is None
+    assert _exercise_count(db_manager, workout_id) == 1
+
+    # A failure after the insert rolls the rows back with the leaderboard and rollup changes
+    def fail(*args):
+        raise RuntimeError("records unavailable")
+    monkeypatch.setattr(db_manager, '_apply_personal_records', fail)
+    assert db_manager.add_exercises(workout_id, [{'exercise': 'Squat', 'sets': 3, 'reps': 5, 'weight': 120}]) is None
+    monkeypatch.undo()
+
+    assert _exercise_count(db_manager, workout_id) == 1
+    assert (_totals(db_manager, user_id), _records(db_manager, user_id)) == before
+    _assert_no_drift(db_manager, user_id)
+
+def test_personal_records_follow_adds_edits_and_deletes(db_manager, make_user):
+    user_id = make_user()
+    first = db_manager.start_workout(user_id, '2024-03-01')
+    second = db_manager.start_workout(user_id, '2024-03-08')
+
+    logged = db_manager.add_exercise(first, 'Squat', 3, 5, 100)
+    assert {r['metric'] for r in logged['personal_records']} == {'weight', 'reps', 'volume', 'e1rm'}
+    # A lighter set only opens a reps record at its own weight, and repeating it sets nothing
+    lighter = db_manager.add_exercise(first, 'Squat', 1, 5, 90)['personal_records']
+    assert [(r['metric'], r['at_weight']) for r in lighter] == [('reps', 90)]
+    assert db_manager.add_exercise(first, 'Squat', 1, 5, 90)['personal_records'] == []
+
+    heavier = db_manager.add_exercise(second, 'Squat', 1, 3, 120)
+    weight_record = next(r for r in heavier['personal_records'] if r['metric'] == 'weight')
+    assert (weight_record['value'], weight_record['previous']) == (120, 100)
+    assert _records(db_manager, user_id)[('Squat', 'weight', None)] == (120, heavier['exercise_id'])
+
+    # Editing the record set down hands the record back to the best remaining set
+    db_manager.update_exercise(heavier['exercise_id'], weight=95)
+    assert _records(db_manager, user_id)[('Squat', 'weight', None)] == (100, logged['exercise_id'])
+    _assert_no_drift(db_manager, user_id)
+
+    db_manager.delete_exercise(logged['exercise_id'])
+    assert _records(db_manager, user_id)[('Squat', 'weight', None)][0] == 95
+    _assert_no_drift(db_manager, user_id)
+
+    db_manager.delete_workout(second)
+    db_manager.update_workout(first, date='2024-02-20')
+    _assert_no_drift(db_manager, user_id)
+
+@pytest.mark.parametrize('change', ['delete_exercise', 'delete_workout', 'move_workout'])
+def test_leaderboard_deltas_match_a_rebuild(db_manager, make_user, change):
+    user_id = make_user()
+    workout_id = db_manager.start_workout(user_id, '2024-03-01T18:00:00')
+    kept = db_manager.start_workout(user_id, '2024-02-01')
+    db_manager.add_exercise(kept, 'Row', 3, 10, 40)
+    exercise_id = db_manager.add_exercise(workout_id, 'Squat', 3, 5, 100)['exercise_id']
+    db_manager.update_exercise(exercise_id, reps=6)
+    assert _totals(db_manager, user_id) == (3 * 10 * 40 + 3 * 6 * 100, 2)
+
+    if change == 'delete_exercise':
+        db_manager.delete_exercise(exercise_id)
+        assert _totals(db_manager, user_id) == (1200, 1)
+    elif change == 'delete_workout':
+        db_manager.delete_workout(workout_id)
+        assert _totals(db_manager, user_id) == (1200, 1)
+    else:
+        db_manager.update_workout(workout_id, date='2024-01-15')
+        assert _totals(db_manager, user_id) == (3000, 2)
+    _assert_no_drift(db_manager, user_id)
+
+def test_first_exercise_check_runs_after_the_workout_lock(db_manager, make_user):
+    # Postgres READ COMMITTED gives each statement its own snapshot: an EXISTS inside the
+    # locking SELECT would not see an exercise committed by the writer it waited for, and
+    # concurrent first exercises would both count the workout. SQLite's single writer
+    # cannot overlap them, so the statement order is what is checked here.
+    user_id = make_user()
+    workout_id = db_manager.start_workout(user_id, '2024-03-01')
+    statements = []
+    db_manager.connector.query_hooks.append(lambda query, *_: statements.append(' '.join(query.split())))
+
+    db_manager.add_exercise(workout_id, 'Squat', 3, 5, 100)
+
+    lock = next(i for i, query in enumerate(statements) if query.startswith('SELECT w.user_id, w.date'))
+    check = next(i for i, query in enumerate(statements) if query.startswith('SELECT EXISTS'))
+    assert 'exercises' not in statements[lock]
+    assert lock < check
@@ -0,0 +1,71 @@
+def _log(db_manager, user_id, date, weight):
+    workout_id = db_manager.start_workout(user_id, date)
+    db_manager.add_exercise(workout_id, 'Squat', 3, 5, weight)
+
+def test_rollup_and_live_paths_use_the_same_window(db_manager, make_user):
+    alice, bob = make_user('Alice'), make_user('Bob')
+    _log(db_manager, alice, '2024-01-01T23:00:00', 100)
+    _log(db_manager, alice, '2024-01-02T07:00:00', 100)
+    _log(db_manager, alice, '2024-01-03T18:00:00', 100)
+    _log(db_manager, bob, '2024-01-03', 80)
+    _log(db_manager, bob, '2024-01-04T06:00:00', 500)
+
+    # Whole days are answered from the rollup; a bound with a time uses the live join
+    rollup = db_manager.get_leaderboard(10, '2024-01-02', '2024-01-03')
+    live_end_day = db_manager.get_leaderboard(10, '2024-01-02T00:00:00', '2024-01-03')
+    live_end_time = db_manager.get_leaderboard(10, '2024-01-02T00:00:00', '2024-01-03T23:59:59')
+
+    assert [tuple(row[:3]) for row in rollup] == [('Alice', 3000, 2), ('Bob', 1200, 1)]
+    assert live_end_day == rollup
+    assert live_end_time == rollup
+
+def test_end_time_bound_is_exact(db_manager, make_user):
+    alice = make_user('Alice')
+    _log(db_manager, alice, '2024-01-03T08:00:00', 100)
+    _log(db_manager, alice, '2024-01-03T18:00:00', 100)
+
+    rows = db_manager.get_leaderboard(10, '2024-01-03', '2024-01-03T12:00:00')
+    assert [tuple(row[:3]) for row in rows] == [('Alice', 1500, 1)]
+
+def test_exercise_writes_refresh_ranks(db_manager, make_user):
+    alice, bob = make_user('Alice'), make_user('Bob')
+    _log(db_manager, alice, '2024-01-01', 100)
+    _log(db_manager, bob, '2024-01-01', 50)
+    assert (db_manager.get_user_ranking(alice), db_manager.get_user_ranking(bob)) == (1, 2)
+
+    # Well within the snapshot's TTL
+    workout_id = db_manager.start_workout(bob, '2024-01-02')
+    exercise_id = db_manager.add_exercise(workout_id, 'Deadlift', 5, 5, 200)['exercise_id']
+    assert (db_manager.get_user_ranking(alice), db_manager.get_user_ranking(bob)) == (2, 1)
+
+    db_manager.delete_exercise(exercise_id)
+    assert (db_manager.get_user_ranking(alice), db_manager.get_user_ranking(bob)) == (1, 2)
+
+def test_rank_snapshot_is_kept_when_a_write_rolls_back(db_manager, make_user):
+    alice = make_user('Alice')
+    _log(db_manager, alice, '2024-01-01', 100)
+    snapshot = db_manager.rank_service.snapshot()
+
+    try:
+        with db_manager.connector.transaction() as tx:
+            db_manager._apply_activity_delta(tx, alice, '2024-01-02', 500, 1)
+            raise RuntimeError("abandoned")
+    except RuntimeError:
+        pass
+    assert db_manager.rank_service.snapshot() is snapshot
+
+def test_deleted_and_renamed_users_refresh_ranks(db_manager, make_user):
+    alice, bob, carol = make_user('Alice'), make_user('Bob'), make_user('Carol')
+    _log(db_manager, alice, '2024-01-01', 300)
+    _log(db_manager, bob, '2024-01-01', 200)
+    _log(db_manager, carol, '2024-01-01', 100)
+    assert db_manager.get_user_ranking(carol) == 3
+
+    # Well within the snapshot's TTL
+    db_manager.update_user_profile(bob, name='Robert')
+    window = db_manager.get_user_rank_window(carol, 1)
+    assert [entry['name'] for entry in window['above']] == ['Robert']
+
+    db_manager.delete_user(alice)
+    assert db_manager.get_user_ranking(alice) is None
+    assert (db_manager.get_user_ranking(bob), db_manager.get_user_ranking(carol)) == (1, 2)
@@ -0,0 +1,67 @@
+def test_user_workouts_page_with_the_managers_cursor(db_manager, make_user):
+    user_id = make_user()
+    created = [db_manager.start_workout(user_id, f'2024-01-0{day}') for day in range(1, 5)]
+
+    first = db_manager.get_user_workouts(user_id, 2)
+    second = db_manager.get_user_workouts(user_id, 2, first['next_cursor'])
+
+    assert [w['id'] for w in first['items'] + second['items']] == created[::-1]
+    # Exactly two left: the second page is full but nothing follows it
+    assert second['next_cursor'] is None
+    assert db_manager.get_user_workouts(user_id)['next_cursor'] is None
+
+def test_next_cursor_header_only_when_another_page_exists(api_client, api_user):
+    import api
+
+    for day in range(1, 5):
+        api.db_manager.start_workout(api_user, f'2024-02-0{day}', routine=1)
+
+    for path in (f'/workouts/{api_user}', f'/users/{api_user}/routines'):
+        first = api_client.get(f'{path}?limit=2')
+        assert first.status_code == 200 and len(first.get_json()) == 2
+        cursor = first.headers['X-Next-Cursor']
+
+        last = api_client.get(f'{path}?limit=2&before={cursor}')
+        assert len(last.get_json()) == 2
+        assert 'X-Next-Cursor' not in last.headers
+        assert 'X-Next-Cursor' not in api_client.get(path).headers
+
+def test_feed_pages_stay_stable_while_workouts_are_logged(db_manager, make_user):
+    viewer, friend = make_user('Viewer'), make_user('Friend')
+    db_manager.follow_user(viewer, friend)
+    older = [db_manager.start_workout(user_id, f'2024-01-0{day}')
+             for day, user_id in zip(range(1, 6), [viewer, friend] * 3)]
+
+    first = db_manager.get_workout_feed(viewer, 2, include_viewed=True)
+    # Logged after the first page was read: newer than every cursor, so never paged into
+    db_manager.start_workout(friend, '2024-01-09')
+    second = db_manager.get_workout_feed(viewer, 2, first['next_cursor'], True)
+    third = db_manager.get_workout_feed(viewer, 2, second['next_cursor'], True)
+
+    seen = [w['id'] for page in (first, second, third) for w in page['items']]
+    assert seen == older[::-1]
+    assert third['next_cursor'] is None
+
+def test_unviewed_feed_skips_viewed_workouts(db_manager, make_user):
+    viewer = make_user('Viewer')
+    created = [db_manager.start_workout(viewer, f'2024-01-0{day}') for day in range(1, 5)]
+    db_manager.mark_workout_viewed(created[2], viewer)
+
+    # Viewed workouts are shown unless the caller asks to hide them
+    assert len(db_manager.get_workout_feed(viewer, 10)['items']) == 4
+
+    first = db_manager.get_workout_feed(viewer, 2, include_viewed=False)
+    second = db_manager.get_workout_feed(viewer, 2, first['next_cursor'], include_viewed=False)
+    assert [w['id'] for w in first['items'] + second['items']] == [created[3], created[1], created[0]]
+    assert second['next_cursor'] is None
+
+def test_feed_endpoint_shows_viewed_workouts_by_default(api_client, api_user):
+    import api
+
+    workout_id = api.db_manager.start_workout(api_user, '2024-03-01')
+    api.db_manager.mark_workout_viewed(workout_id, api_user)
+
+    shown = [item['id'] for item in api_client.get(f'/feed/{api_user}').get_json()['items']]
+    hidden = [item['id'] for item in api_client.get(f'/feed/{api_user}?include_viewed=false').get_json()['items']]
+    assert workout_id in shown
+    assert workout_id not in hidden
@@ -0,0 +1,49 @@
+import pytest
+
+from password_hasher import PasswordHasher, HasherBusyError
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, workers=1)
+    yield hasher
+    hasher.shutdown()
+
+def test_hash_and_verify_in_spawned_workers(hasher):
+    stored_hash = hasher.hash('secret')
+    assert hasher.verify('secret', stored_hash) == (True, None)
+    assert hasher.verify('wrong', stored_hash)[0] is False
+    assert hasher._get_executor()._mp_context.get_start_method() == 'spawn'
+
+def test_login_timeout_is_busy_not_invalid(db_manager, make_user):
+    user_id = make_user()
+    stored_hash = db_manager.password_hasher.hash('secret')
+    db_manager.connector.execute_query("UPDATE users SET password_hash = %s WHERE id = %s", (stored_hash, user_id))
+    email = db_manager.connector.execute_query("SELECT email FROM users WHERE id = %s", (user_id,), fetch=True)[0][0]
+
+    # No spawned worker answers within a millisecond
+    db_manager.password_hasher.shutdown()
+    db_manager.password_hasher = PasswordHasher(rounds=4, workers=1, timeout=0.001)
+    with pytest.raises(HasherBusyError):
+        db_manager.user_login(email, 'secret')
+
+def test_spawned_workers_do_not_build_the_api_services(tmp_path):
+    # A spawned worker imports the script that started the server as __mp_main__
+    import os
+    import subprocess
+    import sys
+    from conftest import BACKEND_DIR
+
+    (tmp_path / 'config.py').write_text(
+        "DB_CONFIG = {'engine': 'sqlite', 'path': 'unused.db'}\n"
+        "AWS_CONFIG = {'bucket_name': 'b', 'region_name': 'us-east-1',"
+        " 'aws_access_key_id': 'x', 'aws_secret_access_key': 'x'}\n"
+    )
+    script = (
+        "import runpy; "
+        f"namespace = runpy.run_path({os.path.join(BACKEND_DIR, 'api.py')!r}, run_name='__mp_main__'); "
+        "assert namespace['db_manager'] is None and namespace['picture_handler'] is None"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path), BACKEND_DIR]))
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / 'unused.db').exists()
@@ -0,0 +1,43 @@
+import pytest
+
+from prepared_statements import StatementRegistry
+
+def test_placeholders_are_numbered_for_prepare():
+    statement = StatementRegistry().get('by_email', "SELECT id FROM users WHERE email = %s AND name LIKE '%%a'")
+
+    assert statement.prepare_sql == "PREPARE by_email AS SELECT id FROM users WHERE email = $1 AND name LIKE '%a'"
+    assert statement.execute_sql == "EXECUTE by_email (%s)"
+
+def test_a_name_cannot_be_reused_for_another_query():
+    registry = StatementRegistry()
+    registry.get('lookup', "SELECT 1")
+
+    with pytest.raises(ValueError):
+        registry.get('lookup', "SELECT 2")
+
+def test_registry_cannot_be_enabled_without_engine_support():
+    registry = StatementRegistry(enabled=True, supported=False)
+
+    assert not registry.enabled
+    assert registry.get('lookup', "SELECT 1") is None
+    with pytest.raises(ValueError):
+        registry.enabled = True
+
+def test_sqlite_queries_ignore_prepare(db_manager, make_user):
+    user_id = make_user()
+
+    with pytest.raises(ValueError):
+        db_manager.connector.statements.enabled = True
+    assert db_manager.get_user_profile(user_id) is not None
+
+def test_sqlite_translation_cache_is_bounded():
+    from engines import SQLiteEngine, _translate_sql
+
+    engine = SQLiteEngine({'path': ':memory:'})
+    query, params = engine.translate("SELECT id FROM users WHERE name LIKE '%%a' AND id = %s FOR UPDATE", ('x',))
+    assert (query.strip(), params) == ("SELECT id FROM users WHERE name LIKE '%a' AND id = ?", ('x',))
+
+    # One distinct query per IN-list length must not grow the cache without limit
+    for length in range(1, _translate_sql.cache_info().maxsize + 50):
+        engine.translate(f"SELECT id FROM users WHERE id IN ({', '.join(['%s'] * length)})", ('x',) * length)
+    assert _translate_sql.cache_info().currsize <= _translate_sql.cache_info().maxsize
@@ -0,0 +1,104 @@
+import io
+
+import pytest
+from botocore.exceptions import ClientError
+
+from thumbnails import thumbnail_key
+
+PIL = pytest.importorskip('PIL.Image')
+
+class FakeS3Client:
+    """
+    In-memory stand-in for the boto3 client calls S3Manager makes; HEAD requests fail the test
+    """
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = (Body, ContentType)
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.objects[key] = (fileobj.read(), ExtraArgs['ContentType'])
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        body, content_type = self.objects[Key]
+        return {'Body': io.BytesIO(body), 'ContentType': content_type}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete['Objects']:
+            self.objects.pop(item['Key'], None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://signed.example/{Params['Key']}?expires={ExpiresIn}"
+
+    def head_object(self, Bucket, Key):
+        raise AssertionError(f"unexpected HEAD request for {Key}")
+
+@pytest.fixture
+def picture_handler(db_manager):
+    from database_manager import ProfilePictureHandler
+    from s3_manager import S3Manager
+
+    handler = ProfilePictureHandler(db_manager, S3Manager(FakeS3Client(), 'test-bucket'))
+    yield handler
+    _wait_for_thumbnails(handler)
+
+def _jpeg(width=1200, height=1100):
+    buffer = io.BytesIO()
+    PIL.new('RGB', (width, height), 'red').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+def _wait_for_thumbnails(handler):
+    # Drain the pool so every queued upload has recorded its sizes
+    handler.thumbnails._executor.shutdown(wait=True)
+
+def test_sized_urls_come_from_recorded_thumbnails(db_manager, make_user, picture_handler):
+    user_id = make_user()
+    assert picture_handler.upload_profile_picture(user_id, _jpeg(), 'image/jpeg')
+    _wait_for_thumbnails(picture_handler)
+    s3_key = db_manager.get_profile_picture_key(user_id)
+
+    # Until sizes are recorded the original is served
+    db_manager.connector.execute_query("UPDATE users SET profile_picture_sizes = NULL WHERE id = %s", (user_id,))
+    assert picture_handler.get_profile_picture_url(user_id, size=64).startswith(f"https://signed.example/{s3_key}?")
+
+    db_manager.set_profile_picture_sizes(user_id, s3_key, [1024, 64, 256])
+    assert db_manager.get_profile_pictures([user_id]) == {user_id: (s3_key, [64, 256, 1024])}
+    assert thumbnail_key(s3_key, 256) in picture_handler.get_profile_picture_url(user_id, size=100)
+    assert picture_handler.get_profile_picture_urls([user_id], size=64)[user_id].startswith(
+        f"https://signed.example/{thumbnail_key(s3_key, 64)}?")
+    assert picture_handler.get_profile_picture_url(user_id).startswith(f"https://signed.example/{s3_key}?")
+
+def test_pipeline_records_sizes_for_current_picture_only(db_manager, make_user, picture_handler):
+    user_id = make_user()
+    assert picture_handler.upload_profile_picture(user_id, _jpeg(), 'image/jpeg')
+    _wait_for_thumbnails(picture_handler)
+
+    s3_key, sizes = db_manager.get_profile_pictures([user_id])[user_id]
+    assert sizes == sorted(picture_handler.thumbnails.sizes)
+    assert all(thumbnail_key(s3_key, size) in picture_handler.s3_manager.s3_client.objects for size in sizes)
+
+    # Thumbnails finishing after the picture was replaced are not recorded against the new one
+    db_manager.update_profile_picture(user_id, 'profile_pictures/newer')
+    assert not db_manager.set_profile_picture_sizes(user_id, s3_key, sizes)
+    assert db_manager.get_profile_pictures([user_id])[user_id] == ('profile_pictures/newer', [])
+
+def test_small_originals_are_not_upscaled(db_manager, make_user, picture_handler):
+    user_id = make_user()
+    assert picture_handler.upload_profile_picture(user_id, _jpeg(300, 200), 'image/jpeg')
+    _wait_for_thumbnails(picture_handler)
+
+    s3_key, sizes = db_manager.get_profile_pictures([user_id])[user_id]
+    assert sizes == [64]
+    stored = picture_handler.s3_manager.s3_client.objects
+    assert thumbnail_key(s3_key, 64) in stored and thumbnail_key(s3_key, 256) not in stored
+
+    # Sizes beyond the stored thumbnails fall back to the 200px original
+    assert picture_handler.get_profile_picture_url(user_id, size=48).startswith(
+        f"https://signed.example/{thumbnail_key(s3_key, 64)}?")
+    assert picture_handler.get_profile_picture_url(user_id, size=256).startswith(f"https://signed.example/{s3_key}?")
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from uploads import check_upload_size, spool_upload, UploadTooLargeError
+
+@pytest.fixture
+def stored_pictures(api_client, monkeypatch):
+    import api
+
+    uploads = []
+    def upload(user_id, image_file, content_type):
+        uploads.append((image_file, image_file.read(), content_type))
+        return True
+    monkeypatch.setattr(api.picture_handler, 'upload_profile_picture', upload)
+    return uploads
+
+def test_spool_upload_stops_at_the_limit():
+    with pytest.raises(UploadTooLargeError):
+        spool_upload(io.BytesIO(b'x' * 101), 100, chunk_size=16)
+
+    spooled, size = spool_upload(io.BytesIO(b'x' * 100), 100, chunk_size=16)
+    assert size == 100 and spooled.read() == b'x' * 100
+
+def test_check_upload_size_rewinds_without_copying():
+    upload = io.BytesIO(b'x' * 100)
+    upload.read(10)
+    assert check_upload_size(upload, 100) is upload
+    assert upload.tell() == 0
+    with pytest.raises(UploadTooLargeError):
+        check_upload_size(upload, 99)
+
+def test_form_upload_uses_the_parsed_file(api_client, api_user, stored_pictures):
+    response = api_client.post(f'/users/{api_user}/profile-picture', data={
+        'file': (io.BytesIO(b'picture'), 'me.jpg', 'image/jpeg')
+    })
+    assert response.status_code == 201
+    _, data, content_type = stored_pictures[0]
+    assert data == b'picture' and content_type == 'image/jpeg'
+
+def test_raw_upload_over_the_limit_is_refused(api_client, api_user, stored_pictures, monkeypatch):
+    import api
+
+    monkeypatch.setitem(api.app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = api_client.post(f'/users/{api_user}/profile-picture', data=b'x' * 2048,
+                               content_type='image/jpeg')
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+
+    # Chunked bodies declare no length and are cut off while being read
+    response = api_client.post(f'/users/{api_user}/profile-picture', input_stream=io.BytesIO(b'x' * 2048),
+                               content_type='image/jpeg', headers={'Transfer-Encoding': 'chunked'},
+                               environ_overrides={'wsgi.input_terminated': True})
+    assert response.status_code == 413
+    assert not stored_pictures
@@ -0,0 +1,104 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+THUMBNAIL_SIZES = (64, 256, 1024)
+
+def thumbnail_key(s3_key, size):
+    """
+    Key of a resized variant, stored next to the original upload
+    """
+    return f"{s3_key}_{size}"
+
+def pick_size(requested, sizes=THUMBNAIL_SIZES):
+    """
+    Smallest variant at least as large as requested, or the largest one
+    """
+    for size in sorted(sizes):
+        if size >= requested:
+            return size
+    return max(sizes)
+
+def _output_format():
+    if features.check('webp'):
+        return 'WEBP', 'image/webp'
+    return 'JPEG', 'image/jpeg'
+
+def render_thumbnails(image_data, sizes=THUMBNAIL_SIZES, quality=80):
+    """
+    Centre-crop an image to a square and re-encode it at each size no larger than
+    its shorter side; smaller originals are never upscaled.
+
+    Returns:
+        tuple: ({size: encoded bytes}, content_type)
+    """
+    image_format, content_type = _output_format()
+
+    with Image.open(io.BytesIO(image_data)) as original:
+        # Phone cameras store rotation in EXIF rather than in the pixels
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    variants = {}
+    sizes = [size for size in sizes if size <= min(image.size)]
+    # Downscale from the previous, larger variant to keep each step cheap
+    for size in sorted(sizes, reverse=True):
+        image = ImageOps.fit(image, (size, size), method=Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+        variants[size] = buffer.getvalue()
+    return variants, content_type
+
+class ThumbnailPipeline:
+    """
+    Produces resized profile picture variants on a small worker pool, off the
+    request path. Disabled (uploads keep only the original) when Pillow is not
+    installed.
+    """
+    def __init__(self, s3_manager, sizes=THUMBNAIL_SIZES, workers=2):
+        self.s3_manager = s3_manager
+        self.sizes = tuple(sizes)
+        self.enabled = Image is not None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnails')
+
+        if not self.enabled:
+            print("Pillow is not installed, profile picture thumbnails are disabled.")
+
+    def submit(self, s3_key, image_data=None, on_stored=None):
+        """
+        Queue variant generation for an uploaded picture. When image_data is not given,
+        the original is read back from S3. on_stored is called with the sorted list of
+        stored sizes once at least one variant is stored.
+
+        Returns:
+            Future resolving to the list of sizes stored, or None if the pipeline is disabled
+        """
+        if not self.enabled:
+            return None
+        return self._executor.submit(self._process, s3_key, image_data, on_stored)
+
+    def _process(self, s3_key, image_data, on_stored=None):
+        try:
+            if image_data is None:
+                image_data, _ = self.s3_manager.get_profile_picture_data(s3_key)
+                if image_data is None:
+                    return []
+
+            variants, content_type = render_thumbnails(image_data, self.sizes)
+            stored = []
+            for size, data in variants.items():
+                if self.s3_manager.put_object(thumbnail_key(s3_key, size), data, content_type):
+                    stored.append(size)
+            print(f"Thumbnails stored for {s3_key}: {sorted(stored)}")
+            if stored and on_stored:
+                on_stored(sorted(stored))
+            return sorted(stored)
+        except Exception as e:
+            print(f"Error generating thumbnails for {s3_key}: {e}")
+            return []
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
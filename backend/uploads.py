@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+class UploadTooLargeError(Exception):
+    pass
+
+def spool_upload(stream, max_bytes, spool_threshold=1024 * 1024, chunk_size=64 * 1024):
+    """
+    Copy an incoming upload into a temporary file, chunk by chunk, stopping as soon
+    as it grows past max_bytes. The copy stays in memory up to spool_threshold bytes
+    and moves to disk beyond that, so memory per upload is bounded whatever its size.
+
+    Returns:
+        tuple: (file object rewound to the start, size in bytes); the caller closes it
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit.")
+            spooled.write(chunk)
+    except Exception:
+        spooled.close()
+        raise
+
+    spooled.seek(0)
+    return spooled, size
+
+def check_upload_size(spooled, max_bytes):
+    """
+    Check the size of an upload that is already in a seekable file (such as a
+    multipart file part spooled by the form parser) without copying it again.
+
+    Returns:
+        The same file object, rewound to the start
+    """
+    size = spooled.seek(0, os.SEEK_END)
+    if size > max_bytes:
+        raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit.")
+    spooled.seek(0)
+    return spooled
@@ -9,128 +9,109 @@ import 'package:fitt_tracker/utils/session_manager.dart';
 const String _baseUrl = 'http://51.20.171.163:8000';
 
 class FeedService {
+  /// Cursor for the page after the last one fetched, or null when exhausted.
+  String? nextCursor;
+
   /// Fetches your own workouts plus everyone you follow,
   /// sorted newest→oldest by the workout’s reported date.
-  Future<List<FeedItem>> fetchFollowedAndOwnWorkouts() async {
+  ///
+  /// The server assembles the feed in one request; pass [cursor]
+  /// (see [nextCursor]) to load the following page.
+  Future<List<FeedItem>> fetchFollowedAndOwnWorkouts({
+    String? cursor,
+    int limit = 20,
+  }) async {
     final userId = await SessionManager.getUserId();
     if (userId == null) {
       throw Exception('No user; cannot load feed');
     }
 
-    // 1) load who you follow
-    final followRes = await http.get(
-      Uri.parse('$_baseUrl/users/$userId/following'),
+    final query = <String, String>{'limit': '$limit'};
+    if (cursor != null) query['cursor'] = cursor;
+
+    final feedRes = await http.get(
+      Uri.parse('$_baseUrl/feed/$userId').replace(queryParameters: query),
     );
-    if (followRes.statusCode != 200) {
-      throw Exception('Could not load following list (${followRes.statusCode})');
+    if (feedRes.statusCode != 200) {
+      throw Exception('Could not load feed (${feedRes.statusCode})');
     }
-    final rawFollow = jsonDecode(followRes.body);
-    final followList = rawFollow is List ? rawFollow : <dynamic>[];
-    final followeeIds = followList
-        .map<String?>((e) => (e is List && e.isNotEmpty) ? e[0] as String : null)
-        .whereType<String>()
-        .toList();
-
-    // 2) include self
-    final userIds = <String>[userId, ...followeeIds];
+    final rawFeed = jsonDecode(feedRes.body);
+    if (rawFeed is! Map<String, dynamic>) {
+      throw Exception('Unexpected feed response');
+    }
+    nextCursor = rawFeed['next_cursor'] as String?;
+    final rawItems = rawFeed['items'];
+    final feedList = rawItems is List ? rawItems : <dynamic>[];
 
     final dateFmt = DateFormat("EEE, dd MMM yyyy HH:mm:ss 'GMT'");
     final items = <FeedItem>[];
 
-    // 3) for each user, fetch workouts & details
-    for (final uid in userIds) {
-      final wkRes = await http.get(Uri.parse('$_baseUrl/workouts/$uid'));
-      if (wkRes.statusCode != 200) continue;
-
-      final rawWk = jsonDecode(wkRes.body);
-      final wkList = rawWk is List ? rawWk : <dynamic>[];
-
-      for (final w in wkList) {
-        if (w is! Map<String, dynamic>) continue;
-        final workoutId = w['id'] as String?;
-        if (workoutId == null) continue;
-
-        final detRes = await http.get(
-          Uri.parse('$_baseUrl/workouts/details/$workoutId'),
-        );
-        if (detRes.statusCode != 200) continue;
-
-        final rawData = jsonDecode(detRes.body);
-        if (rawData is! Map<String, dynamic>) continue;
-        final data = rawData;
-
-        // parse date || created_at || now
-        DateTime ts;
-        final dateStr = data['date'] as String?;
-        if (dateStr != null) {
-          try {
-            ts = dateFmt.parse(dateStr);
-          } catch (_) {
-            ts = DateTime.now();
-          }
-        } else {
-          final created = data['created_at'] as String?;
-          ts = DateTime.tryParse(created ?? '') ?? DateTime.now();
+    for (final data in feedList) {
+      if (data is! Map<String, dynamic>) continue;
+      final uid = data['user_id'] as String? ?? userId;
+
+      // parse date || created_at || now
+      DateTime ts;
+      final dateStr = data['date'] as String?;
+      if (dateStr != null) {
+        try {
+          ts = dateFmt.parse(dateStr);
+        } catch (_) {
+          ts = DateTime.now();
         }
-
-        // build exercises list
-        final rawEx = data['exercises'];
-        final exList = rawEx is List ? rawEx : <dynamic>[];
-        final exercises = exList
-            .whereType<Map<String, dynamic>>()
-            .map((ex) {
-              final name = ex['exercise'] as String?;
-              final sets = ex['sets'] as int?;
-              final reps = ex['reps'] as int?;
-              final weight = (ex['weight'] as num?)?.toDouble();
-              if (name == null || sets == null || reps == null || weight == null) {
-                return null;
-              }
-              return ExerciseSummary(
-                name: name,
-                sets: sets,
-                reps: reps,
-                weight: weight,
-              );
-            })
-            .whereType<ExerciseSummary>()
-            .toList();
-
-        final totalSets = exercises.fold<int>(0, (s, e) => s + e.sets);
-        final totalVol = exercises.fold<double>(
-            0, (v, e) => v + e.sets * e.reps * e.weight);
-
-        // 4) fetch the real presigned URL for profile pic
-        String picUrl = '';
-        final picRes = await http.get(
-          Uri.parse('$_baseUrl/users/$uid/profile-picture'),
-        );
-        if (picRes.statusCode == 200) {
-          final m = jsonDecode(picRes.body);
-          if (m is Map<String, dynamic> && m['url'] is String) {
-            picUrl = m['url'] as String;
-          }
-        }
-
-        items.add(FeedItem(
-          workoutId:     data['id']        as String,
-          userId:        data['user_id']   as String? ?? uid,
-          username:      data['user_name'] as String? ?? 'Unknown',
-          profilePicUrl: picUrl,
-          workoutTitle:  data['name']      as String? ?? 'Untitled',
-          notes:         data['notes']     as String? ?? '',
-          duration:      data['duration'] is int
-                            ? data['duration'] as int
-                            : totalSets * 30,
-          volume:        totalVol,
-          sets:          totalSets,
-          timestamp:     ts,
-          exercises:     exercises,
-        ));
+      } else {
+        final created = data['created_at'] as String?;
+        ts = DateTime.tryParse(created ?? '') ?? DateTime.now();
       }
+
+      // build exercises list
+      final rawEx = data['exercises'];
+      final exList = rawEx is List ? rawEx : <dynamic>[];
+      final exercises = exList
+          .whereType<Map<String, dynamic>>()
+          .map((ex) {
+            final name = ex['exercise'] as String?;
+            final sets = ex['sets'] as int?;
+            final reps = ex['reps'] as int?;
+            final weight = (ex['weight'] as num?)?.toDouble();
+            if (name == null || sets == null || reps == null || weight == null) {
+              return null;
+            }
+            return ExerciseSummary(
+              name: name,
+              sets: sets,
+              reps: reps,
+              weight: weight,
+            );
+          })
+          .whereType<ExerciseSummary>()
+          .toList();
+
+      final totalSets = exercises.fold<int>(0, (s, e) => s + e.sets);
+      final totalVol = exercises.fold<double>(
+          0, (v, e) => v + e.sets * e.reps * e.weight);
+
+      // presigned profile picture URL, signed by the server with the feed
+      final picUrl = data['avatar_url'] as String? ?? '';
+
+      items.add(FeedItem(
+        workoutId:     data['id']        as String,
+        userId:        data['user_id']   as String? ?? uid,
+        username:      data['user_name'] as String? ?? 'Unknown',
+        profilePicUrl: picUrl,
+        workoutTitle:  data['name']      as String? ?? 'Untitled',
+        notes:         data['notes']     as String? ?? '',
+        duration:      data['duration'] is int
+                          ? data['duration'] as int
+                          : totalSets * 30,
+        volume:        totalVol,
+        sets:          totalSets,
+        timestamp:     ts,
+        exercises:     exercises,
+      ));
     }
 
-    // 5) sort newest-first
+    // sort newest-first
     items.sort((a, b) => b.timestamp.compareTo(a.timestamp));
     return items;
   }